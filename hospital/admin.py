@@ -1,8 +1,17 @@
 from django.contrib import admin
-from .models import Doctor, Patient, Ward, Bill, Attendance, Feedback, UserProfile
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from . import bulk_jobs
+from .models import (Doctor, Patient, Ward, Bill, Attendance, Feedback, UserProfile, Bed, BedStay, BulkJob, Task,
+                     ArchivedPatient, ChangeEvent)
 
 # Register your models here.
 
+def job_started_message(job, doing):
+    url = reverse('admin:hospital_bulkjob_change', args=[job.pk])
+    return format_html('{} in the background: <a href="{}">follow job #{}</a>.', doing, url, job.pk)
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'role', 'mobile_no', 'city']
@@ -27,11 +36,25 @@ class PatientAdmin(admin.ModelAdmin):
     actions = ['mark_as_discharged']
     
     def mark_as_discharged(self, request, queryset):
-        from django.utils import timezone
-        queryset.update(is_admitted=False, discharge_date=timezone.now())
-        self.message_user(request, f'{queryset.count()} patients marked as discharged.')
+        job = bulk_jobs.enqueue('discharge_patients', queryset, request.user)
+        self.message_user(request, job_started_message(job, 'Discharging the selected patients'))
     mark_as_discharged.short_description = 'Mark selected patients as discharged'
 
+@admin.register(ArchivedPatient)
+class ArchivedPatientAdmin(admin.ModelAdmin):
+    list_display = ['pid', 'patient_name', 'age', 'gender', 'consult_doctor', 'admission_date', 'discharge_date',
+                    'archived_at']
+    list_select_related = ['consult_doctor']
+    search_fields = ['patient_name', 'mobile_number', 'email']
+    ordering = ['-admission_date']
+
+    # Written only by manage.py archive_patients
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Ward)
 class WardAdmin(admin.ModelAdmin):
     list_display = ['wid', 'ward_name', 'ward_type', 'total_beds', 'room_type', 'cost']
@@ -39,9 +62,26 @@ class WardAdmin(admin.ModelAdmin):
     search_fields = ['ward_name', 'ward_type']
     ordering = ['-wid']
 
+@admin.register(Bed)
+class BedAdmin(admin.ModelAdmin):
+    list_display = ['id', 'ward', 'number', 'occupied_by']
+    list_select_related = ['ward', 'occupied_by']
+    list_filter = ['ward']
+    raw_id_fields = ['occupied_by']
+    ordering = ['ward', 'number']
+
+@admin.register(BedStay)
+class BedStayAdmin(admin.ModelAdmin):
+    list_display = ['id', 'bed', 'patient', 'started_at', 'ended_at']
+    list_select_related = ['bed__ward', 'patient']
+    raw_id_fields = ['bed', 'patient']
+    ordering = ['-started_at']
+    date_hierarchy = 'started_at'
+
 @admin.register(Bill)
 class BillAdmin(admin.ModelAdmin):
-    list_display = ['bid', 'patient', 'consult_doctor', 'amount', 'payment_status', 'payment_method', 'bill_date']
+    list_display = ['bid', 'patient', 'consult_doctor', 'amount', 'gst_amount', 'gross_amount', 'payment_status', 'payment_method', 'bill_date']
+    list_select_related = ['patient', 'consult_doctor']
     list_filter = ['payment_status', 'payment_method', 'bill_date']
     search_fields = ['patient__patient_name', 'contact_number']
     ordering = ['-bill_date']
@@ -50,9 +90,20 @@ class BillAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_paid']
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
+    
+    @admin.display(description='GST', ordering='gst_amount')
+    def gst_amount(self, obj):
+        return obj.gst_amount
+    
+    @admin.display(description='Total', ordering='gross_amount')
+    def gross_amount(self, obj):
+        return obj.gross_amount
+    
     def mark_as_paid(self, request, queryset):
-        queryset.update(payment_status='paid')
-        self.message_user(request, f'{queryset.count()} bills marked as paid.')
+        job = bulk_jobs.enqueue('mark_bills_paid', queryset, request.user)
+        self.message_user(request, job_started_message(job, 'Marking the selected bills as paid'))
     mark_as_paid.short_description = 'Mark selected bills as paid'
 
 @admin.register(Attendance)
@@ -69,3 +120,59 @@ class FeedbackAdmin(admin.ModelAdmin):
     search_fields = ['username', 'email', 'message']
     ordering = ['-created_at']
     readonly_fields = ['created_at']
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'action', 'status', 'progress_display', 'processed', 'total', 'changed', 'created_by',
+                    'created_at', 'finished_at']
+    list_filter = ['action', 'status']
+    ordering = ['-created_at']
+    exclude = ['selection']
+    readonly_fields = ['action', 'status', 'progress_display', 'total', 'processed', 'changed', 'error',
+                       'created_by', 'created_at', 'started_at', 'finished_at']
+
+    @admin.display(description='Progress')
+    def progress_display(self, obj):
+        return f'{obj.progress}%'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'worker', 'created_by', 'finished_at']
+    list_filter = ['status', 'name']
+    ordering = ['-created_at']
+    readonly_fields = ['name', 'args', 'kwargs', 'status', 'run_at', 'attempts', 'max_attempts', 'result', 'error',
+                       'worker', 'created_by', 'created_at', 'started_at', 'finished_at']
+
+    actions = ['run_again']
+
+    def run_again(self, request, queryset):
+        requeued = queryset.filter(status='failed').update(status='queued', run_at=timezone.now(), attempts=0)
+        self.message_user(request, f'{requeued} failed tasks queued again.')
+    run_again.short_description = 'Queue selected failed tasks again'
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(ChangeEvent)
+class ChangeEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'model', 'object_id', 'action', 'user', 'created_at']
+    list_select_related = ['user']
+    list_filter = ['model', 'action']
+    search_fields = ['=object_id', 'user__username']
+    ordering = ['-id']
+
+    # The log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
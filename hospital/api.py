@@ -0,0 +1,189 @@
+# hospital/api.py
+"""Versioned JSON API (``/api/v1/``) for integrations that would otherwise scrape the HTML pages.
+
+``GET /api/v1/<resource>/`` lists a resource newest first with the same
+keyset cursors as the HTML lists (``next``/``previous`` URLs, ``page_size``).
+``?ids=1,2,3`` fetches those rows in one query instead, and
+``GET /api/v1/<resource>/<pk>/`` returns a single row.
+
+``?fields=a,b`` limits the output to the named fields, and the query to the
+columns they need. Rows are read with ``values()`` into plain dicts, so no
+model instances are built. Only fields computed in Python, like a bill's
+``total_amount``, need instances; asking for one loads the rows with
+``.only()`` on the columns it depends on.
+"""
+from functools import wraps
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, F, Q
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from .models import Attendance, Bill, Doctor, Patient, Ward
+from .pagination import MAX_PAGE_SIZE, paginate_keyset
+
+VERSION = 'v1'
+
+
+class Resource:
+    """How one model is exposed: its fields, sort keys and exact-match filters"""
+
+    def __init__(self, queryset, keys, fields, computed=None, filters=()):
+        self.queryset = queryset  # callable returning the base queryset
+        self.keys = keys  # keyset order, newest first; must end with the primary key
+        self.fields = fields  # output name -> values() lookup
+        self.computed = computed or {}  # output name -> (columns it reads, function of the instance)
+        self.filters = filters  # fields that ?field=value filters on
+
+    @property
+    def names(self):
+        return [*self.fields, *self.computed]
+
+    def rows(self, queryset, names):
+        """``queryset`` restricted to what ``names`` (and the sort keys) need, as dicts or instances"""
+        plain = [name for name in names if name in self.fields]
+        wanted = [*dict.fromkeys([*plain, *self.keys])]
+        if not any(name in self.computed for name in names):
+            lookups = {name: self.fields.get(name, name) for name in wanted}
+            return queryset.values(*[name for name, lookup in lookups.items() if lookup == name],
+                                   **{name: F(lookup) for name, lookup in lookups.items() if lookup != name})
+        columns = [*wanted]
+        for name in names:
+            columns += self.computed.get(name, ((), None))[0]
+        return queryset.only(*dict.fromkeys(columns))
+
+    def serialize(self, row, names):
+        if isinstance(row, dict):
+            return {name: row[name] for name in names}
+        data = {}
+        for name in names:
+            if name in self.computed:
+                data[name] = self.computed[name][1](row)
+                continue
+            try:
+                data[name] = getattr(row, row._meta.get_field(name).attname)
+            except FieldDoesNotExist:  # an annotation
+                data[name] = getattr(row, name)
+        return data
+
+
+def _occupancy(queryset):
+    return queryset.annotate(bed_count=Count('beds'),
+                             free_beds=Count('beds', filter=Q(beds__occupied_by__isnull=True)))
+
+
+RESOURCES = {
+    'doctors': Resource(
+        Doctor.objects.all, ('did',),
+        {name: name for name in ('did', 'doctor_name', 'father_name', 'gender', 'dob', 'address', 'qualification',
+                                 'experience', 'last_worked_hospital', 'salary', 'updated_at')},
+    ),
+    'patients': Resource(
+        Patient.objects.all, ('admission_date', 'pid'),
+        {**{name: name for name in ('pid', 'patient_name', 'age', 'gender', 'address', 'consult_doctor', 'problem',
+                                    'admission_date', 'discharge_date', 'is_admitted', 'fee', 'diagnosis',
+                                    'mobile_number', 'email', 'updated_at')},
+         'bed': 'bed', 'ward': 'bed__ward'},
+        filters=('is_admitted', 'consult_doctor'),
+    ),
+    'wards': Resource(
+        lambda: _occupancy(Ward.objects.all()), ('wid',),
+        {name: name for name in ('wid', 'ward_name', 'ward_type', 'ward_mode', 'total_beds', 'cost', 'room_type',
+                                 'updated_at', 'bed_count', 'free_beds')},
+        filters=('ward_type', 'room_type'),
+    ),
+    'bills': Resource(
+        Bill.objects.all, ('bill_date', 'bid'),
+        {name: name for name in ('bid', 'patient', 'consult_doctor', 'diagnosis', 'contact_number', 'amount',
+                                 'bill_date', 'payment_status', 'payment_method', 'created_by', 'updated_at')},
+        computed={'tax_amount': (('amount',), lambda bill: bill.tax_amount),
+                  'total_amount': (('amount',), lambda bill: bill.total_amount)},
+        filters=('payment_status', 'patient', 'consult_doctor'),
+    ),
+    'attendance': Resource(
+        Attendance.objects.all, ('date_of_attendance', 'id'),
+        {**{name: name for name in ('id', 'staff', 'date_of_attendance', 'incoming_time', 'outgoing_time', 'status',
+                                    'task_involved')},
+         'staff_username': 'staff__username'},
+        filters=('staff', 'status', 'date_of_attendance'),
+    ),
+}
+
+
+def _error(status, **errors):
+    return JsonResponse({'errors': errors}, status=status)
+
+
+def api_view(view):
+    """GET-only JSON view for logged-in users that looks up ``resource``; errors are JSON too"""
+    @wraps(view)
+    @require_GET
+    def wrapper(request, resource, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error(401, detail=['Authentication required.'])
+        definition = RESOURCES.get(resource)
+        if definition is None:
+            return _error(404, resource=[f'Unknown resource {resource!r}; one of {", ".join(RESOURCES)}.'])
+        try:
+            return view(request, definition, *args, **kwargs)
+        except ValidationError as exc:
+            return _error(400, **(exc.message_dict if hasattr(exc, 'error_dict') else {'filters': exc.messages}))
+    return wrapper
+
+
+def _names(request, resource):
+    """The fields named by ``?fields=``, or all of them"""
+    if not request.GET.get('fields'):
+        return resource.names
+    names = [*dict.fromkeys(name.strip() for name in request.GET['fields'].split(',') if name.strip())]
+    unknown = [name for name in names if name not in resource.names]
+    if unknown:
+        raise ValidationError({'fields': [f'Unknown field {name!r}.' for name in unknown]})
+    return names
+
+
+def _filtered(request, resource):
+    queryset = resource.queryset()
+    for name in resource.filters:
+        if name in request.GET:
+            queryset = queryset.filter(**{name: request.GET[name]})
+    return queryset
+
+
+def _ids(request):
+    try:
+        ids = [int(value) for value in request.GET['ids'].split(',') if value.strip()]
+    except ValueError:
+        raise ValidationError({'ids': ['Expected comma-separated integer ids.']})
+    if len(ids) > MAX_PAGE_SIZE:
+        raise ValidationError({'ids': [f'At most {MAX_PAGE_SIZE} ids per request.']})
+    return ids
+
+
+@api_view
+def resource_list(request, resource):
+    """One page of a resource, or the rows named by ``?ids=``"""
+    names = _names(request, resource)
+    try:
+        rows = resource.rows(_filtered(request, resource), names)
+        if 'ids' in request.GET:
+            rows = rows.filter(pk__in=_ids(request)).order_by(*[f'-{key}' for key in resource.keys])
+            return JsonResponse({'results': [resource.serialize(row, names) for row in rows]})
+        page = paginate_keyset(request, rows, resource.keys)
+        return JsonResponse({
+            'results': [resource.serialize(row, names) for row in page],
+            'next': page.next_url,
+            'previous': page.previous_url,
+        })
+    except (ValueError, TypeError) as exc:  # a filter value of the wrong type
+        raise ValidationError({'filters': [str(exc)]})
+
+
+@api_view
+def resource_detail(request, resource, pk):
+    """A single row"""
+    names = _names(request, resource)
+    row = resource.rows(resource.queryset().filter(pk=pk), names).first()
+    if row is None:
+        return _error(404, detail=['Not found.'])
+    return JsonResponse(resource.serialize(row, names))
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class HospitalConfig(AppConfig):
     name = 'hospital'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import bulk_jobs  # noqa: F401  (registers its tasks)
@@ -0,0 +1,113 @@
+# hospital/archive.py
+"""Moving long-discharged patients out of the hot tables.
+
+Most Patient rows are discharged admissions nobody opens any more, yet they
+fill the indexes behind the patient list, search and the admission report.
+``manage.py archive_patients --older-than DAYS`` moves patients discharged
+before the cutoff, with their bills and bed stays, into the Archived* tables
+(hospital/models.py). It works in chunks, one transaction per chunk, so
+locks are held briefly and an interrupted run loses nothing.
+
+Rows are copied and deleted with plain SQL (INSERT ... SELECT, DELETE), so
+they never leave the database and no delete signals fire. Archiving is a
+move, not a deletion: the dashboard totals and the revenue rollup keep
+counting archived patients and bills, and their rebuilds read the archive
+too. Printed bill documents are dropped, since they can be rendered again.
+
+Pages that ask for history (``?history=1``) read through PatientHistory, a
+view over both patient tables; patient_detail falls back to the archive
+when a pid is no longer in Patient.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Value
+from django.utils import timezone
+
+from . import caching
+from .models import (ArchivedBedStay, ArchivedBill, ArchivedPatient, BedStay, Bill, BillDocument, Patient,
+                     PatientHistory)
+
+BATCH_SIZE = 500
+
+
+def patients(history=False):
+    """Patient rows, or with ``history`` the archived ones as well"""
+    return PatientHistory.objects.all() if history else Patient.objects.all()
+
+
+def find_patient(pid):
+    """The patient with ``pid``, from Patient or else the archive; None if neither has it"""
+    patient = Patient.objects.select_related('consult_doctor', 'bed__ward').filter(pid=pid).first()
+    if patient is None:
+        patient = ArchivedPatient.objects.select_related('consult_doctor').filter(pid=pid).first()
+    return patient
+
+
+def candidates(cutoff):
+    """Patients that may be archived: discharged before ``cutoff`` and in no bed"""
+    return Patient.objects.filter(is_admitted=False, discharge_date__lt=cutoff, bed__isnull=True)
+
+
+def _copy(source, target, extra=None, **filters):
+    """INSERT the ``source`` rows matching ``filters`` into ``target``, which has the same columns.
+
+    ``extra`` maps further ``target`` columns to the value every copied row gets.
+    """
+    extra = extra or {}
+    fields = source._meta.concrete_fields
+    columns = [field.column for field in fields] + [target._meta.get_field(name).column for name in extra]
+    annotations = {name: Value(value, output_field=target._meta.get_field(name)) for name, value in extra.items()}
+    select_sql, params = source.objects.filter(**filters).annotate(**annotations).values(
+        *[field.attname for field in fields], *annotations
+    ).order_by().query.sql_with_params()
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(target._meta.db_table)} ({", ".join(quote(c) for c in columns)}) '
+                       f'{select_sql}', params)
+
+
+def _delete(model, column, values):
+    """DELETE ``model`` rows whose ``column`` is in ``values``, bypassing signals and cascades"""
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(column)} IN ({placeholders})',
+                       list(values))
+
+
+def archive_chunk(cutoff, after=0, batch_size=BATCH_SIZE):
+    """Archive up to ``batch_size`` candidates with a pid above ``after``; returns their pids"""
+    with transaction.atomic():
+        # Locked so an edit or readmission cannot race the move
+        pids = list(candidates(cutoff).filter(pid__gt=after).order_by('pid')
+                    .select_for_update(of=('self',)).values_list('pid', flat=True)[:batch_size])
+        if not pids:
+            return []
+        bids = list(Bill.objects.filter(patient_id__in=pids).values_list('bid', flat=True))
+        _copy(Patient, ArchivedPatient, {'archived_at': timezone.now()}, pid__in=pids)
+        _copy(Bill, ArchivedBill, patient_id__in=pids)
+        _copy(BedStay, ArchivedBedStay, patient_id__in=pids)
+        if bids:
+            _delete(BillDocument, 'bill_id', bids)
+        _delete(BedStay, 'patient_id', pids)
+        _delete(Bill, 'patient_id', pids)
+        _delete(Patient, 'pid', pids)
+    caching.invalidate(Patient, Bill)
+    return pids
+
+
+def archive_patients(older_than_days, batch_size=BATCH_SIZE, progress=None):
+    """Archive every patient discharged more than ``older_than_days`` ago.
+
+    Returns the number archived; ``progress(count)`` is called after each chunk.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    archived = 0
+    after = 0
+    while pids := archive_chunk(cutoff, after, batch_size):
+        archived += len(pids)
+        after = pids[-1]
+        if progress is not None:
+            progress(archived)
+    return archived
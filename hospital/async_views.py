@@ -0,0 +1,65 @@
+# hospital/async_views.py
+"""Async dashboard and reports for ASGI deployments.
+
+Same pages as the sync views in hospital/views.py, but each page's
+independent aggregates are issued at the same time (hospital/gather.py), so
+a report takes about as long as its slowest query rather than their sum.
+"""
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+
+from . import caching, views
+from .forms import DateRangeForm
+from .gather import gather_queries
+from .replicas import replica_reads
+
+
+async def _render(request, template_name, context):
+    """render() on the request thread; template rendering can touch lazy querysets"""
+    # login_required loaded the user through request.auser(); reuse it rather
+    # than letting request.user fetch it a second time
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@login_required
+async def dashboard_view(request):
+    """Dashboard view with statistics"""
+    def compute():
+        return async_to_sync(gather_queries)(views.dashboard_queries())
+
+    # The sync view's cache entry; a miss still issues the queries concurrently
+    results = await sync_to_async(caching.cached)('dashboard', views.DASHBOARD_MODELS, compute)
+    return await _render(request, 'hospital/auth/dashboard.html', views.dashboard_context(results))
+
+
+@login_required
+@replica_reads
+async def admission_report(request):
+    """Admission/Discharge report"""
+    form = DateRangeForm(request.GET or None)
+    history = views.history_requested(request)
+    results = await gather_queries(views.admission_report_queries(form, history))
+    return await _render(request, 'hospital/reports/admission_report.html',
+                         views.admission_report_context(form, results, history))
+
+
+@login_required
+@replica_reads
+async def revenue_report(request):
+    """Revenue report, aggregated from the daily rollup rather than the Bill table"""
+    form = DateRangeForm(request.GET or None)
+    results = await gather_queries(views.revenue_report_queries(form))
+    return await _render(request, 'hospital/reports/revenue_report.html',
+                         views.revenue_report_context(form, results))
+
+
+@login_required
+@replica_reads
+async def attendance_report(request):
+    """Attendance report"""
+    form = DateRangeForm(request.GET or None)
+    results = await gather_queries(views.attendance_report_queries(form))
+    return await _render(request, 'hospital/reports/attendance_report.html',
+                         views.attendance_report_context(form, results))
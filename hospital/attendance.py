@@ -0,0 +1,38 @@
+# hospital/attendance.py
+"""Attendance writes as upserts on (staff, date_of_attendance).
+
+Marking a row that already exists for the day overwrites it instead of
+tripping the unique constraint, and a whole roster is written with one
+INSERT ... ON CONFLICT DO UPDATE per batch.
+"""
+from django.utils import timezone
+
+from .models import Attendance
+
+UPSERT_BATCH_SIZE = 500
+UNIQUE_FIELDS = ['staff', 'date_of_attendance']
+ROSTER_FIELDS = ['incoming_time', 'outgoing_time', 'status', 'task_involved']
+
+
+def upsert_attendance(records, update_fields=ROSTER_FIELDS):
+    """Insert ``records`` or update ``update_fields`` of the day's existing rows"""
+    return Attendance.objects.bulk_create(records, batch_size=UPSERT_BATCH_SIZE, update_conflicts=True,
+                                          unique_fields=UNIQUE_FIELDS, update_fields=update_fields)
+
+
+def clock(staff_id, action, when=None):
+    """Record a clock-in or clock-out for today in a single statement.
+
+    Clocking in marks the day present; clocking out only sets the leaving
+    time, so it never overwrites the arrival recorded earlier.
+    """
+    when = timezone.localtime(when)
+    record = Attendance(staff_id=staff_id, date_of_attendance=when.date(), status='present')
+    if action == 'in':
+        record.incoming_time = when.time().replace(microsecond=0)
+        update_fields = ['incoming_time', 'status']
+    else:
+        record.outgoing_time = when.time().replace(microsecond=0)
+        update_fields = ['outgoing_time']
+    upsert_attendance([record], update_fields=update_fields)
+    return record
@@ -0,0 +1,170 @@
+# hospital/attendance_matrix.py
+"""Staff x day attendance matrix reduced with NumPy.
+
+The report window is fetched with a single ``values_list`` query and packed
+into two dense arrays, one row per staff member and one column per day:
+``status`` holds a small status code (0 = no record) and ``minutes`` the
+minutes worked. Totals, absence rates, streaks, monthly summaries and the
+heatmap are all reductions over those arrays instead of one query each.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+DEFAULT_DAYS = 365
+MAX_DAYS = 731
+
+NO_RECORD = 0
+STATUS_CODES = {'present': 1, 'absent': 2, 'leave': 3, 'half_day': 4}
+# One character per status code, used by the heatmap rows
+HEATMAP_CHARS = np.frombuffer(b'.PALH', dtype=np.uint8)
+
+DAY_MINUTES = 24 * 60
+
+
+def report_window(start_date=None, end_date=None):
+    """(start, end) of the matrix: DEFAULT_DAYS up to ``end_date``, at most MAX_DAYS"""
+    end = end_date or timezone.localdate()
+    start = start_date or end - timedelta(days=DEFAULT_DAYS - 1)
+    # A start after the end (or a future start with no end) is an empty window: no days, no rows
+    start = min(max(start, end - timedelta(days=MAX_DAYS - 1)), end + timedelta(days=1))
+    return start, end
+
+
+def _minutes(times):
+    """Minutes past midnight of 'HH:MM...' strings, -1 where the time is missing"""
+    raw = np.array([t or '' for t in times], dtype='S5')
+    digits = raw.view(np.uint8).reshape(-1, 5).astype(np.int32) - ord('0')
+    minutes = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+    return np.where(raw != b'', minutes, -1)
+
+
+def _runs(mask):
+    """Length of the longest run of True along each row of ``mask``"""
+    edges = np.diff(np.pad(mask.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+    longest = np.zeros(mask.shape[0], dtype=np.int32)
+    # Both are in row-major order, so the n-th start and n-th end bound the same run
+    np.maximum.at(longest, starts[:, 0], ends[:, 1] - starts[:, 1])
+    return longest
+
+
+class AttendanceMatrix:
+    """Attendance for ``start``..``end`` as staff x day arrays"""
+
+    def __init__(self, start, end, staff, status, minutes):
+        self.start = start
+        self.end = end
+        self.staff = staff  # [(user id, username)] in row order
+        self.status = status
+        self.minutes = minutes
+
+    @classmethod
+    def build(cls, attendances, start, end):
+        """Fetch ``attendances`` between ``start`` and ``end`` into a matrix"""
+        # Dates and times come back as text: parsing them with NumPy is several
+        # times faster than letting the driver build a date/time object per
+        # cell. Nothing here may need a converter, which runs once per row.
+        rows = list(
+            attendances.filter(date_of_attendance__range=(start, end)).order_by().values_list(
+                'staff_id', Cast('date_of_attendance', CharField()), 'status',
+                Cast('incoming_time', CharField()), Cast('outgoing_time', CharField()),
+            )
+        )
+        days = (end - start).days + 1
+        if not rows:
+            empty = np.zeros((0, days), dtype=np.uint8)
+            return cls(start, end, [], empty, empty.astype(np.int32))
+
+        staff_ids, dates, statuses, incoming, outgoing = zip(*rows)
+        ids, row = np.unique(np.array(staff_ids), return_inverse=True)
+        column = (np.array(dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+
+        status = np.zeros((len(ids), days), dtype=np.uint8)
+        names, codes = np.unique(np.array(statuses), return_inverse=True)
+        status[row, column] = np.array([STATUS_CODES.get(name, NO_RECORD) for name in names], dtype=np.uint8)[codes]
+
+        came, left = _minutes(incoming), _minutes(outgoing)
+        worked = np.where((came >= 0) & (left >= 0), (left - came) % DAY_MINUTES, 0)  # past midnight wraps
+        minutes = np.zeros((len(ids), days), dtype=np.int32)
+        minutes[row, column] = worked
+
+        # A range rather than IN (...) keeps the lookup cheap for hundreds of staff
+        usernames = dict(User.objects.filter(pk__range=(ids[0], ids[-1])).values_list('pk', 'username'))
+        order = sorted(range(len(ids)), key=lambda i: usernames.get(int(ids[i]), ''))
+        staff = [(int(ids[i]), usernames.get(int(ids[i]), '')) for i in order]
+        return cls(start, end, staff, status[order], minutes[order])
+
+    @property
+    def days(self):
+        return self.status.shape[1]
+
+    def count(self, name):
+        return int((self.status == STATUS_CODES[name]).sum())
+
+    def totals(self):
+        recorded = int((self.status != NO_RECORD).sum())
+        absent = self.count('absent')
+        return {
+            'total_records': recorded,
+            'present_count': self.count('present'),
+            'absent_count': absent,
+            'leave_count': self.count('leave'),
+            'half_day_count': self.count('half_day'),
+            'absence_rate': absent / recorded * 100 if recorded else 0,
+            'hours_worked': int(self.minutes.sum()) / 60,
+        }
+
+    def staff_summary(self):
+        """Per-staff counts, absence rate, hours and streaks, highest absence rate first"""
+        recorded = (self.status != NO_RECORD).sum(axis=1)
+        absent = (self.status == STATUS_CODES['absent']).sum(axis=1)
+        attended = np.isin(self.status, [STATUS_CODES['present'], STATUS_CODES['half_day']])
+        rate = np.divide(absent * 100, recorded, out=np.zeros(len(recorded)), where=recorded > 0)
+        hours = self.minutes.sum(axis=1) / 60
+        best_streak = _runs(attended)
+        absence_streak = _runs(self.status == STATUS_CODES['absent'])
+        summary = [
+            {'staff_id': staff_id, 'username': username, 'recorded': int(recorded[i]),
+             'present': int(attended[i].sum()), 'absent': int(absent[i]), 'absence_rate': float(rate[i]),
+             'hours_worked': float(hours[i]), 'longest_streak': int(best_streak[i]),
+             'longest_absence': int(absence_streak[i])}
+            for i, (staff_id, username) in enumerate(self.staff)
+        ]
+        summary.sort(key=lambda row: -row['absence_rate'])
+        return summary
+
+    def monthly_summary(self):
+        """Totals per calendar month of the window"""
+        if not self.days:
+            return []
+        months = (np.datetime64(self.start, 'D') + np.arange(self.days)).astype('datetime64[M]')
+        firsts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+
+        def per_month(matrix):
+            return np.add.reduceat(matrix.sum(axis=0), firsts)
+
+        recorded = per_month(self.status != NO_RECORD)
+        counts = {name: per_month(self.status == code) for name, code in STATUS_CODES.items()}
+        minutes = per_month(self.minutes)
+        return [
+            {'month': months[first].astype(object), 'recorded': int(recorded[i]),
+             **{name: int(counts[name][i]) for name in STATUS_CODES},
+             'absence_rate': counts['absent'][i] * 100 / recorded[i] if recorded[i] else 0,
+             'hours_worked': int(minutes[i]) / 60}
+            for i, first in enumerate(firsts)
+        ]
+
+    def heatmap(self):
+        """{'start', 'days', 'rows': [[username, codes]]} with one character per day (see HEATMAP_CHARS)"""
+        cells = HEATMAP_CHARS[self.status]
+        return {
+            'start': self.start.isoformat(),
+            'days': self.days,
+            'rows': [[username, cells[i].tobytes().decode()] for i, (_, username) in enumerate(self.staff)],
+        }
@@ -0,0 +1,65 @@
+# hospital/beds.py
+"""Bed allocation for admissions.
+
+Free beds are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``: concurrent
+admissions to the same ward each lock a different free row instead of
+queueing on (or double-booking) the first one. The claim itself is a
+conditional UPDATE, so backends without row locks still never hand one bed
+to two patients. These queryset updates skip auto_now, so they set the
+beds' updated_at themselves.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching
+from .models import Bed, BedStay
+
+# Claims lost to a concurrent writer before giving up (only possible without SKIP LOCKED)
+ALLOCATION_RETRIES = 5
+
+
+class NoBedAvailable(Exception):
+    """The ward has no free bed"""
+
+
+def _free_beds(ward):
+    beds = Bed.objects.filter(ward=ward, occupied_by__isnull=True).order_by('number')
+    return beds.select_for_update(skip_locked=True)
+
+
+def allocate_bed(patient, ward):
+    """Put ``patient`` in the lowest-numbered free bed of ``ward`` and open a stay"""
+    with transaction.atomic():
+        for _ in range(ALLOCATION_RETRIES):
+            bed = _free_beds(ward).first()
+            if bed is None:
+                break
+            unclaimed = Bed.objects.filter(pk=bed.pk, occupied_by__isnull=True)
+            if unclaimed.update(occupied_by=patient, updated_at=timezone.now()):
+                caching.invalidate(Bed)
+                bed.occupied_by = patient
+                BedStay.objects.create(bed=bed, patient=patient)
+                return bed
+        raise NoBedAvailable(f'No free bed in {ward.ward_name}')
+
+
+def release_bed(patient):
+    """Free the patient's bed, if any, and close the open stay"""
+    with transaction.atomic():
+        now = timezone.now()
+        freed = Bed.objects.filter(occupied_by=patient).update(occupied_by=None, updated_at=now)
+        BedStay.objects.filter(patient=patient, ended_at__isnull=True).update(ended_at=now)
+        if freed:
+            caching.invalidate(Bed)
+    return bool(freed)
+
+
+def release_beds(patients):
+    """Bulk form of release_bed for a Patient queryset"""
+    with transaction.atomic():
+        now = timezone.now()
+        freed = Bed.objects.filter(occupied_by__in=patients).update(occupied_by=None, updated_at=now)
+        BedStay.objects.filter(patient__in=patients, ended_at__isnull=True).update(ended_at=now)
+        if freed:
+            caching.invalidate(Bed)
+    return freed
@@ -0,0 +1,56 @@
+# hospital/bill_documents.py
+"""Pre-rendered print documents for paid bills.
+
+A paid bill no longer changes, so its print view is rendered once to HTML
+and stored in BillDocument. Reprints are answered from the stored bytes
+with a strong ETag (the SHA-256 of the document) and Last-Modified, so a
+browser that already has the document gets a 304 and nobody re-runs the
+template engine. Saving the bill deletes the document; re-rendering an
+unchanged bill yields the same ETag, so cached copies stay valid.
+"""
+import hashlib
+
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .conditional import revalidate_privately
+from .models import BillDocument, gst_percent
+
+
+def render_document(bill):
+    """Render ``bill`` (with patient, doctor and creator loaded) to a new, unsaved BillDocument"""
+    context = {'bill': bill, 'gst_percent': gst_percent()}
+    html = render_to_string('hospital/bill/bill_document.html', context).encode()
+    return BillDocument(bill=bill, html=html, etag=hashlib.sha256(html).hexdigest())
+
+
+def stored_document(bill):
+    """The bill's stored document, rendering and saving it on first use"""
+    try:
+        return bill.document
+    except BillDocument.DoesNotExist:
+        document = render_document(bill)
+        # A concurrent first print may store the same bytes first; either copy will do
+        BillDocument.objects.bulk_create([document], ignore_conflicts=True)
+        bill.document = document
+        return document
+
+
+def document_response(request, bill):
+    """Serve the bill's document, or 304 if the client's copy is current.
+
+    ``bill.document`` may have been loaded with ``html`` deferred; the
+    bytes are only fetched when they are actually sent.
+    """
+    document = stored_document(bill)
+    etag = quote_etag(document.etag)
+    last_modified = int(document.rendered_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(bytes(document.html), content_type='text/html; charset=utf-8')
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    revalidate_privately(response)
+    return response
@@ -0,0 +1,121 @@
+# hospital/bulk_jobs.py
+"""Admin bulk actions run in the background in primary-key batches.
+
+The admin action only records the primary keys it selected in a BulkJob,
+as JSON runs of consecutive keys (a contiguous selection of any size is a
+single ``[first, last]`` pair), and queues a task for it (see
+hospital/tasks.py) before returning. A ``run_workers`` process then walks
+the selection in pk order, BATCH_SIZE keys at a time. Each action checks
+its own condition again, so rows deleted or changed since are skipped.
+Every batch is committed on its own: row locks are held for one batch
+only, and a failure part-way keeps the batches already done. Progress is
+written to the job row after each batch, so the BulkJob admin shows how
+far a job has got.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching, changelog
+from .beds import release_beds
+from .models import Bill, BulkJob, DashboardStats, Patient, RevenueDailyRollup
+from .tasks import enqueue as enqueue_task, task
+
+BATCH_SIZE = getattr(settings, 'HOSPITAL_BULK_BATCH_SIZE', 1000)
+
+
+# ==================== Actions ====================
+# Each takes one batch of primary keys, runs inside that batch's transaction
+# and returns the number of rows it changed. queryset.update() bypasses the
+# model signals and auto_now, so they adjust the dashboard, rollup and cache
+# and set updated_at themselves (the change log still sees the update).
+
+def discharge_patients(pks):
+    locked = list(Patient.objects.filter(pk__in=pks, is_admitted=True).select_for_update().values_list('pk', flat=True))
+    admitted = Patient.objects.filter(pk__in=locked)
+    release_beds(admitted)
+    now = timezone.now()
+    discharged = admitted.update(is_admitted=False, discharge_date=now, updated_at=now)
+    DashboardStats.bump(admitted_patients=-discharged)
+    caching.invalidate(Patient)
+    return discharged
+
+
+def mark_bills_paid(pks):
+    locked = list(Bill.objects.filter(pk__in=pks).exclude(payment_status='paid').select_for_update()
+                  .values_list('pk', flat=True))
+    unpaid = Bill.objects.filter(pk__in=locked)
+    for row in RevenueDailyRollup.group_bills(unpaid):
+        key = (row['day'], row['consult_doctor_id'], row['payment_method'])
+        sums = (row['bill_count'], row['total'], row['gst'], row['gross'])
+        RevenueDailyRollup.add(*key, row['payment_status'], *(-value for value in sums))
+        RevenueDailyRollup.add(*key, 'paid', *sums)
+    updated = unpaid.update(payment_status='paid', updated_at=timezone.now())
+    caching.invalidate(Bill)
+    return updated
+
+
+ACTIONS = {
+    'discharge_patients': (Patient, discharge_patients),
+    'mark_bills_paid': (Bill, mark_bills_paid),
+}
+
+
+# ==================== Jobs ====================
+
+def _runs(pks):
+    """Ascending primary keys as ``[[first, last], ...]`` runs of consecutive keys"""
+    runs = []
+    for pk in pks:
+        if runs and pk == runs[-1][1] + 1:
+            runs[-1][1] = pk
+        else:
+            runs.append([pk, pk])
+    return runs
+
+
+def enqueue(action, queryset, user=None):
+    """Record a job for the rows of ``queryset`` and queue the task that runs it"""
+    runs = _runs(queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=BATCH_SIZE))
+    job = BulkJob.objects.create(action=action, selection=runs, total=sum(last - first + 1 for first, last in runs),
+                                 created_by=user)
+    enqueue_task(run_bulk_job, job.pk, user=user)
+    return job
+
+
+def selection(job):
+    """The job's selected primary keys in order"""
+    for first, last in job.selection:
+        yield from range(first, last + 1)
+
+
+def run(job_id, batch_size=None):
+    """Process every batch of a pending job and return it"""
+    batch_size = batch_size or BATCH_SIZE
+    if not BulkJob.objects.filter(pk=job_id, status='pending').update(status='running', started_at=timezone.now()):
+        return BulkJob.objects.get(pk=job_id)  # already claimed by another runner
+    job = BulkJob.objects.get(pk=job_id)
+    jobs = BulkJob.objects.filter(pk=job_id)
+    _, apply = ACTIONS[job.action]
+    selected = selection(job)
+    try:
+        while pks := list(islice(selected, batch_size)):
+            # The batch's change events are written together, as the job's creator
+            with changelog.recording(job.created_by), transaction.atomic():
+                changed = apply(pks)
+                jobs.update(processed=F('processed') + len(pks), changed=F('changed') + changed)
+    except Exception as exc:
+        jobs.update(status='failed', error=f'{type(exc).__name__}: {exc}', finished_at=timezone.now())
+        raise
+    jobs.update(status='done', finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+# A failed job is not retried: its committed batches are already counted
+@task(max_attempts=1)
+def run_bulk_job(job_id):
+    return {'changed': run(job_id).changed}
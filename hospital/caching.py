@@ -0,0 +1,126 @@
+# hospital/caching.py
+"""Versioned caching for pages built from a few slowly changing models.
+
+Every cached value is stored under a key that includes the current version
+of each model it was built from. Saving or deleting a row bumps its model's
+version (the receivers in hospital/signals.py, plus explicit invalidate()
+calls next to the bulk ``update()``/``bulk_create()`` writes that skip
+signals), so the next read computes a new key and never sees the stale
+entry, which simply ages out.
+
+Versions are kept in the cache itself, so every process sharing the cache
+sees a bump immediately. The local-memory backend is private to each
+process: with more than one worker use the file backend (or memcached /
+redis) so a write in one worker invalidates the others.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+CACHE_TIMEOUT = getattr(settings, 'HOSPITAL_CACHE_TIMEOUT', 3600)
+
+_MISSING = object()
+_STATS_NAMES_KEY = 'hospital:stats:names'
+
+
+def _cache():
+    return caches[getattr(settings, 'HOSPITAL_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    return f'hospital:version:{model._meta.label_lower}'
+
+
+def _fresh_version():
+    # Time-based so a version evicted from the cache never restarts at a
+    # number whose entries may still be cached
+    return time.time_ns()
+
+
+def versions(*models):
+    """Current version number of each model"""
+    cache = _cache()
+    keys = [_version_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def _bump(models):
+    cache = _cache()
+    for model in models:
+        try:
+            cache.incr(_version_key(model))
+        except ValueError:
+            cache.set(_version_key(model), _fresh_version(), None)
+
+
+def invalidate(*models):
+    """Bump the models' versions now and again when the transaction commits.
+
+    The second bump discards anything another request cached from the
+    pre-commit state of the database while the write was in flight.
+    """
+    _bump(models)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump(models))
+
+
+def make_key(name, models, *vary_on):
+    """Cache key for ``name`` built from ``models`` and varying on ``vary_on``"""
+    version = '.'.join(str(v) for v in versions(*models))
+    digest = hashlib.md5(repr(vary_on).encode(), usedforsecurity=False).hexdigest()
+    return f'hospital:{name}:{version}:{digest}'
+
+
+def cached(name, models, compute, *vary_on):
+    """Return the cached result of ``compute()`` for the models' current versions"""
+    cache = _cache()
+    key = make_key(name, models, *vary_on)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        _count(name, 'misses')
+        value = compute()
+        cache.set(key, value, CACHE_TIMEOUT)
+    else:
+        _count(name, 'hits')
+    return value
+
+
+# ==================== Hit/Miss Counters ====================
+
+def _count(name, outcome):
+    cache = _cache()
+    key = f'hospital:stats:{name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+        names = cache.get(_STATS_NAMES_KEY, set())
+        if name not in names:
+            cache.set(_STATS_NAMES_KEY, names | {name}, None)
+
+
+def stats():
+    """{name: {'hits': n, 'misses': n}} for every cached name seen so far"""
+    cache = _cache()
+    names = sorted(cache.get(_STATS_NAMES_KEY, set()))
+    counts = cache.get_many([f'hospital:stats:{name}:{outcome}' for name in names for outcome in ('hits', 'misses')])
+    return {
+        name: {outcome: counts.get(f'hospital:stats:{name}:{outcome}', 0) for outcome in ('hits', 'misses')}
+        for name in names
+    }
+
+
+def reset_stats():
+    cache = _cache()
+    names = cache.get(_STATS_NAMES_KEY, set())
+    cache.delete_many([f'hospital:stats:{name}:{outcome}' for name in names for outcome in ('hits', 'misses')])
+    cache.delete(_STATS_NAMES_KEY)
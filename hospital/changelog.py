@@ -0,0 +1,187 @@
+# hospital/changelog.py
+"""Append-only change log (outbox) of Patient and Bill writes.
+
+Every create, save, delete and ``queryset.update()`` of a Patient or Bill
+becomes a ChangeEvent holding only the fields that changed, as
+``{"field": [old, new]}``. A create's old values are null, and so are a
+delete's new ones. ``updated_at`` is left out.
+
+Saves and deletes are picked up by the signal handlers in
+hospital/signals.py; ``update()`` goes through ChangeLoggedQuerySet
+(hospital/models.py), which reads the rows' values before and after.
+``bulk_create`` fires no signals, so code that bulk-inserts logs the rows
+with ``record_created()`` (``manage.py import_records`` does). Two writers
+are deliberately not logged: ``seed_hospital``, whose rows are synthetic
+load-test data, and ``archive_patients``, which moves rows to the archive
+tables rather than changing them.
+Events are kept only once their transaction commits. Inside ``recording()``
+(the middleware opens one per request, and bulk jobs one per batch) they
+are buffered and written with a single ``bulk_create`` at the end, stamped
+with the acting user. Outside one they are written as they commit.
+
+Downstream systems tail the log with ``read(after=cursor)`` or the
+``change_log`` endpoint. Cursors are event ids, which increase in insert
+order, and a reader only sees events at least SETTLE_SECONDS old, so an
+insert that commits a moment after a later one is not skipped.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Bill, ChangeEvent, Patient
+
+SETTLE_SECONDS = getattr(settings, 'HOSPITAL_CHANGELOG_SETTLE_SECONDS', 2)
+READ_LIMIT = 500
+IGNORED_FIELDS = {'updated_at'}
+
+_recording = ContextVar('hospital_changelog_recording', default=None)
+
+
+def tracked_name(model):
+    """The name events use for ``model``, or None if it is not logged"""
+    return {Patient: 'patient', Bill: 'bill'}.get(model._meta.concrete_model)
+
+
+def snapshot(instance):
+    """The instance's loaded field values, by attname"""
+    return {field.attname: instance.__dict__[field.attname] for field in instance._meta.concrete_fields
+            if field.attname in instance.__dict__ and field.attname not in IGNORED_FIELDS}
+
+
+def diff(old, new):
+    """``{attname: [old, new]}`` for the values that differ; a missing side counts as None"""
+    return {name: [old.get(name), new.get(name)] for name in {*old, *new} if old.get(name) != new.get(name)}
+
+
+class Recording:
+    """Events buffered until the end of a request or batch"""
+
+    def __init__(self, user=None):
+        self.user = user
+        self.events = []
+        self.open = True
+
+
+def _write(events, recording):
+    if recording is not None and recording.open:
+        recording.events.extend(events)
+    else:
+        # No recording, or the transaction committed after it ended
+        flush(Recording(recording and recording.user), events)
+
+
+def record(model, changes, using=None):
+    """Log ``changes``, a list of (object_id, action, diff), once the current transaction commits.
+
+    Changes to a model tracked_name() does not know are ignored.
+    """
+    name = tracked_name(model)
+    if name is None:
+        return
+    events = [ChangeEvent(model=name, object_id=object_id, action=action, changes=values)
+              for object_id, action, values in changes if values]
+    if not events:
+        return
+    recording = _recording.get()
+    transaction.on_commit(lambda: _write(events, recording), using=using)
+
+
+def record_created(model, instances, using=None):
+    """Log a create for each of ``instances``, saved without signals (e.g. by ``bulk_create``).
+
+    Does nothing for a model the log does not track.
+    """
+    record(model, [(obj.pk, 'create', diff({}, snapshot(obj))) for obj in instances], using=using)
+
+
+def logged_update(queryset, update, **kwargs):
+    """Run ``update(**kwargs)`` on ``queryset`` and log how each matched row changed"""
+    model = queryset.model
+    names = [model._meta.get_field(name).attname for name in kwargs]
+    names = [name for name in names if name not in IGNORED_FIELDS]
+    if not names or tracked_name(model) is None:
+        return update(**kwargs)
+    with transaction.atomic(using=queryset.db, savepoint=False):
+        before = {row.pop('pk'): row for row in queryset.values('pk', *names)}
+        count = update(**kwargs)
+        if before:
+            after = model._base_manager.using(queryset.db).filter(pk__in=list(before)).values('pk', *names)
+            changes = []
+            for row in after:
+                pk = row.pop('pk')
+                changes.append((pk, 'update', diff(before[pk], row)))
+            record(model, changes, using=queryset.db)
+    return count
+
+
+def flush(recording, events=None):
+    """Write a recording's buffered ``events`` in one ``bulk_create``"""
+    events = recording.events if events is None else events
+    if not events:
+        return
+    user = recording.user
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    now = timezone.now()
+    for event in events:
+        event.user_id = user_id
+        event.created_at = now
+    ChangeEvent.objects.bulk_create(events)
+    recording.events = []
+
+
+@contextmanager
+def recording(user=None):
+    """Buffer the events committed inside the block and write them together when it ends"""
+    buffer = Recording(user)
+    token = _recording.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _recording.reset(token)
+        buffer.open = False
+        flush(buffer)
+
+
+def read(after=0, limit=READ_LIMIT, model=None):
+    """(events after cursor ``after`` oldest first, cursor to pass next time)"""
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    events = ChangeEvent.objects.filter(pk__gt=after, created_at__lte=settled)
+    if model:
+        events = events.filter(model=model)
+    events = list(events.order_by('pk')[:limit])
+    return events, events[-1].pk if events else after
+
+
+class ChangeLogMiddleware:
+    """Buffer a request's change events and write them with its user once the response is ready"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # request.user is lazy: it is only loaded if there is something to write
+        with recording(getattr(request, 'user', None)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        buffer = Recording(getattr(request, 'user', None))
+        token = _recording.set(buffer)
+        try:
+            return await self.get_response(request)
+        finally:
+            _recording.reset(token)
+            buffer.open = False
+            if buffer.events:
+                await sync_to_async(flush)(buffer)
@@ -0,0 +1,95 @@
+# hospital/conditional.py
+"""ETag / Last-Modified for the list and detail pages.
+
+Doctor, Patient, Ward, Bed and Bill rows carry an indexed ``updated_at``.
+A view decorated with ``@conditional_page(state)`` first calls ``state``,
+which runs one query for everything the page shows that can change: the
+``updated_at`` of its rows (a ``Max()`` over related ones) plus row counts,
+so deletions are seen too. A page already built from a cached fragment
+can return the fragment's model versions instead and skip the query.
+
+That state, with what the shared layout varies on (the user and the cached
+navigation), is hashed into the ETag, and the newest ``updated_at`` becomes
+Last-Modified. A browser or proxy presenting the current ETag gets a 304
+without the view's own queries or template ever running.
+
+Only the ETag is compared: a ``Max()`` does not move when a row is deleted,
+so If-Modified-Since alone could keep a stale page. Last-Modified is still
+sent for clients that display it.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import caching
+from .models import UserProfile
+from .pagination import paginate_keyset
+
+
+def row_state(values):
+    """(state, last_modified) of one row of validator values, or None if there is no row"""
+    if values is None:
+        return None
+    values = tuple(values.values()) if isinstance(values, dict) else tuple(values)
+    stamps = [value for value in values if isinstance(value, datetime)]
+    return values, max(stamps, default=None)
+
+
+def keyset_state(request, queryset, keys, *related):
+    """(state, last_modified) of the keyset page ``request`` asks for.
+
+    Fetches the same page as the view would, but only the rows' and their
+    ``related`` foreign keys' primary keys and ``updated_at``.
+    """
+    columns = ['pk', 'updated_at']
+    for name in related:
+        columns += [f'{name}__pk', f'{name}__updated_at']
+    page = paginate_keyset(request, queryset.values_list(*columns), keys)
+    rows = list(page)
+    stamps = [value for row in rows for value in row if isinstance(value, datetime)]
+    return (rows, page.has_next, page.has_previous), max(stamps, default=None)
+
+
+def revalidate_privately(response):
+    """Mark ``response`` as logged-in content: shared caches must not keep it, browsers revalidate every time"""
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+def etag_for(request, state):
+    # The layout shows the user and their cached navigation (see base.html)
+    vary_on = (request.user.pk, request.user.get_username(), caching.versions(UserProfile), state)
+    return quote_etag(hashlib.md5(repr(vary_on).encode(), usedforsecurity=False).hexdigest())
+
+
+def conditional_page(state):
+    """Answer a GET with 304 while ``state(request, *args, **kwargs)`` is unchanged.
+
+    ``state`` returns ``(state, last_modified)``, or None when it cannot
+    tell (the view then runs as usual, e.g. to raise its 404).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # A flash message is shown once, so a page carrying one must never be revalidated
+            if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+            validated = state(request, *args, **kwargs)
+            if validated is None:
+                return view(request, *args, **kwargs)
+            etag = etag_for(request, validated[0])
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.headers['ETag'] = etag
+                if validated[1] is not None:
+                    response.headers['Last-Modified'] = http_date(validated[1].timestamp())
+                patch_vary_headers(response, ['Cookie'])
+                revalidate_privately(response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+# hospital/exports.py
+"""Streaming CSV / NDJSON responses for report exports.
+
+Rows are pulled from the database in chunks with ``QuerySet.iterator()``
+(a server-side cursor on PostgreSQL) and written to the client as they
+arrive, so memory stays flat however many rows match.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(headers, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def stream_rows(request, headers, rows, filename):
+    """Stream an iterable of row tuples as CSV, or NDJSON with ?format=ndjson"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        fmt = 'csv'
+    lines = _csv_lines(headers, rows) if fmt == 'csv' else _ndjson_lines(headers, rows)
+    response = StreamingHttpResponse(lines, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+
+def queryset_rows(queryset, fields):
+    """Yield ``fields`` of every row as tuples, fetched in chunks"""
+    # Choose the database now: the rows are read while the response streams,
+    # after the view (and any use_replica() block around it) has returned
+    return queryset.using(queryset.db).values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
@@ -2,8 +2,44 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from .attendance import UNIQUE_FIELDS
 from .models import Doctor, Patient, Ward, Attendance, Bill, Feedback, UserProfile
 
+class AutocompleteSelect(forms.Select):
+    """A <select> rendered with only its selected option; autocomplete.js fills in matches from ``source``.
+
+    A plain Select puts every row of the field's queryset into the page.
+    """
+
+    class Media:
+        js = ['hospital/js/autocomplete.js']
+
+    def __init__(self, source, attrs=None):
+        super().__init__(attrs)
+        self.source = source  # a key of hospital.search.AUTOCOMPLETE
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = reverse('autocomplete', args=[self.source])
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices  # a ModelChoiceIterator over the whole queryset
+        selected = [v for v in value if v not in ('', None)]
+        options = [('', choices.field.empty_label)] if choices.field.empty_label is not None else []
+        if selected:
+            try:
+                options += [choices.choice(obj) for obj in choices.queryset.filter(pk__in=selected)]
+            except (ValueError, ValidationError):  # an invalid submitted value
+                pass
+        self.choices = options
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
 class UserRegistrationForm(UserCreationForm):
     email = forms.EmailField(required=True, widget=forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Email'}))
     first_name = forms.CharField(required=True, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'First Name'}))
@@ -58,7 +94,7 @@ class PatientForm(forms.ModelForm):
             'age': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Age'}),
             'gender': forms.Select(attrs={'class': 'form-control'}),
             'address': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
-            'consult_doctor': forms.Select(attrs={'class': 'form-control'}),
+            'consult_doctor': AutocompleteSelect('doctors', attrs={'class': 'form-control'}),
             'problem': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Problem/Symptoms'}),
             'fee': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Fee'}),
             'diagnosis': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Diagnosis'}),
@@ -66,6 +102,12 @@ class PatientForm(forms.ModelForm):
             'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Email'}),
         }
 
+class AdmitPatientForm(PatientForm):
+    """PatientForm plus the ward to take a bed in on admission"""
+    ward = forms.ModelChoiceField(queryset=Ward.objects.order_by('ward_name'), required=False,
+                                  empty_label='No bed (outpatient)',
+                                  widget=forms.Select(attrs={'class': 'form-control'}))
+
 class WardForm(forms.ModelForm):
     class Meta:
         model = Ward
@@ -84,7 +126,7 @@ class AttendanceForm(forms.ModelForm):
         model = Attendance
         fields = ['staff', 'date_of_attendance', 'incoming_time', 'outgoing_time', 'status', 'task_involved']
         widgets = {
-            'staff': forms.Select(attrs={'class': 'form-control'}),
+            'staff': AutocompleteSelect('staff', attrs={'class': 'form-control'}),
             'date_of_attendance': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'incoming_time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
             'outgoing_time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
@@ -92,13 +134,53 @@ class AttendanceForm(forms.ModelForm):
             'task_involved': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Task Involved'}),
         }
 
+    def validate_unique(self):
+        # Saved with an upsert, so a second mark for the same staff and day updates it;
+        # only that unique check is skipped
+        unique_checks, date_checks = self.instance._get_unique_checks(exclude=self._get_validation_exclusions())
+        unique_checks = [(model, fields) for model, fields in unique_checks if set(fields) != set(UNIQUE_FIELDS)]
+        errors = self.instance._perform_unique_checks(unique_checks)
+        for field, messages in self.instance._perform_date_checks(date_checks).items():
+            errors.setdefault(field, []).extend(messages)
+        if errors:
+            self._update_errors(ValidationError(errors))
+
+class RosterFilterForm(forms.Form):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    role = forms.ChoiceField(choices=[('', 'All roles')] + UserProfile.ROLE_CHOICES, required=False,
+                             widget=forms.Select(attrs={'class': 'form-control'}))
+
+class RosterRowForm(forms.Form):
+    """One staff member's line on the roster; staff ids are checked by the view in one query"""
+    staff_id = forms.IntegerField(widget=forms.HiddenInput)
+    status = forms.ChoiceField(choices=Attendance.STATUS_CHOICES, widget=forms.Select(attrs={'class': 'form-select form-select-sm'}))
+    incoming_time = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control form-control-sm'}))
+    outgoing_time = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control form-control-sm'}))
+    task_involved = forms.CharField(max_length=200, required=False, widget=forms.TextInput(attrs={'class': 'form-control form-control-sm'}))
+
+class BaseRosterFormSet(forms.BaseFormSet):
+    def clean(self):
+        if any(self.errors):
+            return
+        # The rows become one upsert, which cannot write the same (staff, date) twice
+        staff_ids = [form.cleaned_data['staff_id'] for form in self.forms if form.cleaned_data]
+        if len(staff_ids) != len(set(staff_ids)):
+            raise ValidationError('Each staff member may appear only once on the roster.')
+
+RosterFormSet = forms.formset_factory(RosterRowForm, formset=BaseRosterFormSet, extra=0, max_num=2000,
+                                      validate_max=True)
+
+class ClockForm(forms.Form):
+    action = forms.ChoiceField(choices=[('in', 'Clock in'), ('out', 'Clock out')])
+    staff = forms.IntegerField(required=False)
+
 class BillForm(forms.ModelForm):
     class Meta:
         model = Bill
         fields = ['patient', 'consult_doctor', 'diagnosis', 'contact_number', 'amount', 'payment_status', 'payment_method']
         widgets = {
-            'patient': forms.Select(attrs={'class': 'form-control'}),
-            'consult_doctor': forms.Select(attrs={'class': 'form-control'}),
+            'patient': AutocompleteSelect('patients', attrs={'class': 'form-control'}),
+            'consult_doctor': AutocompleteSelect('doctors', attrs={'class': 'form-control'}),
             'diagnosis': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Diagnosis'}),
             'contact_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Contact Number'}),
             'amount': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Amount'}),
@@ -0,0 +1,46 @@
+# hospital/gather.py
+"""Run a view's independent queries one after another or all at once.
+
+Django's async ORM methods (``acount()``, ``aaggregate()``, ...) all hop onto
+the single thread that owns the request's connection, so gathering them
+still runs the queries back to back. ``gather_queries`` gives each query a
+worker thread and therefore its own connection, which lets the database
+execute them in parallel.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connection
+
+
+def run_queries(queries):
+    """Evaluate ``{name: zero-argument callable}`` in order and return ``{name: result}``"""
+    return {name: query() for name, query in queries.items()}
+
+
+def _on_own_connection(query):
+    def run():
+        try:
+            return query()
+        finally:
+            # Worker threads have no request cycle to close their connections
+            close_old_connections()
+    return run
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+async def gather_queries(queries):
+    """Async run_queries that issues every query concurrently.
+
+    Inside a transaction (ATOMIC_REQUESTS, tests) other connections cannot
+    see its uncommitted rows, so the queries share the request's connection
+    and run in turn.
+    """
+    if await sync_to_async(_in_transaction)():
+        calls = [sync_to_async(query)() for query in queries.values()]
+    else:
+        calls = [sync_to_async(_on_own_connection(query), thread_sensitive=False)() for query in queries.values()]
+    return dict(zip(queries, await asyncio.gather(*calls)))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hospital import archive
+
+
+class Command(BaseCommand):
+    help = ('Move patients discharged more than --older-than days ago, with their bills and bed stays, '
+            'to the archive tables, one transaction per batch')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, metavar='DAYS',
+                            help='Archive patients discharged more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help='Patients per transaction')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError('--older-than must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        def progress(count):
+            self.stdout.write(f'{count} patients archived')
+
+        archived = archive.archive_patients(options['older_than'], options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} patients'))
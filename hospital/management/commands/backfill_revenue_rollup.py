@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hospital.models import RevenueDailyRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily revenue rollup from the Bill table and the bill archive'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = RevenueDailyRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Revenue rollup rebuilt with {created} rows'))
@@ -0,0 +1,84 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from hospital import api
+
+# (HTML list an integration scrapes today, API resource serving the same rows)
+PAGES = [
+    ('doctor_list', 'doctors'),
+    ('patient_list', 'patients'),
+    ('ward_list', 'wards'),
+    ('bill_list', 'bills'),
+    ('attendance_list', 'attendance'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput, response size and query count of the HTML list pages with the '
+            'JSON API (/api/v1/) serving the same rows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to log in as (default: the first superuser)')
+        parser.add_argument('--requests', type=int, default=100, help='Timed requests per page')
+        parser.add_argument('--page-size', type=int, default=50, help='Rows per page on both sides')
+        parser.add_argument('--resource', choices=[resource for page, resource in PAGES],
+                            help='Only compare this resource')
+        parser.add_argument('--fields', help='?fields= for the API requests, e.g. "pid,patient_name" (needs --resource)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2 to compute percentiles')
+        if options['fields'] and not options['resource']:
+            raise CommandError('--fields needs --resource, as field names differ between resources')
+        user = self.get_user(options['username'])
+        client = Client()
+        client.force_login(user)
+
+        self.stdout.write(f'{"page":<24} {"p50 ms":>9} {"req/s":>8} {"KB":>8} {"queries":>8}')
+        # The test client always sends "Host: testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for page, resource in PAGES:
+                if options['resource'] not in (None, resource):
+                    continue
+                query = f'?page_size={options["page_size"]}'
+                api_query = f'{query}&fields={options["fields"]}' if options['fields'] else query
+                for label, url in ((page, reverse(page) + query),
+                                   (f'api {resource}', reverse('api_list', args=[resource]) + api_query)):
+                    result = self.bench(client, url, options['requests'])
+                    self.stdout.write(f'{label:<24} {result["p50"]:>9.1f} {result["rps"]:>8.1f} '
+                                      f'{result["kb"]:>8.1f} {result["queries"]:>8}')
+        self.stdout.write(f'API version {api.VERSION}; in-process test client, no network or server overhead.')
+
+    def get_user(self, username):
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError(f'No user {username!r}' if username else 'No superuser; pass --username')
+        return user
+
+    def bench(self, client, url, count):
+        response = client.get(url)  # warm up
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        latencies = []
+        started = time.perf_counter()
+        for i in range(count):
+            with CaptureQueriesContext(connection) as queries:
+                request_started = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - request_started)
+        elapsed = time.perf_counter() - started
+        return {
+            'p50': statistics.median(latencies) * 1000,
+            'rps': count / elapsed,
+            'kb': len(response.content) / 1024,
+            'queries': len(queries),
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+# (sync route served over WSGI, async route served over ASGI)
+PAGES = [
+    ('dashboard', 'async_dashboard'),
+    ('admission_report', 'async_admission_report'),
+    ('revenue_report', 'async_revenue_report'),
+    ('attendance_report', 'async_attendance_report'),
+]
+
+
+def _summary(latencies, elapsed):
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {'p50': cuts[49] * 1000, 'p99': cuts[98] * 1000, 'rps': len(latencies) / elapsed}
+
+
+class Command(BaseCommand):
+    help = ('Compare p50/p99 latency of the dashboard and reports served through the WSGI handler '
+            '(sync views, one thread per in-flight request) and the ASGI handler (async views, '
+            'concurrent aggregates)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='User to log in as (default: the first superuser)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and handler')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+        parser.add_argument('--warmup', type=int, default=5)
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['username'])
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2 to compute percentiles')
+
+        self.stdout.write(f'{"page":<20} {"handler":<6} {"p50 ms":>9} {"p99 ms":>9} {"req/s":>8}')
+        # The test clients always send "Host: testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for sync_name, async_name in PAGES:
+                for handler, result in (('WSGI', self.bench_wsgi(user, reverse(sync_name), options)),
+                                        ('ASGI', asyncio.run(self.bench_asgi(user, reverse(async_name), options)))):
+                    self.stdout.write(f'{sync_name:<20} {handler:<6} {result["p50"]:>9.1f} '
+                                      f'{result["p99"]:>9.1f} {result["rps"]:>8.1f}')
+        self.stdout.write('In-process handlers, no network or server overhead; compare the two columns '
+                          'with each other rather than with production numbers.')
+
+    def get_user(self, username):
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError(f'No user {username!r}' if username else 'No superuser; pass --username')
+        return user
+
+    def bench_wsgi(self, user, url, options):
+        def worker(count):
+            client = Client()
+            client.force_login(user)
+            latencies = []
+            try:
+                for i in range(count):
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        raise CommandError(f'{url} returned {response.status_code}')
+            finally:
+                client.logout()
+                connections.close_all()
+            return latencies
+
+        self.warm_up(Client(), user, url, options['warmup'])
+        counts = self.split(options['requests'], options['concurrency'])
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(counts)) as pool:
+            latencies = [latency for batch in pool.map(worker, counts) for latency in batch]
+        return _summary(latencies, time.perf_counter() - started)
+
+    async def bench_asgi(self, user, url, options):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        for i in range(options['warmup']):
+            await client.get(url)
+        gate = asyncio.Semaphore(options['concurrency'])
+
+        async def one():
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one() for i in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        await client.alogout()
+        return _summary(latencies, elapsed)
+
+    def warm_up(self, client, user, url, count):
+        client.force_login(user)
+        for i in range(count):
+            client.get(url)
+        client.logout()
+
+    @staticmethod
+    def split(total, parts):
+        """Spread ``total`` requests over ``parts`` workers"""
+        parts = max(1, min(parts, total))
+        return [total // parts + (i < total % parts) for i in range(parts)]
@@ -0,0 +1,186 @@
+import json
+import os
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from hospital.models import Attendance, Bill, Doctor, Feedback, Patient, Task, Ward
+from hospital.urls import urlpatterns
+
+# Pages meant for visitors who are not logged in
+ANONYMOUS = {'index', 'register', 'login', 'feedback_form'}
+# Routes that change data on GET and would eat the data set being measured
+SKIPPED = {'delete_doctor'}
+# URL keyword -> model whose newest row is used to fill it
+URL_OBJECTS = {'did': Doctor, 'pid': Patient, 'patient_id': Patient, 'wid': Ward, 'bill_id': Bill, 'task_id': Task,
+               'pk': Patient}
+# URL keyword -> fixed value (the JSON API and autocomplete routes are measured on patients)
+URL_VALUES = {'resource': 'patients', 'source': 'patients'}
+# Routes that take --query as ?query=
+QUERIED = {'autocomplete'}
+COUNTED_MODELS = [Doctor, Patient, Bill, Ward, Attendance, Feedback]
+
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=settings.BASE_DIR, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = ('GET every route in hospital/urls.py with the test client and write latency, query count and '
+            'RSS per route to a JSON report; --compare diffs the result against an earlier report. '
+            'Queries are counted on the request connection, so the async views\' concurrent aggregates '
+            '(run on worker connections) are not included')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='bench_report.json')
+        parser.add_argument('--compare', metavar='BASELINE', help='Earlier report to compare against')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per route')
+        parser.add_argument('--username', help='User for logged-in routes (default: the first superuser)')
+        parser.add_argument('--query', default='Sharma', help='Search term for the search routes')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every request')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Percent slowdown in p50 that --compare reports as a regression')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 2:
+            raise CommandError('--repeat must be at least 2')
+        user = self.get_user(options['username'])
+        urls = self.route_urls(options['query'])
+
+        client = Client()
+        routes = {}
+        # The test client always sends "Host: testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in urls.items():
+                routes[name] = self.bench_route(client, user, name, url, options)
+                result = routes[name]
+                self.stdout.write(f'{name:<26} {result["status"]:>4} {result["p50_ms"]:>8.1f} ms '
+                                  f'{result["queries"]:>4} queries {result["rss_mb"]:>7.1f} MB')
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'cold_cache': options['cold'],
+                'rows': {model._meta.label: model.objects.count() for model in COUNTED_MODELS},
+            },
+            'routes': routes,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.compare(json.load(f), report, options['threshold'])
+
+    def get_user(self, username):
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+        user = users.order_by('pk').first()
+        if user is None:
+            raise CommandError(f'No user {username!r}' if username else 'No superuser; pass --username')
+        return user
+
+    def route_urls(self, query):
+        """{route name: URL} with path arguments filled from the newest rows"""
+        urls = {}
+        for pattern in urlpatterns:
+            if pattern.name in SKIPPED:
+                continue
+            kwargs = {}
+            for key in pattern.pattern.converters:
+                if key in URL_VALUES:
+                    kwargs[key] = URL_VALUES[key]
+                    continue
+                obj = URL_OBJECTS[key].objects.order_by('-pk').first()
+                if obj is None:
+                    break
+                kwargs[key] = obj.pk
+            else:
+                url = reverse(pattern.name, kwargs=kwargs)
+                queried = pattern.name.startswith('search_') or pattern.name in QUERIED
+                urls[pattern.name] = f'{url}?query={query}' if queried else url
+                continue
+            self.stderr.write(f'Skipping {pattern.name}: no {URL_OBJECTS[key].__name__} rows (run seed_hospital)')
+        return urls
+
+    def bench_route(self, client, user, name, url, options):
+        latencies = []
+        rss_before = rss_bytes()
+        for i in range(options['repeat'] + 1):
+            session = client.cookies.get(settings.SESSION_COOKIE_NAME)
+            if name in ANONYMOUS:
+                client.logout()
+            elif session is None or not session.value:  # first request, or the logout route ended it
+                client.force_login(user)
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    for chunk in response.streaming_content:
+                        pass
+                elapsed = time.perf_counter() - started
+            if i:  # the first request only warms up
+                latencies.append(elapsed)
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(cuts[49] * 1000, 2),
+            'p95_ms': round(cuts[94] * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+            'queries': len(queries),
+            'rss_mb': round(rss_bytes() / 2 ** 20, 1),
+            'rss_growth_kb': (rss_bytes() - rss_before) // 1024,
+        }
+
+    def compare(self, baseline, report, threshold):
+        old_meta, new_meta = baseline.get('meta', {}), report['meta']
+        self.stdout.write(f'\nCompared with {old_meta.get("revision") or "baseline"} '
+                          f'({old_meta.get("created", "?")}):')
+        if old_meta.get('rows') != new_meta['rows']:
+            self.stdout.write(self.style.WARNING('Row counts differ between the runs; latencies are not comparable'))
+        regressions = 0
+        for name, new in report['routes'].items():
+            old = baseline.get('routes', {}).get(name)
+            if old is None:
+                self.stdout.write(f'{name:<26} new route')
+                continue
+            change = (new['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            line = (f'{name:<26} p50 {old["p50_ms"]:>8.1f} -> {new["p50_ms"]:>8.1f} ms ({change:+6.1f}%)  '
+                    f'queries {old["queries"]:>3} -> {new["queries"]:>3}')
+            if change > threshold or new['queries'] > old['queries']:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(line)
+        self.stdout.write(f'{regressions} route(s) slower by more than {threshold:g}% or issuing more queries')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from hospital import caching
+
+
+class Command(BaseCommand):
+    help = ('Show hit/miss counts for the cached pages and fragments. With the local-memory backend '
+            'each process keeps its own counters, so this only sees the file or shared cache backends')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = caching.stats()
+        if not stats:
+            self.stdout.write('No cache activity recorded.')
+        for name, counts in stats.items():
+            total = counts['hits'] + counts['misses']
+            rate = counts['hits'] / total * 100 if total else 0
+            self.stdout.write(f'{name:<20} {counts["hits"]:>8} hits {counts["misses"]:>8} misses {rate:>6.1f}% hit rate')
+        if options['reset']:
+            caching.reset_stats()
+            self.stdout.write('Counters reset.')
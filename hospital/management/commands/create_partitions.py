@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from hospital import partitioning
+
+
+class Command(BaseCommand):
+    help = ('Create the monthly Bill and Attendance partitions for the current month and the next --months '
+            'months (PostgreSQL). Run it from cron, e.g. daily, so inserts never fall into the DEFAULT partition')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=partitioning.MONTHS_AHEAD, help='Months ahead to create')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not partitioning.supported(connection):
+            raise CommandError('Partitioning needs PostgreSQL')
+        for table in partitioning.PARTITIONED:
+            if not partitioning.is_partitioned(connection, table):
+                raise CommandError(f'{table} is not partitioned; run migrate first')
+            created = partitioning.create_partitions(connection, table, options['months'])
+            names = ', '.join(partitioning.partition_name(table, month) for month in created) or 'nothing new'
+            self.stdout.write(f'{table}: {names}')
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from hospital import partitioning
+
+
+def month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise CommandError(f'Expected a month as YYYY-MM, got {value!r}')
+
+
+class Command(BaseCommand):
+    help = ('Detach the monthly Bill and Attendance partitions older than --before (PostgreSQL). '
+            'Detaching only changes the catalog; the month stays behind as a plain table to archive, '
+            'unless --drop is given')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=month, required=True, help='First month to keep (YYYY-MM)')
+        parser.add_argument('--drop', action='store_true', help='Drop the detached tables')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not partitioning.supported(connection):
+            raise CommandError('Partitioning needs PostgreSQL')
+        for table in partitioning.PARTITIONED:
+            old = [start for start in partitioning.partitions(connection, table) if start < options['before']]
+            for start in old:
+                partitioning.detach_partition(connection, table, start, drop=options['drop'])
+            verb = 'dropped' if options['drop'] else 'detached'
+            names = ', '.join(partitioning.partition_name(table, start) for start in old) or 'nothing'
+            self.stdout.write(f'{table}: {verb} {names}')
@@ -0,0 +1,148 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.forms import modelform_factory
+
+from hospital import caching, changelog
+from hospital.forms import DoctorForm, PatientForm
+from hospital.models import DashboardStats, Doctor, Patient
+
+
+def read_rows(path, fmt):
+    """Yield (line_number, row_dict, error) for each record, one at a time"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row, None
+            return
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, line.rstrip('\n'), f'invalid JSON: {exc}'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, row, 'expected a JSON object'
+                continue
+            yield line_number, row, None
+
+
+class Command(BaseCommand):
+    help = ('Bulk import patients or doctors from a CSV or JSONL file, validating each row '
+            'with the admission forms and inserting in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['patients', 'doctors'])
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--rejects', help='Where to write rejected rows (default: <path>.rejects.jsonl)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, insert nothing')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+        batch_size = options['batch_size']
+        rejects_path = Path(options['rejects'] or f'{path}.rejects.jsonl')
+
+        if options['kind'] == 'patients':
+            model = Patient
+            # consult_doctor is resolved by name from an in-memory map instead of a query per row
+            form_class = modelform_factory(Patient, form=PatientForm,
+                                           exclude=[*PatientForm._meta.exclude, 'consult_doctor'])
+            doctors = self.doctor_lookup()
+        else:
+            model, form_class, doctors = Doctor, DoctorForm, None
+
+        imported = rejected = 0
+        batch = []
+        rejects_file = None
+        started = time.perf_counter()
+        try:
+            for line_number, row, error in read_rows(path, fmt):
+                instance = None
+                if error is None:
+                    instance, error = self.build(form_class, row, doctors)
+                if instance is None:
+                    if rejects_file is None:
+                        rejects_file = open(rejects_path, 'w', encoding='utf-8')
+                    rejects_file.write(json.dumps({'line': line_number, 'row': row, 'errors': error}) + '\n')
+                    rejected += 1
+                    continue
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    imported += self.flush(model, batch, options['dry_run'])
+                    batch = []
+                    self.report(imported, rejected, started)
+            imported += self.flush(model, batch, options['dry_run'])
+        finally:
+            if rejects_file is not None:
+                rejects_file.close()
+
+        elapsed = time.perf_counter() - started
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {imported} {options["kind"]} in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/s), {rejected} rejected'
+        ))
+        if rejected:
+            self.stdout.write(f'Rejected rows written to {rejects_path}')
+
+    def doctor_lookup(self):
+        """Map case-folded doctor name to its did, or None where the name is ambiguous"""
+        lookup = {}
+        for name, did in Doctor.objects.values_list('doctor_name', 'did').iterator():
+            key = name.strip().casefold()
+            lookup[key] = None if key in lookup else did
+        return lookup
+
+    def build(self, form_class, row, doctors):
+        """Validate one row; return (unsaved instance, None) or (None, errors)"""
+        form = form_class(data=row)
+        errors = {} if form.is_valid() else {field: list(messages) for field, messages in form.errors.items()}
+        doctor_id = None
+        if doctors is not None:
+            name = (row.get('consult_doctor') or '').strip().casefold()
+            if not name:
+                errors['consult_doctor'] = ['This field is required.']
+            elif name not in doctors:
+                errors['consult_doctor'] = [f'No doctor named {row["consult_doctor"]!r}.']
+            elif doctors[name] is None:
+                errors['consult_doctor'] = [f'More than one doctor is named {row["consult_doctor"]!r}.']
+            else:
+                doctor_id = doctors[name]
+        if errors:
+            return None, errors
+        instance = form.save(commit=False)
+        if doctors is not None:
+            instance.consult_doctor_id = doctor_id
+        return instance, None
+
+    def flush(self, model, batch, dry_run):
+        """Insert one batch in its own transaction and keep the dashboard counters in step"""
+        if not batch or dry_run:
+            return len(batch)
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+            # bulk_create skips the post_save handlers that maintain the counters, cache versions and change log
+            caching.invalidate(model)
+            changelog.record_created(model, batch)
+            if model is Patient:
+                DashboardStats.bump(total_patients=len(batch),
+                                    admitted_patients=sum(p.is_admitted for p in batch))
+            else:
+                DashboardStats.bump(total_doctors=len(batch))
+        return len(batch)
+
+    def report(self, imported, rejected, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  {imported} imported, {rejected} rejected, '
+                          f'{imported / elapsed if elapsed else 0:.0f} rows/s')
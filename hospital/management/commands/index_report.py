@@ -0,0 +1,137 @@
+import re
+from contextlib import nullcontext
+from datetime import timedelta
+from inspect import unwrap
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from hospital import partitioning, views
+from hospital.forms import DateRangeForm
+from hospital.models import Feedback
+from hospital.pagination import paginate_keyset
+from hospital.replicas import replica_alias, use_replica
+
+# Plan lines that read a whole table: "Seq Scan on x" (PostgreSQL) or
+# "SCAN x" without an index (SQLite)
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'SCAN (\w+)(?! USING (?:COVERING )?INDEX)\s*$'),
+}
+# Monthly partitions named in a PostgreSQL plan; the ones missing were pruned
+PARTITION_PATTERN = re.compile(rf'\b((?:{"|".join(partitioning.PARTITIONED)})_(?:p\d{{4}}_\d{{2}}|default))\b')
+# A server-side cursor (QuerySet.iterator() on PostgreSQL) is logged with its DECLARE
+DECLARE_PREFIX = re.compile(r'^DECLARE .*? CURSOR .*? FOR ', re.IGNORECASE | re.DOTALL)
+
+
+def _list_page(state, queryset, keys, **params):
+    """Run a keyset list page's 304 check and page query for ``params``"""
+    request = RequestFactory().get('/', params)
+
+    def run():
+        if state is not None:
+            state(request)
+        paginate_keyset(request, queryset(request), keys(request))
+    return run
+
+
+def _export(view, **params):
+    """Run an export view up to its first row; the rest of the rows come from the same query"""
+    request = RequestFactory().get('/', {'format': 'ndjson', **params})
+
+    def run():
+        response = unwrap(view)(request)  # without login_required
+        # Not response.close(): that sends request_finished, which closes the database connection
+        next(iter(response.streaming_content), None)
+    return run
+
+
+def view_queries():
+    """(label, callable) running what each list, report and export page runs.
+
+    Built from the views' own helpers, so the queries explained are the ones
+    the pages send.
+    """
+    today = timezone.localdate()
+    last_month = {'start_date': today - timedelta(days=30), 'end_date': today}
+    form = DateRangeForm(last_month)
+    queries = [
+        ('patient_list', _list_page(views._patient_list_state, views._patients, lambda r: views.PATIENT_KEYS)),
+        ('patient_list ?admitted=1', _list_page(views._patient_list_state, views._patients,
+                                                lambda r: views.PATIENT_KEYS, admitted=1)),
+        ('bill_list', _list_page(views._bill_list_state, views._bills, views._bill_keys)),
+        ('bill_list ?status=pending', _list_page(views._bill_list_state, views._bills, views._bill_keys,
+                                                 status='pending')),
+        ('bill_list ?sort=total', _list_page(views._bill_list_state, views._bills, views._bill_keys, sort='total')),
+        ('feedback_list', _list_page(None, lambda r: Feedback.objects.all(), lambda r: views.FEEDBACK_KEYS)),
+    ]
+    reports = [
+        ('dashboard', views.dashboard_queries()),
+        ('admission_report', views.admission_report_queries(form)),
+        ('revenue_report', views.revenue_report_queries(form)),
+        ('attendance_report', views.attendance_report_queries(form)),
+    ]
+    queries += [(f'{report} {name}', query) for report, report_queries in reports
+                for name, query in report_queries.items()]
+    queries += [
+        ('admission export', _export(views.export_admission_report, **last_month)),
+        ('revenue export', _export(views.export_revenue_report, **last_month)),
+        ('attendance export', _export(views.export_attendance_report, **last_month)),
+    ]
+    return queries
+
+
+def explain(connection, sql):
+    """The plan of a captured statement, one line per plan node"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+        # PostgreSQL returns the plan text; SQLite (id, parent, notused, detail) rows
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queries the list, report and export views send and flag sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default',
+                            help='default, or the replica alias to explain the reports as they run there')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just flagged ones')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in ('default', replica_alias()):
+            raise CommandError(f'The views only read from "default" and the replica, not {alias!r}')
+        connection = connections[alias]
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.stderr.write(f'No scan detector for the {connection.vendor} backend')
+            return
+
+        explained = flagged = 0
+        for label, run in view_queries():
+            with use_replica() if alias != 'default' else nullcontext(), \
+                    CaptureQueriesContext(connection) as captured:
+                run()
+            statements = [DECLARE_PREFIX.sub('', query['sql']) for query in captured]
+            statements = [sql for sql in statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))]
+            for number, sql in enumerate(statements, 1):
+                name = f'{label} #{number}' if len(statements) > 1 else label
+                plan = explain(connection, sql)
+                explained += 1
+                scans = [m.group(1) for line in plan.splitlines() if (m := pattern.search(line.strip()))]
+                if scans:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f'SEQ SCAN  {name}: {", ".join(scans)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'indexed   {name}'))
+                touched = sorted(set(PARTITION_PATTERN.findall(plan)))
+                if touched:
+                    self.stdout.write(f'          {len(touched)} partitions scanned: {", ".join(touched)}')
+                if scans or options['verbose_plans']:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        self.stdout.write(f'{flagged} of {explained} queries use a sequential scan. '
+                          'Small tables are often scanned on purpose; re-check against production-sized data.')
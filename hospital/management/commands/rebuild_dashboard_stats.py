@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from hospital.models import DashboardStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters from the patient, doctor and bill tables'
+
+    def handle(self, *args, **options):
+        stats = DashboardStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Dashboard stats rebuilt: {stats.total_patients} patients '
+            f'({stats.admitted_patients} admitted), {stats.total_doctors} doctors, '
+            f'revenue {stats.total_revenue}'
+        ))
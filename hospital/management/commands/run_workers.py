@@ -0,0 +1,53 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from hospital import tasks
+
+
+def _worker(stop, poll_interval, burst):
+    # The parent's SIGINT/SIGTERM handler sets ``stop``; a worker finishes its current task first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    try:
+        tasks.work(stop, poll_interval, burst)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = ('Run a pool of worker processes that claim queued tasks from the database and run them. '
+            'Stop with Ctrl+C or SIGTERM; running tasks are finished first')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=2, help='Worker processes')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        # Workers are forked from this process, so none of them may inherit its connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        workers = [context.Process(target=_worker, args=(stop, options['poll'], options['burst']),
+                                   name=f'hospital-worker-{i}') for i in range(options['concurrency'])]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {len(workers)} workers (pids {", ".join(str(w.pid) for w in workers)})')
+
+        def shut_down(signum, frame):
+            self.stdout.write('Stopping: waiting for running tasks to finish')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shut_down)
+        signal.signal(signal.SIGTERM, shut_down)
+        for worker in workers:
+            worker.join()
+        failed = [worker.name for worker in workers if worker.exitcode]
+        if failed:
+            raise CommandError(f'Workers exited abnormally: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('All workers stopped'))
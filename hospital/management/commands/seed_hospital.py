@@ -0,0 +1,256 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from hospital import caching
+from hospital.models import (Attendance, Bed, BedStay, Bill, DashboardStats, Doctor, Feedback, Patient,
+                             RevenueDailyRollup, UserProfile, Ward)
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan', 'Kabir',
+               'Ananya', 'Diya', 'Saanvi', 'Aadhya', 'Kavya', 'Priya', 'Meera', 'Isha', 'Riya', 'Neha']
+LAST_NAMES = ['Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Patel', 'Reddy', 'Iyer', 'Nair', 'Das',
+              'Mehta', 'Joshi', 'Mishra', 'Yadav', 'Chauhan', 'Pandey', 'Rao', 'Bose', 'Sinha', 'Khan']
+CITIES = ['Patna', 'Delhi', 'Mumbai', 'Kolkata', 'Chennai', 'Pune', 'Lucknow', 'Jaipur']
+CASES = [
+    ('Fever and cough', 'Viral fever'), ('Chest pain', 'Angina'), ('Abdominal pain', 'Gastritis'),
+    ('Headache', 'Migraine'), ('Fracture', 'Closed fracture of radius'), ('Breathlessness', 'Asthma'),
+    ('High blood sugar', 'Type 2 diabetes'), ('Joint pain', 'Osteoarthritis'), ('Rash', 'Dermatitis'),
+    ('Dizziness', 'Hypertension'),
+]
+QUALIFICATIONS = ['MBBS', 'MBBS, MD', 'MBBS, MS', 'MBBS, DNB', 'MBBS, MD, DM']
+WARD_TYPES = ['General', 'Pediatrics', 'Maternity', 'Orthopedics', 'Cardiology', 'ICU']
+FEEDBACK = ['Good care', 'Staff were helpful', 'Long waiting time', 'Clean wards', 'Billing was slow']
+# Weighted so reports have a realistic mix
+PAYMENT_STATUSES = ['paid'] * 6 + ['pending'] * 3 + ['partial']
+PAYMENT_METHODS = ['cash', 'card', 'upi', 'upi', 'insurance', 'other']
+ATTENDANCE_STATUSES = ['present'] * 16 + ['absent', 'leave', 'leave', 'half_day']
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep generated dates instead of auto_now_add's now()"""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Bulk-insert deterministic synthetic doctors, wards, staff, patients, bills, attendance and '
+            'feedback for load testing, then rebuild the derived tables')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000)
+        parser.add_argument('--bills-per-patient', type=int, default=2)
+        parser.add_argument('--days', type=int, default=365, help='Spread admissions over this many days')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day of generated data (default: today)')
+        parser.add_argument('--doctors', type=int, help='Default: one per 200 patients, at least 10')
+        parser.add_argument('--wards', type=int, default=20)
+        parser.add_argument('--staff', type=int, default=50, help='Staff users, each with one attendance row per day')
+        parser.add_argument('--feedback', type=int, help='Default: one per 10 patients')
+        parser.add_argument('--seed', type=int, default=42, help='Same seed and --until give the same data')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.until = options['until'] or timezone.localdate()
+        self.start = self.until - timedelta(days=options['days'] - 1)
+        patients = options['patients']
+        started = time.perf_counter()
+
+        doctor_ids = self.seed_doctors(options['doctors'] or max(10, patients // 200))
+        wards = self.seed_wards(options['wards'])
+        staff_ids = self.seed_staff(options['staff'])
+        self.seed_patients_and_bills(patients, options['bills_per_patient'], doctor_ids, staff_ids)
+        self.seed_attendance(staff_ids)
+        self.seed_feedback(options['feedback'] if options['feedback'] is not None else patients // 10)
+        self.fill_beds(wards)
+
+        self.step('Rebuilding dashboard stats and revenue rollup')
+        DashboardStats.rebuild()
+        RevenueDailyRollup.rebuild()
+        caching.invalidate(Doctor, Ward, Patient, Bill, Bed, UserProfile)
+        self.stdout.write(self.style.SUCCESS(f'Seeded in {time.perf_counter() - started:.1f}s'))
+
+    # ==================== Helpers ====================
+
+    def step(self, message):
+        self.stdout.write(message)
+
+    def insert(self, model, rows, label):
+        """bulk_create ``rows`` in batches, one transaction each; return the saved objects"""
+        started = time.perf_counter()
+        saved = []
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                saved.extend(model.objects.bulk_create(batch))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'  {len(saved)} {label} ({len(saved) / elapsed if elapsed else 0:.0f} rows/s)')
+        return saved
+
+    def name(self):
+        return f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+
+    def moment(self, day):
+        """A time during ``day`` in the current time zone"""
+        at = datetime.combine(day, datetime.min.time()) + timedelta(seconds=self.rng.randrange(8 * 3600, 20 * 3600))
+        return timezone.make_aware(at)
+
+    # ==================== Seeders ====================
+
+    def seed_doctors(self, count):
+        self.step('Doctors')
+        rows = (
+            Doctor(doctor_name=f'Dr. {self.name()}', father_name=self.name(), gender=self.rng.choice(['male', 'female']),
+                   dob=date(1960, 1, 1) + timedelta(days=self.rng.randrange(30 * 365)),
+                   address=f'{self.rng.randrange(1, 500)} {self.rng.choice(CITIES)} Road',
+                   qualification=self.rng.choice(QUALIFICATIONS), experience=self.rng.randrange(1, 35),
+                   last_worked_hospital=f'{self.rng.choice(CITIES)} General Hospital',
+                   salary=Decimal(self.rng.randrange(50, 300) * 1000))
+            for i in range(count)
+        )
+        return [doctor.did for doctor in self.insert(Doctor, rows, 'doctors')]
+
+    def seed_wards(self, count):
+        self.step('Wards')
+        rows = (
+            Ward(ward_name=f'{self.rng.choice(WARD_TYPES)} Ward {i + 1}', ward_type=self.rng.choice(WARD_TYPES),
+                 ward_mode=self.rng.choice(['Open', 'Private', 'Semi-private']), total_beds=self.rng.randrange(10, 60),
+                 cost=Decimal(self.rng.randrange(5, 50) * 100), room_type=self.rng.choice(['ac', 'non_ac']))
+            for i in range(count)
+        )
+        wards = self.insert(Ward, rows, 'wards')
+        # bulk_create skips the post_save signal that creates the beds
+        for ward in wards:
+            ward.sync_beds()
+        return wards
+
+    def seed_staff(self, count):
+        self.step('Staff')
+        offset = User.objects.filter(username__startswith='seed_staff_').count()
+        unusable = make_password(None)
+        users = self.insert(User, (
+            User(username=f'seed_staff_{offset + i}', password=unusable, first_name=self.rng.choice(FIRST_NAMES),
+                 last_name=self.rng.choice(LAST_NAMES))
+            for i in range(count)
+        ), 'staff users')
+        self.insert(UserProfile, (
+            UserProfile(user=user, role=self.rng.choice(['staff', 'staff', 'receptionist', 'doctor']),
+                        gender=self.rng.choice(['male', 'female']), dob=date(1985, 1, 1),
+                        address='Staff Quarters', city=self.rng.choice(CITIES),
+                        mobile_no=f'8{self.rng.randrange(10 ** 9):09d}')
+            for user in users
+        ), 'staff profiles')
+        return [user.pk for user in users]
+
+    def seed_patients_and_bills(self, count, bills_per_patient, doctor_ids, staff_ids):
+        self.step('Patients and bills')
+        admission_date = Patient._meta.get_field('admission_date')
+        bill_date = Bill._meta.get_field('bill_date')
+        days = (self.until - self.start).days + 1
+        now = timezone.now()
+        patients_saved = bills_saved = 0
+        started = time.perf_counter()
+        with explicit_timestamps(admission_date, bill_date):
+            for batch_start in range(0, count, self.batch_size):
+                patients = []
+                for i in range(batch_start, min(batch_start + self.batch_size, count)):
+                    problem, diagnosis = self.rng.choice(CASES)
+                    admitted_at = self.moment(self.start + timedelta(days=self.rng.randrange(days)))
+                    discharged_at = admitted_at + timedelta(hours=self.rng.randrange(4, 14 * 24))
+                    first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                    patients.append(Patient(
+                        patient_name=f'{first} {last}', age=self.rng.randrange(1, 95),
+                        gender=self.rng.choice(['male', 'female', 'other']),
+                        address=f'{self.rng.randrange(1, 900)} {self.rng.choice(CITIES)} Road',
+                        consult_doctor_id=self.rng.choice(doctor_ids), problem=problem, diagnosis=diagnosis,
+                        admission_date=admitted_at,
+                        discharge_date=discharged_at if discharged_at < now else None,
+                        is_admitted=discharged_at >= now,
+                        fee=Decimal(self.rng.randrange(2, 20) * 100), mobile_number=f'9{i:09d}',
+                        email=f'{first}.{last}{i}@example.com'.lower(),
+                    ))
+                bills = []
+                with transaction.atomic():
+                    for patient in Patient.objects.bulk_create(patients):
+                        end = patient.discharge_date or now
+                        span = max(int((end - patient.admission_date).total_seconds()), 1)
+                        for k in range(bills_per_patient):
+                            bills.append(Bill(
+                                patient_id=patient.pid, consult_doctor_id=patient.consult_doctor_id,
+                                diagnosis=patient.diagnosis, contact_number=patient.mobile_number,
+                                amount=Decimal(self.rng.randrange(500, 200000)) / 4,
+                                bill_date=patient.admission_date + timedelta(seconds=self.rng.randrange(span)),
+                                payment_status=self.rng.choice(PAYMENT_STATUSES),
+                                payment_method=self.rng.choice(PAYMENT_METHODS),
+                                created_by_id=self.rng.choice(staff_ids) if staff_ids else None,
+                            ))
+                    Bill.objects.bulk_create(bills, batch_size=self.batch_size)
+                patients_saved += len(patients)
+                bills_saved += len(bills)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'  {patients_saved} patients, {bills_saved} bills '
+                                  f'({(patients_saved + bills_saved) / elapsed if elapsed else 0:.0f} rows/s)')
+
+    def seed_attendance(self, staff_ids):
+        self.step('Attendance')
+        days = (self.until - self.start).days + 1
+
+        def rows():
+            for offset in range(days):
+                day = self.start + timedelta(days=offset)
+                for staff_id in staff_ids:
+                    status = self.rng.choice(ATTENDANCE_STATUSES)
+                    worked = status in ('present', 'half_day')
+                    yield Attendance(staff_id=staff_id, date_of_attendance=day, status=status,
+                                     incoming_time='09:00' if worked else None,
+                                     outgoing_time=('13:00' if status == 'half_day' else '17:00') if worked else None,
+                                     task_involved='Ward rounds' if worked else '')
+        self.insert(Attendance, rows(), 'attendance records')
+
+    def seed_feedback(self, count):
+        self.step('Feedback')
+        created_at = Feedback._meta.get_field('created_at')
+        days = (self.until - self.start).days + 1
+        with explicit_timestamps(created_at):
+            self.insert(Feedback, (
+                Feedback(username=self.name(), email=f'visitor{i}@example.com', message=self.rng.choice(FEEDBACK),
+                         created_at=self.moment(self.start + timedelta(days=self.rng.randrange(days))))
+                for i in range(count)
+            ), 'feedback messages')
+
+    def fill_beds(self, wards):
+        """Give the most recently admitted patients the free beds of the new wards"""
+        self.step('Beds')
+        free = list(Bed.objects.filter(ward__in=wards, occupied_by__isnull=True).order_by('ward', 'number'))
+        patients = (Patient.objects.filter(is_admitted=True, bed__isnull=True)
+                    .order_by('-admission_date').values_list('pid', flat=True)[:len(free)])
+        stays = []
+        for bed, pid in zip(free, patients):
+            bed.occupied_by_id = pid
+            stays.append(BedStay(bed=bed, patient_id=pid))
+        with transaction.atomic():
+            Bed.objects.bulk_update(free[:len(stays)], ['occupied_by'], batch_size=self.batch_size)
+            BedStay.objects.bulk_create(stays, batch_size=self.batch_size)
+        self.stdout.write(f'  {len(stays)} of {len(free)} free beds occupied')
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:21
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# GIN trigram indexes backing hospital.search on PostgreSQL. They are
+# skipped on other backends, where search falls back to icontains.
+TRIGRAM_INDEXES = [
+    ('hospital_patient_name_trgm', 'hospital_patient', 'patient_name'),
+    ('hospital_patient_email_trgm', 'hospital_patient', 'email'),
+    ('hospital_doctor_name_trgm', 'hospital_doctor', 'doctor_name'),
+    ('hospital_doctor_qualification_trgm', 'hospital_doctor', 'qualification'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0001_initial'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AlterField(
+            model_name='patient',
+            name='mobile_number',
+            field=models.CharField(db_index=True, max_length=15),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
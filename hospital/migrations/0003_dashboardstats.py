@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:22
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_stats(apps, schema_editor):
+    Patient = apps.get_model('hospital', 'Patient')
+    Doctor = apps.get_model('hospital', 'Doctor')
+    Bill = apps.get_model('hospital', 'Bill')
+    DashboardStats = apps.get_model('hospital', 'DashboardStats')
+    DashboardStats.objects.update_or_create(pk=1, defaults={
+        'total_patients': Patient.objects.count(),
+        'admitted_patients': Patient.objects.filter(is_admitted=True).count(),
+        'total_doctors': Doctor.objects.count(),
+        'total_revenue': Bill.objects.aggregate(total=Sum('amount'))['total'] or 0,
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_patients', models.IntegerField(default=0)),
+                ('admitted_patients', models.IntegerField(default=0)),
+                ('total_doctors', models.IntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name_plural': 'dashboard stats',
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
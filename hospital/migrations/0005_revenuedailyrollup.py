@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    Bill = apps.get_model('hospital', 'Bill')
+    RevenueDailyRollup = apps.get_model('hospital', 'RevenueDailyRollup')
+    rows = (Bill.objects.annotate(day=TruncDate('bill_date'))
+            .values('day', 'consult_doctor_id', 'payment_method', 'payment_status')
+            .annotate(bill_count=Count('bid'), total=Sum('amount'))
+            .order_by())
+    RevenueDailyRollup.objects.bulk_create([
+        RevenueDailyRollup(date=row['day'], doctor_id=row['consult_doctor_id'], payment_method=row['payment_method'],
+                           payment_status=row['payment_status'], bill_count=row['bill_count'], amount=row['total'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0004_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('payment_method', models.CharField(blank=True, choices=[('cash', 'Cash'), ('card', 'Card'), ('upi', 'UPI'), ('insurance', 'Insurance'), ('other', 'Other')], max_length=20, null=True)),
+                ('payment_status', models.CharField(choices=[('paid', 'Paid'), ('pending', 'Pending'), ('partial', 'Partial')], max_length=20)),
+                ('bill_count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('doctor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hospital.doctor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'doctor', 'payment_method', 'payment_status'], name='revenue_rollup_key_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_beds(apps, schema_editor):
+    Ward = apps.get_model('hospital', 'Ward')
+    Bed = apps.get_model('hospital', 'Bed')
+    Bed.objects.bulk_create([
+        Bed(ward_id=wid, number=number)
+        for wid, total_beds in Ward.objects.values_list('wid', 'total_beds').iterator()
+        for number in range(1, total_beds + 1)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0005_revenuedailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Bed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('occupied_by', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bed', to='hospital.patient')),
+                ('ward', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='beds', to='hospital.ward')),
+            ],
+            options={
+                'ordering': ['ward', 'number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BedStay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('bed', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stays', to='hospital.bed')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bed_stays', to='hospital.patient')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bed',
+            index=models.Index(condition=models.Q(('occupied_by__isnull', True)), fields=['ward', 'number'], name='bed_free_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bed',
+            constraint=models.UniqueConstraint(fields=('ward', 'number'), name='bed_ward_number_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='bedstay',
+            constraint=models.UniqueConstraint(condition=models.Q(('ended_at__isnull', True)), fields=('bed',), name='bedstay_one_open_per_bed'),
+        ),
+        migrations.AddConstraint(
+            model_name='bedstay',
+            constraint=models.UniqueConstraint(condition=models.Q(('ended_at__isnull', True)), fields=('patient',), name='bedstay_one_open_per_patient'),
+        ),
+        migrations.RunPython(create_beds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:13
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0008_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillDocument',
+            fields=[
+                ('bill', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='hospital.bill')),
+                ('html', models.BinaryField()),
+                ('etag', models.CharField(max_length=64)),
+                ('rendered_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
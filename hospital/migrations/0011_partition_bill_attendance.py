@@ -0,0 +1,154 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:05
+
+from datetime import date, datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Rebuilds hospital_bill and hospital_attendance as tables partitioned by
+# month on PostgreSQL (see hospital/partitioning.py). Every row is copied
+# once inside the migration's transaction, so run it in a maintenance window
+# on a large database. Other backends are left untouched.
+#
+# The code below is a frozen copy of what hospital/partitioning.py did when
+# this migration was written; later changes there must not alter it.
+
+# table -> (partition column, primary key column)
+PARTITIONED = {
+    'hospital_bill': ('bill_date', 'bid'),
+    'hospital_attendance': ('date_of_attendance', 'id'),
+}
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+    return cursor.fetchone() is not None
+
+
+def create_partition(connection, cursor, table, month):
+    """Create ``table``'s partition for ``month``; the DEFAULT partition is still empty here"""
+    column, _ = PARTITIONED[table]
+    quote = connection.ops.quote_name
+    cursor.execute('SELECT data_type FROM information_schema.columns '
+                   'WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s', [table, column])
+    timestamp = cursor.fetchone()[0].startswith('timestamp')
+    # Timestamps start at local midnight like the reports' day ranges
+    bounds = [timezone.make_aware(datetime(m.year, m.month, 1)) if timestamp else m
+              for m in (month, add_months(month, 1))]
+    cursor.execute(f'CREATE TABLE {quote(f"{table}_p{month:%Y_%m}")} PARTITION OF {quote(table)} '
+                   'FOR VALUES FROM (%s) TO (%s)', bounds)
+
+
+def _definitions(cursor, table):
+    """Constraints and indexes of ``table`` as (name, kind, definition) and CREATE INDEX statements"""
+    cursor.execute("SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+                   "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f', 'c') ORDER BY contype, conname",
+                   [table])
+    constraints = cursor.fetchall()
+    cursor.execute('SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s '
+                   'AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass) '
+                   'ORDER BY indexname', [table, table])
+    return constraints, [row[0] for row in cursor.fetchall()]
+
+
+def _rebuild(connection, table, partition):
+    """Copy ``table`` into a new partitioned (or, reversing, plain) table of the same name"""
+    column, pk = PARTITIONED[table]
+    quote = connection.ops.quote_name
+    old = f'{table}_old'
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, table) == partition:
+            return
+        constraints, indexes = _definitions(cursor, table)
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [table, pk])
+        sequence = cursor.fetchone()[0]
+        cursor.execute('SELECT is_identity FROM information_schema.columns '
+                       'WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s', [table, pk])
+        identity = cursor.fetchone()[0] == 'YES'
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(old)}')
+        # Partitioned tables take their key from a plain sequence (identity columns need PostgreSQL 17)
+        if identity:
+            cursor.execute(f'ALTER TABLE {quote(old)} ALTER COLUMN {quote(pk)} DROP IDENTITY')
+            cursor.execute(f'CREATE SEQUENCE {sequence}')
+        else:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+            cursor.execute(f'ALTER TABLE {quote(old)} ALTER COLUMN {quote(pk)} DROP DEFAULT')
+
+        partition_by = f' PARTITION BY RANGE ({quote(column)})' if partition else ''
+        cursor.execute(f'CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING STORAGE)'
+                       f'{partition_by}')
+        if partition:
+            cursor.execute(f'CREATE TABLE {quote(f"{table}_default")} PARTITION OF {quote(table)} DEFAULT')
+            current = timezone.localdate().replace(day=1)
+            cursor.execute(f'SELECT min({quote(column)}) FROM {quote(old)}')
+            first = cursor.fetchone()[0]
+            if first is not None:
+                first = (timezone.localtime(first).date() if isinstance(first, datetime) else first).replace(day=1)
+            month = min(first or current, current)
+            while month <= add_months(current, MONTHS_AHEAD):
+                create_partition(connection, cursor, table, month)
+                month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(old)}')
+        cursor.execute(f'DROP TABLE {quote(old)} CASCADE')
+
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = f'PRIMARY KEY ({quote(pk)}, {quote(column)})' if partition else f'PRIMARY KEY ({quote(pk)})'
+            elif kind == 'u' and partition and column not in definition:
+                raise ValueError(f'{table}: unique constraint {name} must include {column} to be partitioned')
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+        for statement in indexes:
+            cursor.execute(statement)
+
+        if partition:
+            cursor.execute(f'ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} '
+                           f"SET DEFAULT nextval('{sequence}')")
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.{quote(pk)}')
+        else:
+            # CASCADE drops only the defaults that partitions detached by detach_partitions still take from it
+            cursor.execute(f'DROP SEQUENCE {sequence} CASCADE')
+            cursor.execute(f'ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} ADD GENERATED BY DEFAULT AS IDENTITY')
+        # The next key follows the copied rows
+        cursor.execute(f'SELECT setval(pg_get_serial_sequence(%s, %s), coalesce(max({quote(pk)}), 0) + 1, false) '
+                       f'FROM {quote(table)}', [table, pk])
+        cursor.execute(f'ANALYZE {quote(table)}')
+
+
+def partition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in PARTITIONED:
+        _rebuild(schema_editor.connection, table, partition=True)
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in PARTITIONED:
+        _rebuild(schema_editor.connection, table, partition=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0010_updated_at'),
+    ]
+
+    operations = [
+        # A foreign key to a partitioned table must reference its whole (bid, bill_date) key
+        migrations.AlterField(
+            model_name='billdocument',
+            name='bill',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='hospital.bill'),
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
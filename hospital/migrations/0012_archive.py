@@ -0,0 +1,108 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Patient and ArchivedPatient as one relation for the history pages. Keep the
+# column lists in step with both models.
+COLUMNS = ('pid, patient_name, age, gender, address, consult_doctor_id, problem, admission_date, discharge_date, '
+           'is_admitted, fee, diagnosis, mobile_number, email, updated_at')
+CREATE_VIEW = (f'CREATE VIEW hospital_patienthistory AS '
+               f'SELECT {COLUMNS}, FALSE AS archived FROM hospital_patient '
+               f'UNION ALL SELECT {COLUMNS}, TRUE AS archived FROM hospital_archivedpatient')
+DROP_VIEW = 'DROP VIEW hospital_patienthistory'
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0011_partition_bill_attendance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientHistory',
+            fields=[
+                ('pid', models.IntegerField(primary_key=True, serialize=False)),
+                ('patient_name', models.CharField(max_length=100)),
+                ('age', models.IntegerField()),
+                ('gender', models.CharField(choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')], max_length=10)),
+                ('address', models.TextField()),
+                ('problem', models.CharField(max_length=200)),
+                ('admission_date', models.DateTimeField()),
+                ('discharge_date', models.DateTimeField(blank=True, null=True)),
+                ('is_admitted', models.BooleanField()),
+                ('fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('diagnosis', models.TextField()),
+                ('mobile_number', models.CharField(max_length=15)),
+                ('email', models.EmailField(max_length=254)),
+                ('updated_at', models.DateTimeField()),
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'verbose_name_plural': 'patient history',
+                'db_table': 'hospital_patienthistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPatient',
+            fields=[
+                ('pid', models.IntegerField(primary_key=True, serialize=False)),
+                ('patient_name', models.CharField(max_length=100)),
+                ('age', models.IntegerField()),
+                ('gender', models.CharField(choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')], max_length=10)),
+                ('address', models.TextField()),
+                ('problem', models.CharField(max_length=200)),
+                ('admission_date', models.DateTimeField()),
+                ('discharge_date', models.DateTimeField(blank=True, null=True)),
+                ('is_admitted', models.BooleanField(default=False)),
+                ('fee', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('diagnosis', models.TextField()),
+                ('mobile_number', models.CharField(db_index=True, max_length=15)),
+                ('email', models.EmailField(max_length=254)),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('consult_doctor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hospital.doctor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedBill',
+            fields=[
+                ('bid', models.IntegerField(primary_key=True, serialize=False)),
+                ('diagnosis', models.CharField(max_length=200)),
+                ('contact_number', models.CharField(max_length=15)),
+                ('amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('bill_date', models.DateTimeField()),
+                ('payment_status', models.CharField(choices=[('paid', 'Paid'), ('pending', 'Pending'), ('partial', 'Partial')], default='pending', max_length=20)),
+                ('payment_method', models.CharField(blank=True, choices=[('cash', 'Cash'), ('card', 'Card'), ('upi', 'UPI'), ('insurance', 'Insurance'), ('other', 'Other')], max_length=20, null=True)),
+                ('updated_at', models.DateTimeField()),
+                ('consult_doctor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hospital.doctor')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bills', to='hospital.archivedpatient')),
+            ],
+            options={
+                'ordering': ['-bill_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBedStay',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('bed', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hospital.bed')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bed_stays', to='hospital.archivedpatient')),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedpatient',
+            index=models.Index(fields=['-admission_date', '-pid'], name='archived_patient_admission_idx'),
+        ),
+        migrations.RunSQL(CREATE_VIEW, DROP_VIEW),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:05
+
+from django.conf import settings
+from django.db import migrations
+
+# Case-insensitive prefix indexes backing hospital.search.autocomplete_* on
+# PostgreSQL. ``istartswith`` compiles to UPPER(column::text) LIKE 'ABC%',
+# which text_pattern_ops can answer whatever the database collation. They
+# are skipped on other backends.
+PREFIX_INDEXES = [
+    ('hospital_patient_name_prefix', 'hospital_patient', 'patient_name'),
+    ('hospital_doctor_name_prefix', 'hospital_doctor', 'doctor_name'),
+    ('hospital_user_username_prefix', 'auth_user', 'username'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in PREFIX_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} (UPPER({column}::text) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0013_changeevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def start_heartbeats(apps, schema_editor):
+    # Tasks running during the deploy are judged by when they started until their worker beats
+    Task = apps.get_model('hospital', 'Task')
+    Task.objects.filter(status='running').update(heartbeat_at=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0014_autocomplete_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_running_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_heartbeats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'running')), fields=['heartbeat_at'], name='task_running_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:40
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_unstarted_jobs(apps, schema_editor):
+    # Their pickled queries are not read back; the admin can run the action again
+    BulkJob = apps.get_model('hospital', 'BulkJob')
+    BulkJob.objects.filter(status__in=['pending', 'running']).update(
+        status='failed', error='Stopped by an upgrade; run the action again.', finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0015_task_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_unstarted_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bulkjob',
+            name='query',
+        ),
+        migrations.AddField(
+            model_name='bulkjob',
+            name='selection',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 13:10
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_keys(apps, schema_editor):
+    # Rows written before the constraint could repeat a key; fold each set into its oldest row
+    RevenueDailyRollup = apps.get_model('hospital', 'RevenueDailyRollup')
+    key = ['date', 'doctor_id', 'payment_method', 'payment_status']
+    duplicates = (RevenueDailyRollup.objects.values(*key)
+                  .annotate(rows=Count('pk'), first=Min('pk'), bills=Sum('bill_count'), total=Sum('amount'))
+                  .filter(rows__gt=1).order_by())
+    for row in duplicates:
+        RevenueDailyRollup.objects.filter(pk=row['first']).update(bill_count=row['bills'], amount=row['total'])
+        RevenueDailyRollup.objects.filter(**{field: row[field] for field in key}).exclude(pk=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0016_bulkjob_selection'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_keys, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='revenuedailyrollup',
+            name='revenue_rollup_key_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='revenuedailyrollup',
+            constraint=models.UniqueConstraint(models.F('date'), django.db.models.functions.comparison.Coalesce('doctor', models.Value(0)), django.db.models.functions.comparison.Coalesce('payment_method', models.Value('')), models.F('payment_status'), name='revenue_rollup_key_unique'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.1 on 2026-10-17 14:20
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Round, TruncDate
+
+
+def rebuild_rollup(apps, schema_editor):
+    # Rebuilt rather than patched: GST has to be rounded per bill, so it cannot be derived from the stored amounts
+    RevenueDailyRollup = apps.get_model('hospital', 'RevenueDailyRollup')
+    money = models.DecimalField(max_digits=14, decimal_places=2)
+    rate = Value(Decimal(str(getattr(settings, 'HOSPITAL_GST_RATE', '0.18'))), output_field=money)
+    rows = {}
+    for model in ('Bill', 'ArchivedBill'):
+        grouped = (apps.get_model('hospital', model).objects
+                   .annotate(day=TruncDate('bill_date'), gst=Round(F('amount') * rate, 2, output_field=money))
+                   .values('day', 'consult_doctor_id', 'payment_method', 'payment_status')
+                   .annotate(bill_count=Count('bid'), total=Sum('amount'), gst_total=Sum('gst'))
+                   .order_by())
+        for row in grouped:
+            key = (row['day'], row['consult_doctor_id'], row['payment_method'], row['payment_status'])
+            sums = rows.setdefault(key, [0, 0, 0])
+            sums[0] += row['bill_count']
+            sums[1] += row['total']
+            sums[2] += row['gst_total']
+    RevenueDailyRollup.objects.all().delete()
+    RevenueDailyRollup.objects.bulk_create([
+        RevenueDailyRollup(date=day, doctor_id=doctor_id, payment_method=method, payment_status=status,
+                           bill_count=bill_count, amount=amount, gst_amount=gst, gross_amount=amount + gst)
+        for (day, doctor_id, method, status), (bill_count, amount, gst) in rows.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0017_revenue_rollup_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='revenuedailyrollup',
+            name='gross_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='revenuedailyrollup',
+            name='gst_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(rebuild_rollup, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,34 @@
 # Create your models here.
 # hospital/models.py
-from django.db import models
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce, Round, TruncDate
 from django.contrib.auth.models import User
-from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from decimal import ROUND_HALF_UP, Decimal
+
+
+def gst_rate():
+    """GST rate charged on bills, from settings.HOSPITAL_GST_RATE (default 18%)"""
+    return Decimal(str(getattr(settings, 'HOSPITAL_GST_RATE', '0.18')))
+
+def gst_percent():
+    """The GST rate as a percentage for bill labels: '18', '12.5'"""
+    return f'{(gst_rate() * 100).normalize():f}'
+
+def bill_gst(amount):
+    """GST on one bill, rounded to the paisa like BillTotalsQuerySet.with_totals()"""
+    return (Decimal(str(amount or 0)) * gst_rate()).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+class ChangeLoggedQuerySet(models.QuerySet):
+    """QuerySet whose ``update()`` is recorded in the change log (hospital/changelog.py)"""
+
+    def update(self, **kwargs):
+        from .changelog import logged_update
+
+        return logged_update(self, super().update, **kwargs)
 
 # This replaces the 'SignUp' and 'Login' tables using Django's built-in Auth
 class UserProfile(models.Model):
@@ -36,6 +62,7 @@ class Doctor(models.Model):
     experience = models.IntegerField()
     last_worked_hospital = models.CharField(max_length=100)
     salary = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.doctor_name
@@ -54,8 +81,22 @@ class Patient(models.Model):
     is_admitted = models.BooleanField(default=True)
     fee = models.DecimalField(max_digits=10, decimal_places=2)
     diagnosis = models.TextField()
-    mobile_number = models.CharField(max_length=15)
+    mobile_number = models.CharField(max_length=15, db_index=True)
     email = models.EmailField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = ChangeLoggedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # patient_list / dashboard keyset order
+            models.Index(fields=['-admission_date', '-pid'], name='patient_admission_idx'),
+            # ?admitted=1 and the admission report's status split
+            models.Index(fields=['is_admitted', '-admission_date'], name='patient_status_admission_idx'),
+            # admitted patients are a small slice of the table
+            models.Index(fields=['-admission_date'], name='patient_admitted_idx',
+                         condition=models.Q(is_admitted=True)),
+        ]
 
     def __str__(self):
         return f"{self.patient_name} (PID: {self.pid})"
@@ -69,10 +110,60 @@ class Ward(models.Model):
     total_beds = models.IntegerField()
     cost = models.DecimalField(max_digits=10, decimal_places=2)
     room_type = models.CharField(max_length=20) # AC/Non-AC
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.ward_name
 
+    def sync_beds(self):
+        """Make the ward's Bed rows match total_beds.
+
+        Missing beds are created; free beds numbered above total_beds are
+        removed, occupied ones stay until their patient is discharged.
+        """
+        existing = set(self.beds.values_list('number', flat=True))
+        Bed.objects.bulk_create([Bed(ward=self, number=n) for n in range(1, self.total_beds + 1) if n not in existing])
+        self.beds.filter(number__gt=self.total_beds, occupied_by__isnull=True).delete()
+
+class Bed(models.Model):
+    """One physical bed in a ward; ``occupied_by`` is the patient in it, if any"""
+    ward = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='beds')
+    number = models.PositiveIntegerField()
+    occupied_by = models.OneToOneField(Patient, on_delete=models.SET_NULL, null=True, blank=True, related_name='bed')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ['ward', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['ward', 'number'], name='bed_ward_number_unique'),
+        ]
+        indexes = [
+            # allocation scans a ward's free beds in number order
+            models.Index(fields=['ward', 'number'], name='bed_free_idx', condition=models.Q(occupied_by__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.ward.ward_name} bed {self.number}"
+
+class BedStay(models.Model):
+    """A patient's time in one bed, opened on admission and closed on discharge"""
+    bed = models.ForeignKey(Bed, on_delete=models.CASCADE, related_name='stays')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='bed_stays')
+    started_at = models.DateTimeField(auto_now_add=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        constraints = [
+            models.UniqueConstraint(fields=['bed'], condition=models.Q(ended_at__isnull=True),
+                                    name='bedstay_one_open_per_bed'),
+            models.UniqueConstraint(fields=['patient'], condition=models.Q(ended_at__isnull=True),
+                                    name='bedstay_one_open_per_patient'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient.patient_name} in {self.bed}"
+
 class Attendance(models.Model):
     STATUS_CHOICES = [
         ('present', 'Present'),
@@ -92,10 +183,31 @@ class Attendance(models.Model):
     class Meta:
         unique_together = ['staff', 'date_of_attendance']
         ordering = ['-date_of_attendance']
+        indexes = [
+            models.Index(fields=['date_of_attendance', 'status'], name='attendance_date_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.staff.username} - {self.date_of_attendance} ({self.status})"
 
+class BillTotalsQuerySet(models.QuerySet):
+    """GST and gross amounts in SQL, for Bill and ArchivedBill"""
+
+    def with_totals(self):
+        """Annotate ``gst_amount`` and ``gross_amount`` computed by the database.
+
+        Unlike the ``tax_amount`` / ``total_amount`` properties these can be
+        filtered, ordered and aggregated on.
+        """
+        money = models.DecimalField(max_digits=14, decimal_places=2)
+        gst = Round(F('amount') * Value(gst_rate(), output_field=money), 2, output_field=money)
+        return self.annotate(gst_amount=gst).annotate(
+            gross_amount=Round(F('amount') + F('gst_amount'), 2, output_field=money)
+        )
+
+class BillQuerySet(ChangeLoggedQuerySet, BillTotalsQuerySet):
+    pass
+
 class Bill(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('paid', 'Paid'),
@@ -122,19 +234,129 @@ class Bill(models.Model):
     payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='pending')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='bills_created')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    objects = BillQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # bill_list / revenue report keyset order
+            models.Index(fields=['-bill_date', '-bid'], name='bill_date_idx'),
+            models.Index(fields=['payment_status', '-bill_date'], name='bill_status_date_idx'),
+        ]
     
     def __str__(self):
         return f"Bill #{self.bid} - {self.patient.patient_name}"
     
     @property
     def tax_amount(self):
-        """Calculate 18% GST"""
-        return self.amount * Decimal('0.18')
+        """Calculate GST at the configured rate"""
+        return self.amount * gst_rate()
     
     @property
     def total_amount(self):
         """Total including tax"""
         return self.amount + self.tax_amount
+
+class BillDocument(models.Model):
+    """The print view of a paid bill, rendered once and served as stored bytes.
+
+    Deleted whenever the bill is saved again (hospital/signals.py), so the
+    next print renders it afresh. See hospital/bill_documents.py.
+    """
+    # No database-level foreign key: on PostgreSQL hospital_bill is partitioned by month
+    # (hospital/partitioning.py) and its key is (bid, bill_date). Deletes still cascade in Django.
+    bill = models.OneToOneField(Bill, on_delete=models.CASCADE, primary_key=True, related_name='document',
+                                db_constraint=False)
+    html = models.BinaryField()
+    etag = models.CharField(max_length=64)
+    rendered_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Document for bill #{self.bill_id}"
+
+class RevenueDailyRollup(models.Model):
+    """Bill count, pre-tax amount, GST and gross total per (day, doctor, payment method, status).
+
+    Maintained incrementally by the bill signal handlers and read by the
+    revenue report instead of aggregating the Bill table. Each key has one
+    row, enforced by the database; ``manage.py backfill_revenue_rollup``
+    rebuilds the table from Bill, e.g. after HOSPITAL_GST_RATE changes. GST
+    is rounded per bill before it is summed, as on the bills themselves.
+    """
+    date = models.DateField()
+    doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, related_name='+')
+    payment_method = models.CharField(max_length=20, choices=Bill.PAYMENT_METHOD_CHOICES, null=True, blank=True)
+    payment_status = models.CharField(max_length=20, choices=Bill.PAYMENT_STATUS_CHOICES)
+    bill_count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gst_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # NULLs never collide in a unique index, so bills without a doctor or payment method are keyed
+            # on a stand-in value (no doctor has pk 0); this works on every backend and PostgreSQL version
+            models.UniqueConstraint(F('date'), Coalesce('doctor', Value(0)), Coalesce('payment_method', Value('')),
+                                    F('payment_status'), name='revenue_rollup_key_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.payment_status}: {self.amount}"
+
+    @classmethod
+    def add(cls, date, doctor_id, payment_method, payment_status, bill_count, amount, gst_amount, gross_amount):
+        """Add ``bill_count`` bills worth ``amount`` (``gst_amount`` and ``gross_amount`` with tax) to one key"""
+        key = {'date': date, 'doctor_id': doctor_id, 'payment_method': payment_method, 'payment_status': payment_status}
+        sums = {'bill_count': bill_count, 'amount': amount, 'gst_amount': gst_amount, 'gross_amount': gross_amount}
+        # A writer that loses the race to create the row gets it back from get_or_create and adds to it
+        row, created = cls.objects.get_or_create(defaults=sums, **key)
+        if not created:
+            cls.objects.filter(pk=row.pk).update(**{field: F(field) + value for field, value in sums.items()})
+
+    @classmethod
+    def add_bill(cls, state, sign=1):
+        """Add (sign=1) or remove (sign=-1) one bill given its field values"""
+        amount = Decimal(str(state['amount'] or 0))
+        gst = bill_gst(amount)
+        cls.add(timezone.localdate(state['bill_date']), state['consult_doctor_id'], state['payment_method'],
+                state['payment_status'], sign, sign * amount, sign * gst, sign * (amount + gst))
+
+    @staticmethod
+    def group_bills(bills):
+        """Aggregate a Bill (or ArchivedBill) queryset into rollup-shaped rows"""
+        return (bills.with_totals().annotate(day=TruncDate('bill_date'))
+                .values('day', 'consult_doctor_id', 'payment_method', 'payment_status')
+                .annotate(bill_count=Count('bid'), total=Sum('amount'), gst=Sum('gst_amount'),
+                          gross=Sum('gross_amount'))
+                .order_by())
+
+    @classmethod
+    def rebuild(cls):
+        """Replace the whole table with a fresh GROUP BY over Bill and ArchivedBill.
+
+        Runs as a single INSERT ... SELECT so the rows never leave the database.
+        """
+        # group_bills() output name -> rollup field
+        keys = {'day': 'date', 'consult_doctor_id': 'doctor', 'payment_method': 'payment_method',
+                'payment_status': 'payment_status'}
+        quote = connection.ops.quote_name
+        sums = {'bill_count': 'bill_count', 'total': 'amount', 'gst': 'gst_amount', 'gross': 'gross_amount'}
+        columns = ', '.join(quote(cls._meta.get_field(field).column) for field in [*keys.values(), *sums.values()])
+        aliases = ', '.join(quote(name) for name in keys)
+        totals = ', '.join(f'SUM({quote(name)})' for name in sums)
+        # Archived bills still count (hospital/archive.py), in the same row as live bills of the same key
+        selects, params = [], []
+        for bills in (Bill.objects.all(), ArchivedBill.objects.all()):
+            select_sql, select_params = cls.group_bills(bills).query.sql_with_params()
+            selects.append(select_sql)
+            params.extend(select_params)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cls.objects.all().delete()
+            cursor.execute(f'INSERT INTO {quote(cls._meta.db_table)} ({columns}) '
+                           f'SELECT {aliases}, {totals} '
+                           f'FROM ({" UNION ALL ".join(selects)}) grouped GROUP BY {aliases}', params)
+        return cls.objects.count()
     
 class Feedback(models.Model):
     # Fields mapped from readfeedback.jsp
@@ -145,6 +367,259 @@ class Feedback(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='feedback_created_idx'),
+        ]
     
     def __str__(self):
-        return f"Feedback from {self.username} - {self.created_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"Feedback from {self.username} - {self.created_at.strftime('%Y-%m-%d')}"
+
+class DashboardStats(models.Model):
+    """Single-row table of running totals shown on the dashboard.
+
+    Kept current by the signal handlers in hospital/signals.py so the
+    dashboard reads one row instead of counting the tables. Run
+    ``manage.py rebuild_dashboard_stats`` to recompute it from scratch.
+    """
+    total_patients = models.IntegerField(default=0)
+    admitted_patients = models.IntegerField(default=0)
+    total_doctors = models.IntegerField(default=0)
+    total_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = 'dashboard stats'
+
+    def __str__(self):
+        return f"Dashboard stats ({self.total_patients} patients)"
+
+    @classmethod
+    def load(cls):
+        """Return the stats row, building it on first use"""
+        stats = cls.objects.filter(pk=1).first()
+        return stats if stats is not None else cls.rebuild()
+
+    @classmethod
+    def bump(cls, **deltas):
+        """Atomically add ``deltas`` to the named counters"""
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        if changes and not cls.objects.filter(pk=1).update(**changes):
+            cls.rebuild()
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every counter from the source tables"""
+        stats, _ = cls.objects.update_or_create(pk=1, defaults={
+            # Archived patients and bills still count (hospital/archive.py)
+            'total_patients': Patient.objects.count() + ArchivedPatient.objects.count(),
+            'admitted_patients': Patient.objects.filter(is_admitted=True).count(),
+            'total_doctors': Doctor.objects.count(),
+            'total_revenue': ((Bill.objects.aggregate(total=Sum('amount'))['total'] or 0)
+                              + (ArchivedBill.objects.aggregate(total=Sum('amount'))['total'] or 0)),
+        })
+        return stats
+
+class BulkJob(models.Model):
+    """An admin bulk action running in the background, see hospital/bulk_jobs.py"""
+    ACTION_CHOICES = [
+        ('discharge_patients', 'Discharge patients'),
+        ('mark_bills_paid', 'Mark bills as paid'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    action = models.CharField(max_length=40, choices=ACTION_CHOICES)
+    # Primary keys the admin selected, as [first, last] runs of consecutive keys
+    selection = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(null=True, blank=True)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='bulk_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_action_display()} #{self.pk} ({self.status})"
+
+    @property
+    def progress(self):
+        """Percent of the selected rows processed so far"""
+        if self.status == 'done':
+            return 100
+        return self.processed * 100 // self.total if self.total else 0
+
+class Task(models.Model):
+    """A unit of background work in the database task queue, see hospital/tasks.py"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tasks')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # refreshed by the worker while it runs
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # workers claim the oldest due task
+            models.Index(fields=['run_at', 'id'], name='task_due_idx', condition=models.Q(status='queued')),
+            # running tasks whose worker stopped responding
+            models.Index(fields=['heartbeat_at'], name='task_running_idx', condition=models.Q(status='running')),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+class ChangeEvent(models.Model):
+    """One create, update or delete of a Patient or Bill, see hospital/changelog.py"""
+    ACTION_CHOICES = [
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('delete', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # the readers' cursor
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(encoder=DjangoJSONEncoder)  # {field: [old, new]}
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # one object's history
+            models.Index(fields=['model', 'object_id', 'id'], name='changeevent_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} {self.action}"
+
+# ==================== Archive ====================
+# Discharged patients moved out of the hot tables by ``manage.py archive_patients``
+# (hospital/archive.py), with their bills and bed stays. Rows keep their original keys.
+
+class ArchivedPatient(models.Model):
+    """A discharged patient moved out of Patient, with the same fields"""
+    pid = models.IntegerField(primary_key=True)
+    patient_name = models.CharField(max_length=100)
+    age = models.IntegerField()
+    gender = models.CharField(max_length=10, choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')])
+    address = models.TextField()
+    consult_doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, related_name='+')
+    problem = models.CharField(max_length=200)
+    admission_date = models.DateTimeField()
+    discharge_date = models.DateTimeField(null=True, blank=True)
+    is_admitted = models.BooleanField(default=False)
+    fee = models.DecimalField(max_digits=10, decimal_places=2)
+    diagnosis = models.TextField()
+    mobile_number = models.CharField(max_length=15, db_index=True)
+    email = models.EmailField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    archived = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-admission_date', '-pid'], name='archived_patient_admission_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.patient_name} (PID: {self.pid}, archived)"
+
+class ArchivedBill(models.Model):
+    """A bill of an archived patient"""
+    bid = models.IntegerField(primary_key=True)
+    patient = models.ForeignKey(ArchivedPatient, on_delete=models.CASCADE, related_name='bills')
+    consult_doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, related_name='+')
+    diagnosis = models.CharField(max_length=200)
+    contact_number = models.CharField(max_length=15)
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    bill_date = models.DateTimeField()
+    payment_status = models.CharField(max_length=20, choices=Bill.PAYMENT_STATUS_CHOICES, default='pending')
+    payment_method = models.CharField(max_length=20, choices=Bill.PAYMENT_METHOD_CHOICES, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    updated_at = models.DateTimeField()
+
+    tax_amount = Bill.tax_amount
+    total_amount = Bill.total_amount
+
+    objects = BillTotalsQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-bill_date']
+
+    def __str__(self):
+        return f"Bill #{self.bid} - {self.patient.patient_name} (archived)"
+
+class ArchivedBedStay(models.Model):
+    """A bed stay of an archived patient"""
+    id = models.IntegerField(primary_key=True)
+    bed = models.ForeignKey(Bed, on_delete=models.SET_NULL, null=True, related_name='+')
+    patient = models.ForeignKey(ArchivedPatient, on_delete=models.CASCADE, related_name='bed_stays')
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.patient.patient_name} in bed #{self.bed_id} (archived)"
+
+class PatientHistory(models.Model):
+    """Read-only view over Patient and ArchivedPatient together (migration 0012).
+
+    Used only when a page asks for history; filters are applied to both
+    tables, each through its own indexes.
+    """
+    pid = models.IntegerField(primary_key=True)
+    patient_name = models.CharField(max_length=100)
+    age = models.IntegerField()
+    gender = models.CharField(max_length=10, choices=[('male', 'Male'), ('female', 'Female'), ('other', 'Other')])
+    address = models.TextField()
+    consult_doctor = models.ForeignKey(Doctor, on_delete=models.DO_NOTHING, null=True, related_name='+',
+                                       db_constraint=False)
+    problem = models.CharField(max_length=200)
+    admission_date = models.DateTimeField()
+    discharge_date = models.DateTimeField(null=True, blank=True)
+    is_admitted = models.BooleanField()
+    fee = models.DecimalField(max_digits=10, decimal_places=2)
+    diagnosis = models.TextField()
+    mobile_number = models.CharField(max_length=15)
+    email = models.EmailField()
+    updated_at = models.DateTimeField()
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'hospital_patienthistory'
+        verbose_name_plural = 'patient history'
+
+    def __str__(self):
+        return f"{self.patient_name} (PID: {self.pid})"
@@ -0,0 +1,145 @@
+# hospital/pagination.py
+"""Keyset (cursor) pagination for the list views.
+
+Pages are addressed by the sort key of the row on their edge instead of an
+OFFSET, so fetching page 1000 costs the same single index range scan as
+fetching page 1.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, Value
+from django.db.models.functions import Cast
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def _page_size(request):
+    """Requested page size, capped at MAX_PAGE_SIZE"""
+    try:
+        size = int(request.GET.get('page_size', PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _jsonable(value):
+    """Lossless JSON form of a key value (datetimes keep their microseconds)"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Encode a tuple of key values as an opaque URL-safe token"""
+    raw = json.dumps([_jsonable(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _key_field(queryset, key):
+    """Model field or annotation output field that types ``key``"""
+    if key in queryset.query.annotations:
+        return queryset.query.annotations[key].output_field
+    return queryset.model._meta.get_field(key)
+
+
+def decode_cursor(cursor, queryset, keys):
+    """Decode a cursor back into typed key values, or None if it is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        return [_key_field(queryset, key).to_python(value) for key, value in zip(keys, values)]
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+def _keyset_filter(queryset, keys, values, lookup):
+    """Row-value comparison (k1, k2, ...) <op> (v1, v2, ...) spelled as ORed Q objects"""
+    # Annotations have no column type, so cast their cursor values explicitly
+    # (SQLite would otherwise compare a computed number against a text parameter)
+    values = [
+        Cast(Value(value), output_field=queryset.query.annotations[key].output_field)
+        if key in queryset.query.annotations else value
+        for key, value in zip(keys, values)
+    ]
+    condition = Q()
+    for i, key in enumerate(keys):
+        clause = Q(**{f'{key}__{lookup}': values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            clause &= Q(**{prev_key: prev_value})
+        condition |= clause
+    return condition
+
+
+class KeysetPage:
+    """One page of rows plus the links to its neighbours"""
+
+    def __init__(self, object_list, keys, request, has_next, has_previous):
+        self.object_list = object_list
+        self.keys = keys
+        self.has_next = has_next and bool(object_list)
+        self.has_previous = has_previous and bool(object_list)
+        self._params = request.GET.copy()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def _cursor_for(self, row):
+        # Rows are model instances, or dicts from a values() queryset
+        if isinstance(row, dict):
+            return encode_cursor([row[key] for key in self.keys])
+        return encode_cursor([getattr(row, key) for key in self.keys])
+
+    def _url(self, direction, row):
+        params = self._params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[direction] = self._cursor_for(row)
+        return '?' + params.urlencode()
+
+    @property
+    def next_url(self):
+        return self._url('after', self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_url(self):
+        return self._url('before', self.object_list[0]) if self.has_previous else None
+
+
+def paginate_keyset(request, queryset, keys):
+    """Return a KeysetPage of ``queryset`` ordered by ``keys`` descending.
+
+    ``keys`` must end with a unique column (normally the primary key) so the
+    ordering is total and no row is skipped or repeated between pages. Keys
+    may name annotations on ``queryset`` as well as model fields.
+    """
+    size = _page_size(request)
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+
+    values = decode_cursor(before, queryset, keys) if before else None
+    if values is not None:
+        # Walk backwards: ascending from the cursor, then flip the page
+        rows = list(queryset.filter(_keyset_filter(queryset, keys, values, 'gt')).order_by(*keys)[:size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size][::-1]
+        return KeysetPage(rows, keys, request, has_next=True, has_previous=has_previous)
+
+    queryset = queryset.order_by(*[f'-{key}' for key in keys])
+    values = decode_cursor(after, queryset, keys) if after else None
+    if values is not None:
+        queryset = queryset.filter(_keyset_filter(queryset, keys, values, 'lt'))
+    rows = list(queryset[:size + 1])
+    has_next = len(rows) > size
+    return KeysetPage(rows[:size], keys, request, has_next=has_next, has_previous=values is not None)
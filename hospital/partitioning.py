@@ -0,0 +1,142 @@
+# hospital/partitioning.py
+"""Monthly range partitioning of the Bill and Attendance tables on PostgreSQL.
+
+Both tables only ever grow, and every report filters them on their date
+column. Each table is split into one partition per calendar month, plus a
+DEFAULT partition for rows no month partition covers yet. A report over a
+date range then scans only the months it touches; EXPLAIN shows this as
+partition pruning, listing only those partitions. Each month's indexes stay
+small. A month that is no longer needed is removed with DETACH PARTITION,
+a catalog change, instead of a DELETE.
+
+Migration 0011 converts the existing tables and keeps their rows, indexes
+and constraints. It carries its own frozen copy of the code it runs, so
+changes here do not alter it. ``manage.py create_partitions`` adds months
+ahead of time, and ``manage.py detach_partitions`` removes old ones.
+PostgreSQL requires the primary key of a partitioned table to include the
+partition column, so the key becomes (pk, date column). Django still treats
+the single pk column as the key. Other backends keep plain tables.
+"""
+import re
+from datetime import date, datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+# table -> (partition column, primary key column)
+PARTITIONED = {
+    'hospital_bill': ('bill_date', 'bid'),
+    'hospital_attendance': ('date_of_attendance', 'id'),
+}
+MONTHS_AHEAD = 3
+
+_PARTITION_NAME = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def supported(connection):
+    return connection.vendor == 'postgresql'
+
+
+def add_months(month, count):
+    """First day of the month ``count`` months after ``month``"""
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition(table):
+    return f'{table}_default'
+
+
+def _quote(connection, name):
+    return connection.ops.quote_name(name)
+
+
+def _is_timestamp(cursor, table, column):
+    cursor.execute('SELECT data_type FROM information_schema.columns '
+                   'WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s', [table, column])
+    return cursor.fetchone()[0].startswith('timestamp')
+
+
+def _bound(timestamp, month):
+    """Start of ``month`` in the column's type; timestamps start at local midnight like the reports' day ranges"""
+    return timezone.make_aware(datetime(month.year, month.month, 1)) if timestamp else month
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [table])
+        return cursor.fetchone() is not None
+
+
+def partitions(connection, table):
+    """First day of every month that has a partition, oldest first"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+                       'WHERE i.inhparent = to_regclass(%s)', [table])
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(date(int(m.group(1)), int(m.group(2)), 1) for name in names if (m := _PARTITION_NAME.search(name)))
+
+
+def create_partition(connection, table, month):
+    """Create ``table``'s partition for ``month`` unless it exists; True if it was created.
+
+    Rows for that month that already landed in the DEFAULT partition are
+    moved into the new partition in the same transaction.
+    """
+    column, _ = PARTITIONED[table]
+    name = partition_name(table, month)
+    parent, child, default = (_quote(connection, n) for n in (table, name, default_partition(table)))
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+        if cursor.fetchone()[0]:
+            return False
+        timestamp = _is_timestamp(cursor, table, column)
+        bounds = [_bound(timestamp, month), _bound(timestamp, add_months(month, 1))]
+        in_month = f'{_quote(connection, column)} >= %s AND {_quote(connection, column)} < %s'
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_month})', bounds)
+        if not cursor.fetchone()[0]:
+            cursor.execute(f'CREATE TABLE {child} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)', bounds)
+            return True
+        # A new partition may not overlap rows the DEFAULT partition holds
+        cursor.execute(f'ALTER TABLE {parent} DETACH PARTITION {default}')
+        cursor.execute(f'CREATE TABLE {child} PARTITION OF {parent} FOR VALUES FROM (%s) TO (%s)', bounds)
+        cursor.execute(f'INSERT INTO {child} SELECT * FROM {default} WHERE {in_month}', bounds)
+        cursor.execute(f'DELETE FROM {default} WHERE {in_month}', bounds)
+        cursor.execute(f'ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT')
+    return True
+
+
+def create_partitions(connection, table, months_ahead=MONTHS_AHEAD, today=None):
+    """Make sure every month up to ``months_ahead`` after the current one has a partition.
+
+    Returns the months created.
+    """
+    current = (today or timezone.localdate()).replace(day=1)
+    months = [add_months(current, n) for n in range(months_ahead + 1)]
+    return [month for month in months if create_partition(connection, table, month)]
+
+
+def detach_partition(connection, table, month, drop=False):
+    """Detach ``month``'s partition, leaving it as a plain table (or dropping it); False if there is none.
+
+    A kept table loses its foreign keys, which would otherwise stop the rows
+    it refers to (e.g. archived patients, see hospital/archive.py) from being deleted.
+    """
+    name = partition_name(table, month)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+        if not cursor.fetchone()[0]:
+            return False
+        cursor.execute(f'ALTER TABLE {_quote(connection, table)} DETACH PARTITION {_quote(connection, name)}')
+        if drop:
+            cursor.execute(f'DROP TABLE {_quote(connection, name)}')
+        else:
+            cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'", [name])
+            for (constraint,) in cursor.fetchall():
+                cursor.execute(f'ALTER TABLE {_quote(connection, name)} DROP CONSTRAINT {_quote(connection, constraint)}')
+    return True
+
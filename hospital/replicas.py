@@ -0,0 +1,143 @@
+# hospital/replicas.py
+"""Read-only report and search traffic on a read replica.
+
+Views wrapped in ``@replica_reads``, and code inside ``with use_replica():``,
+read from the database alias named by HOSPITAL_REPLICA_DB (``'replica'`` by
+default). All other reads, and every write, go to ``default``. When that
+alias is not in DATABASES the router changes nothing.
+
+A replica runs slightly behind the primary, so a user who has just saved
+something could see a page that does not have it yet. To prevent that,
+ReplicaStickinessMiddleware watches for writes made while it handles a
+request and answers with a short-lived cookie. For
+HOSPITAL_REPLICA_STICKY_SECONDS afterwards, that user's replica reads go
+to the primary instead. A request that writes also reads from the primary
+for the rest of that request.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_SECONDS = getattr(settings, 'HOSPITAL_REPLICA_STICKY_SECONDS', 10)
+STICKY_COOKIE = 'hospital_primary'
+# Sessions are written on many requests but never read from the replica
+UNTRACKED_APPS = {'sessions'}
+
+_replica_reads = ContextVar('hospital_replica_reads', default=False)
+_request = ContextVar('hospital_replica_request', default=None)
+
+
+class RequestRouting:
+    """What the router needs to know about the request being handled"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned  # the user wrote within the sticky window
+        self.wrote = False
+
+
+def replica_alias():
+    """The configured replica alias, or None if there is none"""
+    alias = getattr(settings, 'HOSPITAL_REPLICA_DB', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def use_replica():
+    """Send the reads made inside the block to the replica"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """Run ``view`` (sync or async) inside use_replica()"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            with use_replica():
+                return await view(*args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with use_replica():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Routes reads inside use_replica() to the replica and records writes"""
+
+    def __init__(self, replica=None):
+        self.replica = replica  # None: HOSPITAL_REPLICA_DB, if configured
+
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get():
+            return None
+        routing = _request.get()
+        if routing is not None and (routing.pinned or routing.wrote):
+            return DEFAULT_DB_ALIAS
+        return self.replica or replica_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _request.get()
+        if routing is not None and model._meta.app_label not in UNTRACKED_APPS:
+            routing.wrote = True
+        # Explicitly, so rows read from the replica are never saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+
+class ReplicaStickinessMiddleware:
+    """Keep a user's replica reads on the primary for a while after they write"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request):
+        try:
+            pinned = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return RequestRouting(pinned)
+
+    def _finish(self, routing, response):
+        if routing.wrote:
+            # The expiry is checked here as well as by the browser
+            response.set_cookie(STICKY_COOKIE, str(time.time() + STICKY_SECONDS), max_age=STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = self._start(request)
+        token = _request.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self._finish(routing, response)
+
+    async def __acall__(self, request):
+        routing = self._start(request)
+        token = _request.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request.reset(token)
+        return self._finish(routing, response)
@@ -0,0 +1,142 @@
+# hospital/search.py
+"""Ranked search over patients, doctors and bills.
+
+On PostgreSQL text queries are matched with pg_trgm word similarity, which
+is served by the GIN trigram indexes created in migration 0002 and ranks
+close matches first. Purely numeric queries take an exact primary-key fast
+path (plus a mobile-number prefix match for patients) instead of casting the
+key to text; phone-like queries such as "+91 98..." or "98-..." also match
+mobile-number prefixes, as typed and as bare digits. Other databases (SQLite in tests) fall back to ``icontains``
+with a simple prefix-first ranking.
+
+The ``autocomplete_*`` functions back the form widgets' typeahead: a short,
+alphabetical list of case-insensitive prefix matches, served on PostgreSQL
+by the ``UPPER(column) text_pattern_ops`` indexes from migration 0014.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from django.contrib.auth.models import User
+
+from .models import Bill, Doctor, Patient, PatientHistory
+
+SEARCH_LIMIT = 50
+AUTOCOMPLETE_LIMIT = 20
+
+# Digits with the separators people type in phone numbers
+PHONE_PATTERN = re.compile(r'\+?\(?[0-9][0-9 ()-]*')
+
+
+def _is_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _numeric(query):
+    """Return the query as an int when it can only be an ID, else None"""
+    # isdigit() also accepts superscripts like '²', which int() rejects
+    return int(query) if query.isdecimal() else None
+
+
+def _mobile_prefix(query):
+    """Q matching mobile numbers starting with a phone-like ``query``, else None"""
+    if not PHONE_PATTERN.fullmatch(query):
+        return None
+    digits = re.sub(r'[^0-9]', '', query)
+    return Q(mobile_number__startswith=query) | Q(mobile_number__startswith=digits)
+
+
+def _text_search(queryset, query, fields, order):
+    """Filter ``queryset`` on ``fields`` and rank the matches"""
+    if _is_postgres(queryset):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similarities = [TrigramWordSimilarity(query, field) for field in fields]
+        rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__trigram_word_similar': query})
+        return queryset.filter(condition).annotate(rank=rank).order_by('-rank', *order)
+
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': query})
+    rank = Case(
+        When(**{f'{fields[0]}__istartswith': query}, then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    return queryset.filter(condition).annotate(rank=rank).order_by('-rank', *order)
+
+
+def search_patients(query, history=False):
+    """Patients matching a name, email, mobile number or PID; ``history`` includes archived ones"""
+    queryset = (PatientHistory if history else Patient).objects.select_related('consult_doctor')
+    number = _numeric(query)
+    if number is not None:
+        return queryset.filter(
+            Q(pid=number) | Q(mobile_number__startswith=query)
+        ).annotate(
+            rank=Case(When(pid=number, then=Value(2)), default=Value(1), output_field=IntegerField())
+        ).order_by('-rank', '-admission_date')[:SEARCH_LIMIT]
+    mobile = _mobile_prefix(query)
+    if mobile is not None:
+        return queryset.filter(mobile).order_by('-admission_date')[:SEARCH_LIMIT]
+    return _text_search(queryset, query, ['patient_name', 'email'], ['-admission_date'])[:SEARCH_LIMIT]
+
+
+def search_doctors(query):
+    """Doctors matching a name, qualification or DID"""
+    number = _numeric(query)
+    if number is not None:
+        return Doctor.objects.filter(did=number)
+    return _text_search(Doctor.objects.all(), query, ['doctor_name', 'qualification'], ['-did'])[:SEARCH_LIMIT]
+
+
+def search_bills(query):
+    """Bills matching a patient name or BID"""
+    queryset = Bill.objects.select_related('patient', 'consult_doctor')
+    number = _numeric(query)
+    if number is not None:
+        return queryset.filter(bid=number)
+    return _text_search(queryset, query, ['patient__patient_name'], ['-bill_date'])[:SEARCH_LIMIT]
+
+
+# ==================== Autocomplete ====================
+
+def autocomplete_patients(query):
+    """Patients whose name starts with ``query``, or with that PID or mobile number prefix"""
+    number = _numeric(query)
+    mobile = _mobile_prefix(query)
+    if number is not None:
+        matches = Patient.objects.filter(Q(pid=number) | mobile)
+    elif mobile is not None:
+        matches = Patient.objects.filter(mobile)
+    else:
+        matches = Patient.objects.filter(patient_name__istartswith=query)
+    return matches.only('pid', 'patient_name').order_by('patient_name', 'pid')[:AUTOCOMPLETE_LIMIT]
+
+
+def autocomplete_doctors(query):
+    """Doctors whose name starts with ``query``, or with that DID"""
+    number = _numeric(query)
+    if number is not None:
+        return Doctor.objects.filter(did=number).only('did', 'doctor_name')
+    return (Doctor.objects.filter(doctor_name__istartswith=query).only('did', 'doctor_name')
+            .order_by('doctor_name', 'did')[:AUTOCOMPLETE_LIMIT])
+
+
+def autocomplete_staff(query):
+    """Users whose username starts with ``query``"""
+    return (User.objects.filter(username__istartswith=query).only('id', 'username')
+            .order_by('username')[:AUTOCOMPLETE_LIMIT])
+
+
+# AutocompleteSelect source name -> lookup
+AUTOCOMPLETE = {
+    'patients': autocomplete_patients,
+    'doctors': autocomplete_doctors,
+    'staff': autocomplete_staff,
+}
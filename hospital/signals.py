@@ -0,0 +1,145 @@
+# hospital/signals.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import caching, changelog
+from .models import Bed, Bill, BillDocument, DashboardStats, Doctor, Patient, RevenueDailyRollup, UserProfile, Ward
+
+
+def _decimal(value):
+    return Decimal(str(value or 0))
+
+
+# ==================== Dashboard Counters & Revenue Rollup ====================
+
+@receiver(post_init, sender=Patient)
+def remember_admission_state(sender, instance, **kwargs):
+    """Remember is_admitted as loaded so a discharge can be detected on save"""
+    instance._was_admitted = instance.__dict__.get('is_admitted') if instance.pk else None
+
+
+@receiver(post_save, sender=Patient)
+def count_patient_save(sender, instance, created, **kwargs):
+    if created:
+        DashboardStats.bump(total_patients=1, admitted_patients=int(instance.is_admitted))
+    elif instance._was_admitted is not None and instance._was_admitted != instance.is_admitted:
+        DashboardStats.bump(admitted_patients=1 if instance.is_admitted else -1)
+    instance._was_admitted = instance.is_admitted
+
+
+@receiver(post_delete, sender=Patient)
+def count_patient_delete(sender, instance, **kwargs):
+    DashboardStats.bump(total_patients=-1, admitted_patients=-int(instance.is_admitted))
+
+
+@receiver(post_save, sender=Doctor)
+def count_doctor_save(sender, instance, created, **kwargs):
+    if created:
+        DashboardStats.bump(total_doctors=1)
+
+
+@receiver(post_delete, sender=Doctor)
+def count_doctor_delete(sender, instance, **kwargs):
+    DashboardStats.bump(total_doctors=-1)
+
+
+def _bill_state(instance):
+    """The Bill fields the counters and rollups depend on, or None if any is deferred"""
+    fields = ('amount', 'bill_date', 'consult_doctor_id', 'payment_method', 'payment_status')
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return {field: instance.__dict__[field] for field in fields}
+
+
+@receiver(post_init, sender=Bill)
+def remember_bill_state(sender, instance, **kwargs):
+    """Remember the bill as loaded so edits can be applied as a delta"""
+    instance._saved_state = _bill_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Bill)
+def count_bill_save(sender, instance, created, **kwargs):
+    old = None if created else instance._saved_state
+    new = _bill_state(instance)
+    if new is None or (old is None and not created):
+        return  # saved from a deferred instance, the delta is unknown
+    if old == new:
+        return
+    with transaction.atomic():
+        DashboardStats.bump(total_revenue=_decimal(new['amount']) - _decimal(old and old['amount']))
+        if old is not None:
+            RevenueDailyRollup.add_bill(old, sign=-1)
+        RevenueDailyRollup.add_bill(new)
+    instance._saved_state = new
+
+
+@receiver(post_delete, sender=Bill)
+def count_bill_delete(sender, instance, **kwargs):
+    state = _bill_state(instance)
+    if state is None:
+        return
+    with transaction.atomic():
+        DashboardStats.bump(total_revenue=-_decimal(state['amount']))
+        RevenueDailyRollup.add_bill(state, sign=-1)
+
+
+# ==================== Bill Documents ====================
+
+@receiver(post_save, sender=Bill)
+def discard_bill_document(sender, instance, created, **kwargs):
+    """An edited bill is printed afresh (see hospital/bill_documents.py)"""
+    if not created:
+        BillDocument.objects.filter(bill=instance).delete()
+
+
+# ==================== Beds ====================
+
+@receiver(post_save, sender=Ward)
+def sync_ward_beds(sender, instance, **kwargs):
+    """Keep one Bed row per bed as wards are added or resized"""
+    instance.sync_beds()
+
+
+# ==================== Change Log ====================
+
+@receiver(post_init, sender=Patient)
+@receiver(post_init, sender=Bill)
+def remember_logged_state(sender, instance, **kwargs):
+    """Remember the field values as loaded so a save can be logged as a diff"""
+    instance._logged_state = changelog.snapshot(instance) if instance.pk else {}
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=Bill)
+def log_save(sender, instance, created, using, **kwargs):
+    new = changelog.snapshot(instance)
+    old = instance._logged_state
+    if not created:
+        # Fields deferred when the row was loaded have no known old value
+        new = {name: value for name, value in new.items() if name in old}
+    changelog.record(sender, [(instance.pk, 'create' if created else 'update', changelog.diff(old, new))], using)
+    instance._logged_state = changelog.snapshot(instance)
+
+
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Bill)
+def log_delete(sender, instance, using, **kwargs):
+    changelog.record(sender, [(instance.pk, 'delete', changelog.diff(changelog.snapshot(instance), {}))], using)
+
+
+# ==================== Cache Versions ====================
+
+# Models that cached pages are built from (see hospital/caching.py)
+VERSIONED_MODELS = [Doctor, Ward, Patient, Bill, Bed, UserProfile]
+
+
+def invalidate_cached_model(sender, **kwargs):
+    caching.invalidate(sender)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(invalidate_cached_model, sender=model, dispatch_uid=f'cache-version-save-{model.__name__}')
+    post_delete.connect(invalidate_cached_model, sender=model, dispatch_uid=f'cache-version-delete-{model.__name__}')
@@ -0,0 +1,46 @@
+// Hospital Management System - autocomplete for AutocompleteSelect widgets (hospital/forms.py)
+//
+// The <select> is rendered with only its selected option. A search box is
+// added above it; typing fetches prefix matches from the widget's
+// data-autocomplete-url and puts them in the <select>, so the form still
+// submits the chosen id. Nothing is chosen for the user: the <select> stays
+// on its empty option unless exactly one row matches.
+
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.className = 'form-control mb-1';
+        input.placeholder = 'Type to search...';
+        input.autocomplete = 'off';
+        select.parentNode.insertBefore(input, select);
+
+        let searchTimeout;
+        let controller;
+        input.addEventListener('input', function () {
+            clearTimeout(searchTimeout);
+            searchTimeout = setTimeout(function () {
+                const query = input.value.trim();
+                if (!query) {
+                    return;
+                }
+                if (controller) {
+                    controller.abort();  // a newer query supersedes the one in flight
+                }
+                controller = new AbortController();
+                const url = select.dataset.autocompleteUrl + '?query=' + encodeURIComponent(query);
+                fetch(url, { signal: controller.signal, headers: { 'Accept': 'application/json' } })
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        const empty = select.querySelector('option[value=""]') || new Option('---------', '');
+                        select.replaceChildren(empty);
+                        data.results.forEach(function (row) {
+                            select.add(new Option(row.text, row.id));
+                        });
+                        select.value = data.results.length === 1 ? data.results[0].id : '';
+                    })
+                    .catch(function () {});
+            }, 250);
+        });
+    });
+});
@@ -0,0 +1,184 @@
+# hospital/tasks.py
+"""A small task queue kept in our own database.
+
+Functions decorated with ``@task`` are queued with ``enqueue()``, which only
+inserts a Task row, so the caller returns at once and can poll the
+``task_status`` endpoint. ``manage.py run_workers`` runs a pool of worker
+processes that claim due tasks with ``SELECT ... FOR UPDATE SKIP LOCKED``
+(each worker locks a different row instead of queueing on the first one)
+and run them outside any request.
+
+A task that raises is retried with exponential backoff until it has used
+``max_attempts``. While a task runs, its worker refreshes the row's
+``heartbeat_at`` every HOSPITAL_TASK_HEARTBEAT seconds from a background
+thread, however long the task takes. A running task with no heartbeat for
+HOSPITAL_TASK_STALL_TIMEOUT seconds lost its worker: it is queued again,
+or marked failed if it has no attempts left. A worker whose task was
+reclaimed meanwhile does not overwrite the new outcome. Tasks must be safe
+to run more than once, and their arguments and return value must be
+JSON-serializable.
+"""
+import os
+import socket
+import threading
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+RETRY_BACKOFF = getattr(settings, 'HOSPITAL_TASK_RETRY_BACKOFF', 30)  # seconds before the first retry
+MAX_RETRY_DELAY = 3600
+HEARTBEAT_SECONDS = getattr(settings, 'HOSPITAL_TASK_HEARTBEAT', 30)
+# Seconds without a heartbeat before a running task is reclaimed
+STALL_TIMEOUT = getattr(settings, 'HOSPITAL_TASK_STALL_TIMEOUT', 300)
+STALLED_ERROR = 'Worker stopped responding'
+# Claims lost to another worker before looking again (only possible without SKIP LOCKED)
+CLAIM_RETRIES = 5
+
+_registry = {}
+
+
+def task(name=None, max_attempts=3):
+    """Register a function as a task called ``name`` (default: the function's name)"""
+    def register(func):
+        task_name = name or func.__name__
+        if _registry.get(task_name, func) is not func:
+            raise ValueError(f'Task {task_name!r} is already registered')
+        _registry[task_name] = func
+        func.task_name = task_name
+        func.max_attempts = max_attempts
+        return func
+    return register
+
+
+def enqueue(func, *args, delay=0, user=None, **kwargs):
+    """Queue ``func(*args, **kwargs)`` to run in a worker ``delay`` seconds from now"""
+    if getattr(func, 'task_name', None) not in _registry:
+        raise ValueError(f'{func!r} is not a registered task')
+    return Task.objects.create(name=func.task_name, args=list(args), kwargs=kwargs, max_attempts=func.max_attempts,
+                               run_at=timezone.now() + timedelta(seconds=delay), created_by=user)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _requeue_stalled():
+    """Give tasks whose worker disappeared back to the queue, or fail them if they have no attempts left.
+
+    Returns the number requeued.
+    """
+    now = timezone.now()
+    stalled = Task.objects.filter(status='running', heartbeat_at__lt=now - timedelta(seconds=STALL_TIMEOUT))
+    stalled.filter(attempts__gte=F('max_attempts')).update(status='failed', error=STALLED_ERROR, finished_at=now)
+    return stalled.filter(attempts__lt=F('max_attempts')).update(status='queued', run_at=now, error=STALLED_ERROR)
+
+
+def _owned(task_row):
+    """``task_row`` while it is still this run's, i.e. not reclaimed and handed to another worker or attempt"""
+    return Task.objects.filter(pk=task_row.pk, status='running', worker=task_row.worker, attempts=task_row.attempts)
+
+
+class Heartbeat:
+    """Refresh a running task's ``heartbeat_at`` from a background thread until the block ends"""
+
+    def __init__(self, task_row):
+        self.task_row = task_row
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.beat, name=f'heartbeat-{task_row.pk}', daemon=True)
+
+    def beat(self):
+        try:
+            while not self.stopped.wait(HEARTBEAT_SECONDS):
+                _owned(self.task_row).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()  # this thread's own connection
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def claim(worker=None):
+    """Mark the oldest due task as running and return it, or None if nothing is due"""
+    # Without row locks (SQLite) there is nothing to hold, and a read
+    # transaction that then writes fails at once if another worker wrote first
+    locking = connection.features.has_select_for_update
+    for _ in range(CLAIM_RETRIES):
+        with transaction.atomic() if locking else nullcontext():
+            candidate = (Task.objects.filter(status='queued', run_at__lte=timezone.now()).order_by('run_at', 'id')
+                         .select_for_update(skip_locked=True).first())
+            if candidate is None:
+                return None
+            now = timezone.now()
+            changes = {'status': 'running', 'attempts': candidate.attempts + 1, 'started_at': now,
+                       'heartbeat_at': now, 'worker': worker or worker_name()}
+            # Conditional so backends without row locks never hand a task to two workers
+            claimed = Task.objects.filter(pk=candidate.pk, status='queued').update(**changes)
+        if claimed:
+            for field, value in changes.items():
+                setattr(candidate, field, value)
+            return candidate
+    return None
+
+
+def retry_delay(attempts):
+    """Seconds to wait before running a task again after ``attempts`` failures"""
+    return min(RETRY_BACKOFF * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def execute(task_row):
+    """Run a claimed task and record its result, a retry or the failure"""
+    func = _registry.get(task_row.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {task_row.name!r}')
+        with Heartbeat(task_row):
+            result = func(*task_row.args, **task_row.kwargs)
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+        if func is not None and task_row.attempts < task_row.max_attempts:
+            run_at = timezone.now() + timedelta(seconds=retry_delay(task_row.attempts))
+            _owned(task_row).update(status='queued', run_at=run_at, error=error)
+        else:
+            _owned(task_row).update(status='failed', error=error, finished_at=timezone.now())
+    else:
+        _owned(task_row).update(status='done', result=result, error='', finished_at=timezone.now())
+    task_row.refresh_from_db()
+    return task_row
+
+
+def work(stop=None, poll_interval=1.0, burst=False):
+    """Claim and run tasks until ``stop`` is set (or, with ``burst``, the queue is empty).
+
+    Returns the number of tasks run.
+    """
+    worker = worker_name()
+    done = 0
+    _requeue_stalled()
+    while stop is None or not stop.is_set():
+        if not connection.in_atomic_block:  # called inside a transaction, e.g. from a shell or a test
+            close_old_connections()
+        task_row = claim(worker)
+        if task_row is None:
+            if burst:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            _requeue_stalled()
+            continue
+        execute(task_row)
+        done += 1
+    return done
@@ -0,0 +1,35 @@
+# hospital/templatetags/hospital_cache.py
+from django import template
+from django.apps import apps
+
+from hospital import caching
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, models, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.models = models
+        self.vary_on = vary_on
+
+    def render(self, context):
+        models = [apps.get_model('hospital', label) for label in self.models.resolve(context).split()]
+        vary_on = [expr.resolve(context) for expr in self.vary_on]
+        return caching.cached(self.name.resolve(context), models, lambda: self.nodelist.render(context), *vary_on)
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """Cache a fragment until one of the listed hospital models changes.
+
+    {% cachedfragment "ward_table" "Ward Bed Patient" [vary_on ...] %} ... {% endcachedfragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f'{bits[0]} takes a name, a list of models and optional vary-on values')
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    name, models, *vary_on = (parser.compile_filter(bit) for bit in bits[1:])
+    return CachedFragmentNode(nodelist, name, models, vary_on)
@@ -1,3 +1,1601 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import tempfile
+import threading
+from io import StringIO
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import archive, bulk_jobs, caching, changelog, partitioning, search, tasks
+from .attendance import clock
+from .attendance_matrix import DEFAULT_DAYS, AttendanceMatrix, report_window
+from .beds import NoBedAvailable, allocate_bed, release_bed
+from .forms import AttendanceForm
+from .models import (ArchivedPatient, Attendance, Bed, BedStay, Bill, BillDocument, BulkJob, ChangeEvent,
+                     DashboardStats, Doctor, Feedback, Patient, RevenueDailyRollup, Task, UserProfile, Ward,
+                     bill_gst)
+from .pagination import decode_cursor, encode_cursor, paginate_keyset
+from .replicas import STICKY_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, use_replica
+
+
+def make_user(username, role='staff'):
+    user = User.objects.create_user(username, password='pass12345', first_name=username.title())
+    UserProfile.objects.create(
+        user=user, role=role, gender='male', dob=date(1990, 1, 1),
+        address='1 Main Road', city='Patna', mobile_no='9000000000',
+    )
+    return user
+
+
+def make_doctor(i=0):
+    return Doctor.objects.create(
+        doctor_name=f'Dr. Sharma {i}', father_name='R. Sharma', gender='male', dob=date(1975, 5, 1),
+        address='Clinic Lane', qualification='MBBS, MD', experience=10 + i % 20,
+        last_worked_hospital='City Hospital', salary=Decimal('85000.00'),
+    )
+
+
+def make_patient(doctor, i=0, admitted=True):
+    return Patient.objects.create(
+        patient_name=f'Patient {i}', age=20 + i % 60, gender='female', address='12 Ring Road',
+        consult_doctor=doctor, problem='Fever and cough', fee=Decimal('500.00'), diagnosis='Viral fever',
+        mobile_number=f'98{i:08d}', email=f'patient{i}@example.com', is_admitted=admitted,
+    )
+
+
+def make_ward(beds, i=0):
+    return Ward.objects.create(ward_name=f'Ward {i}', ward_type='General', ward_mode='Open',
+                               total_beds=beds, cost=Decimal('1500.00'), room_type='ac')
+
+
+def make_bill(patient, user, i=0):
+    return Bill.objects.create(
+        patient=patient, consult_doctor=patient.consult_doctor, diagnosis='Viral fever',
+        contact_number=patient.mobile_number, amount=Decimal('1200.00') + i,
+        payment_status=('paid', 'pending', 'partial')[i % 3], payment_method=('cash', 'card', 'upi')[i % 3],
+        created_by=user,
+    )
+
+
+@tasks.task(name='tests.add_numbers')
+def add_numbers(a, b):
+    return a + b
+
+
+@tasks.task(name='tests.nap')
+def nap(seconds):
+    threading.Event().wait(seconds)
+
+
+@tasks.task(name='tests.always_fails', max_attempts=2)
+def always_fails():
+    raise RuntimeError('printer on fire')
+
+
+class QueryBudgetTests(TestCase):
+    """Every named route runs a fixed number of queries however many rows exist.
+
+    Each route is requested against a small and a larger data set; the query
+    count must be identical (no N+1) and within the route's budget.
+    """
+
+    # Query budgets include the session, user and profile lookups of a logged-in request
+    BUDGETS = {
+        'index': 0,
+        'register': 0,
+        'login': 0,
+        'logout': 4,
+        'dashboard': 6,
+        'password_change': 3,
+        'doctor_list': 4,
+        'add_doctor': 3,
+        'doctor_detail': 6,
+        'edit_doctor': 4,
+        'delete_doctor': 10,  # also unlinks the doctor from archived patients and bills
+        'search_doctors': 4,
+        'patient_list': 5,
+        'add_patient': 5,
+        'patient_detail': 6,
+        'edit_patient': 5,
+        'discharge_patient': 4,
+        'search_patients': 4,
+        'ward_list': 4,
+        'add_ward': 3,
+        'ward_detail': 6,
+        'bill_list': 5,
+        'generate_bill': 7,
+        'bill_detail': 4,
+        'update_bill_payment': 10,
+        'search_bills': 4,
+        'attendance_list': 4,
+        'mark_attendance': 4,
+        'attendance_roster': 5,
+        'clock_attendance': 3,
+        'feedback_form': 0,
+        'feedback_list': 4,
+        'admission_report': 7,
+        'revenue_report': 7,
+        'attendance_report': 5,
+        'export_admission_report': 3,
+        'export_revenue_report': 3,
+        'export_attendance_report': 3,
+        'async_dashboard': 6,
+        'async_admission_report': 7,
+        'async_revenue_report': 7,
+        'async_attendance_report': 5,
+        'task_status': 3,
+        'change_log': 3,
+        'api_list': 3,
+        'api_detail': 3,
+        'autocomplete': 3,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin', role='admin')
+        self.admin.is_staff = True  # change_log is staff-only
+        self.admin.save()
+        self.seeded = 0
+
+    def seed(self, count):
+        """Add ``count`` rows to every table the views read"""
+        for i in range(self.seeded, self.seeded + count):
+            doctor = make_doctor(i)
+            patient = make_patient(doctor, i, admitted=i % 2 == 0)
+            make_bill(patient, self.admin, i)
+            staff = make_user(f'staff{i}')
+            Attendance.objects.create(staff=staff, date_of_attendance=date.today() - timedelta(days=i % 7),
+                                      incoming_time='09:00', outgoing_time='17:00',
+                                      status=('present', 'absent', 'leave')[i % 3])
+            Feedback.objects.create(username=f'Visitor {i}', email=f'visitor{i}@example.com', message='Good care')
+            ward = make_ward(20, i)
+            if patient.is_admitted:
+                allocate_bed(patient, ward)
+        self.seeded += count
+
+    def requests(self):
+        """(name, method, url, data) for every route in hospital/urls.py"""
+        doctor = Doctor.objects.order_by('did').first()
+        patient = Patient.objects.order_by('pid').first()
+        bill = Bill.objects.order_by('bid').first()
+        ward = Ward.objects.order_by('wid').first()
+        victim = make_doctor(999)
+        queued = tasks.enqueue(add_numbers, 2, 3, user=self.admin)
+        return [
+            ('index', 'get', reverse('index'), None),
+            ('register', 'get', reverse('register'), None),
+            ('login', 'get', reverse('login'), None),
+            ('logout', 'get', reverse('logout'), None),
+            ('dashboard', 'get', reverse('dashboard'), None),
+            ('password_change', 'get', reverse('password_change'), None),
+            ('doctor_list', 'get', reverse('doctor_list'), None),
+            ('add_doctor', 'get', reverse('add_doctor'), None),
+            ('doctor_detail', 'get', reverse('doctor_detail', args=[doctor.did]), None),
+            ('edit_doctor', 'get', reverse('edit_doctor', args=[doctor.did]), None),
+            ('delete_doctor', 'get', reverse('delete_doctor', args=[victim.did]), None),
+            ('search_doctors', 'get', reverse('search_doctors'), {'query': 'Sharma'}),
+            ('patient_list', 'get', reverse('patient_list'), None),
+            ('add_patient', 'get', reverse('add_patient'), None),
+            ('patient_detail', 'get', reverse('patient_detail', args=[patient.pid]), None),
+            ('edit_patient', 'get', reverse('edit_patient', args=[patient.pid]), None),
+            ('discharge_patient', 'get', reverse('discharge_patient', args=[patient.pid]), None),
+            ('search_patients', 'get', reverse('search_patients'), {'query': 'Patient'}),
+            ('ward_list', 'get', reverse('ward_list'), None),
+            ('add_ward', 'get', reverse('add_ward'), None),
+            ('ward_detail', 'get', reverse('ward_detail', args=[ward.wid]), None),
+            ('bill_list', 'get', reverse('bill_list'), None),
+            ('generate_bill', 'get', reverse('generate_bill', args=[patient.pid]), None),
+            ('bill_detail', 'get', reverse('bill_detail', args=[bill.bid]), None),
+            ('update_bill_payment', 'post', reverse('update_bill_payment', args=[bill.bid]),
+             {'payment_status': 'paid', 'payment_method': 'cash'}),
+            ('search_bills', 'get', reverse('search_bills'), {'query': 'Patient'}),
+            ('attendance_list', 'get', reverse('attendance_list'), None),
+            ('mark_attendance', 'get', reverse('mark_attendance'), None),
+            ('attendance_roster', 'get', reverse('attendance_roster'), None),
+            ('clock_attendance', 'post', reverse('clock_attendance'), {'action': 'in'}),
+            ('feedback_form', 'get', reverse('feedback_form'), None),
+            ('feedback_list', 'get', reverse('feedback_list'), None),
+            ('admission_report', 'get', reverse('admission_report'), None),
+            ('revenue_report', 'get', reverse('revenue_report'), None),
+            ('attendance_report', 'get', reverse('attendance_report'), None),
+            ('export_admission_report', 'get', reverse('export_admission_report'), None),
+            ('export_revenue_report', 'get', reverse('export_revenue_report'), {'format': 'ndjson'}),
+            ('export_attendance_report', 'get', reverse('export_attendance_report'), None),
+            ('async_dashboard', 'get', reverse('async_dashboard'), None),
+            ('async_admission_report', 'get', reverse('async_admission_report'), None),
+            ('async_revenue_report', 'get', reverse('async_revenue_report'), None),
+            ('async_attendance_report', 'get', reverse('async_attendance_report'), None),
+            ('task_status', 'get', reverse('task_status', args=[queued.pk]), None),
+            ('change_log', 'get', reverse('change_log'), {'after': 0}),
+            ('api_list', 'get', reverse('api_list', args=['bills']), {'fields': 'bid,patient,total_amount'}),
+            ('api_detail', 'get', reverse('api_detail', args=['patients', patient.pid]), None),
+            ('autocomplete', 'get', reverse('autocomplete', args=['patients']), {'query': 'Patient'}),
+        ]
+
+    def measure(self):
+        counts = {}
+        for name, method, url, data in self.requests():
+            # Anonymous-only pages are measured logged out, everything else logged in
+            if name in ('index', 'register', 'login', 'feedback_form'):
+                self.client.logout()
+            else:
+                self.client.force_login(self.admin)
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(url, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, f'{name} returned {response.status_code}')
+            counts[name] = len(queries)
+        return counts
+
+    def test_every_route_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({p.name for p in urlpatterns}, set(self.BUDGETS))
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(3)
+        small = self.measure()
+        self.seed(12)
+        large = self.measure()
+        for name, budget in self.BUDGETS.items():
+            with self.subTest(route=name):
+                self.assertEqual(small[name], large[name], f'{name} issues more queries as rows grow')
+                self.assertLessEqual(large[name], budget)
+
+
+class KeysetPaginationTests(TestCase):
+    KEYS = ('admission_date', 'pid')
+
+    def setUp(self):
+        doctor = make_doctor()
+        self.patients = [make_patient(doctor, i) for i in range(7)]
+        # Five share one admission date, so only the pid orders them
+        tied = timezone.now() - timedelta(days=1)
+        Patient.objects.filter(pk__in=[p.pk for p in self.patients[1:6]]).update(admission_date=tied)
+        self.order = list(Patient.objects.order_by('-admission_date', '-pid').values_list('pid', flat=True))
+
+    def page(self, query=''):
+        return paginate_keyset(RequestFactory().get('/' + query), Patient.objects.all(), self.KEYS)
+
+    def test_next_and_previous_walk_every_row_once(self):
+        pages, page = [], self.page('?page_size=2')
+        while True:
+            pages.append([p.pid for p in page])
+            if not page.has_next:
+                break
+            page = self.page(page.next_url)
+        self.assertEqual([pid for rows in pages for pid in rows], self.order)
+        self.assertEqual([len(rows) for rows in pages], [2, 2, 2, 1])
+        self.assertFalse(self.page('?page_size=2').has_previous)
+
+        back = []
+        while page.has_previous:
+            page = self.page(page.previous_url)
+            back.append([p.pid for p in page])
+        self.assertEqual(back, pages[-2::-1])
+        self.assertTrue(page.has_next)
+
+    def test_cursor_round_trips_typed_values(self):
+        patient = Patient.objects.get(pk=self.patients[3].pk)
+        cursor = encode_cursor([patient.admission_date, patient.pid])
+        self.assertEqual(decode_cursor(cursor, Patient.objects.all(), self.KEYS),
+                         [patient.admission_date, patient.pid])  # microseconds included
+
+    def test_invalid_cursors_fall_back_to_the_first_page(self):
+        first = [p.pid for p in self.page('?page_size=3')]
+        tampered = [
+            'not base64!',
+            encode_cursor([1]),  # wrong number of keys
+            encode_cursor(['yesterday', 5]),  # not a datetime
+            encode_cursor(['2026-01-01T00:00:00', 'x']),  # not a pid
+            base64.urlsafe_b64encode(b'{"pid": 1}').decode(),  # not a list
+        ]
+        for cursor in tampered:
+            for direction in ('after', 'before'):
+                with self.subTest(cursor=cursor, direction=direction):
+                    page = self.page(f'?page_size=3&{direction}={cursor}')
+                    self.assertEqual([p.pid for p in page], first)
+                    self.assertFalse(page.has_previous)
+        self.client.force_login(make_user('clerk'))
+        self.assertEqual(self.client.get(reverse('patient_list'), {'after': 'garbage'}).status_code, 200)
+
+
+class BedAllocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = make_doctor()
+        self.ward = make_ward(2)
+
+    def test_beds_follow_total_beds(self):
+        self.assertEqual(list(self.ward.beds.values_list('number', flat=True)), [1, 2])
+        patient = make_patient(self.doctor)
+        allocate_bed(patient, self.ward)
+        self.ward.total_beds = 0
+        self.ward.save()
+        # the occupied bed survives the shrink until it is released
+        self.assertEqual(list(self.ward.beds.values_list('number', flat=True)), [1])
+
+    def test_allocate_until_full_then_release(self):
+        first, second, third = (make_patient(self.doctor, i) for i in range(3))
+        self.assertEqual(allocate_bed(first, self.ward).number, 1)
+        self.assertEqual(allocate_bed(second, self.ward).number, 2)
+        with self.assertRaises(NoBedAvailable):
+            allocate_bed(third, self.ward)
+
+        self.assertTrue(release_bed(first))
+        self.assertEqual(allocate_bed(third, self.ward).number, 1)
+        self.assertEqual(BedStay.objects.filter(patient=first, ended_at__isnull=False).count(), 1)
+        self.assertEqual(BedStay.objects.filter(ended_at__isnull=True).count(), 2)
+
+    def test_admission_without_free_bed_is_rolled_back(self):
+        allocate_bed(make_patient(self.doctor, 1), self.ward)
+        allocate_bed(make_patient(self.doctor, 2), self.ward)
+        self.client.force_login(make_user('reception'))
+        response = self.client.post(reverse('add_patient'), {
+            'patient_name': 'Late Arrival', 'age': 40, 'gender': 'male', 'address': '3 Lake Road',
+            'consult_doctor': self.doctor.did, 'problem': 'Fracture', 'fee': '800.00', 'diagnosis': 'X-ray',
+            'mobile_number': '9111111111', 'email': 'late@example.com', 'ward': self.ward.wid,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ward', response.context['form'].errors)
+        self.assertFalse(Patient.objects.filter(patient_name='Late Arrival').exists())
+
+    def test_ward_list_counts_occupancy(self):
+        allocate_bed(make_patient(self.doctor), self.ward)
+        self.client.force_login(make_user('reception'))
+        ward = self.client.get(reverse('ward_list')).context['wards'][0]
+        self.assertEqual((ward.bed_count, ward.occupied_count, ward.free_count), (2, 1, 1))
+
+
+
+class DashboardStatsTests(TestCase):
+    FIELDS = ('total_patients', 'admitted_patients', 'total_doctors', 'total_revenue')
+
+    def setUp(self):
+        self.user = make_user('cashier')
+        self.doctor = make_doctor()
+        self.patients = [make_patient(self.doctor, i, admitted=i % 2 == 0) for i in range(4)]
+        self.bills = [make_bill(self.patients[i % 4], self.user, i) for i in range(6)]
+
+    def assertMatchesRebuild(self):
+        kept = DashboardStats.objects.values(*self.FIELDS).get(pk=1)
+        self.assertEqual(kept, DashboardStats.objects.values(*self.FIELDS).get(pk=DashboardStats.rebuild().pk))
+
+    def test_creates_are_counted(self):
+        stats = DashboardStats.load()
+        self.assertEqual((stats.total_patients, stats.admitted_patients, stats.total_doctors), (4, 2, 1))
+        self.assertEqual(stats.total_revenue, sum(bill.amount for bill in self.bills))
+        self.assertMatchesRebuild()
+
+    def test_status_and_amount_changes(self):
+        admitted = self.patients[0]
+        admitted.is_admitted = False
+        admitted.save()
+        admitted.save()  # saving again changes nothing
+        self.patients[1].is_admitted = True
+        self.patients[1].save()
+        bill = Bill.objects.get(pk=self.bills[1].pk)
+        bill.amount += 300
+        bill.payment_status = 'paid'
+        bill.save()
+        self.client.force_login(self.user)
+        self.client.post(reverse('discharge_patient', args=[self.patients[2].pid]))
+        self.assertEqual(DashboardStats.load().admitted_patients, 1)
+        self.assertMatchesRebuild()
+
+    def test_deletes_are_counted(self):
+        self.bills[0].delete()
+        self.patients[1].delete()  # and its bill, by cascade
+        Patient.objects.filter(pk=self.patients[2].pk).delete()
+        make_doctor(1).delete()
+        stats = DashboardStats.load()
+        self.assertEqual((stats.total_patients, stats.admitted_patients, stats.total_doctors), (2, 1, 1))
+        self.assertMatchesRebuild()
+
+    def test_bulk_actions_are_counted(self):
+        bulk_jobs.discharge_patients([p.pk for p in self.patients])
+        bulk_jobs.mark_bills_paid([b.pk for b in self.bills])
+        self.assertEqual(DashboardStats.load().admitted_patients, 0)
+        self.assertMatchesRebuild()
+
+
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        self.user = make_user('clerk')
+        self.patient = make_patient(make_doctor())
+
+    def rollup(self):
+        return {row.payment_status: (row.bill_count, row.amount) for row in RevenueDailyRollup.objects.all()}
+
+    def test_bill_changes_move_its_amount(self):
+        bill = make_bill(self.patient, self.user, 1)
+        make_bill(self.patient, self.user, 4)  # same day, doctor, method and status
+        self.assertEqual(self.rollup(), {'pending': (2, Decimal('2405.00'))})
+
+        bill.payment_status = 'paid'
+        bill.save()
+        self.assertEqual(self.rollup(), {'pending': (1, Decimal('1204.00')), 'paid': (1, Decimal('1201.00'))})
+
+        bill.delete()
+        self.assertEqual(self.rollup(), {'pending': (1, Decimal('1204.00')), 'paid': (0, Decimal('0.00'))})
+
+    def test_one_row_per_key_without_doctor_or_method(self):
+        for i in range(2):
+            Bill.objects.create(patient=self.patient, diagnosis='Checkup', contact_number='9800000000',
+                                amount=Decimal('100.00'), created_by=self.user)
+        row = RevenueDailyRollup.objects.get()
+        self.assertEqual((row.doctor_id, row.payment_method, row.bill_count, row.amount),
+                         (None, None, 2, Decimal('200.00')))
+        self.assertEqual(RevenueDailyRollup.rebuild(), 1)
+        self.assertEqual(self.rollup(), {'pending': (2, Decimal('200.00'))})
+        # Enforced by the database, NULL key columns included
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RevenueDailyRollup.objects.create(date=row.date, payment_status='pending', bill_count=1, amount=1)
+
+    def test_report_rounds_gst_per_bill(self):
+        for i in range(2):
+            Bill.objects.create(patient=self.patient, diagnosis='Checkup', contact_number='9800000000',
+                                amount=Decimal('100.05'), created_by=self.user)
+        self.client.force_login(self.user)
+        stats = self.client.get(reverse('revenue_report')).context['stats']
+        # 18.009 rounds to 18.01 on each bill; 18% of the 200.10 total would be 36.018
+        self.assertEqual((stats['total_revenue'], stats['tax_amount'], stats['gross_amount']),
+                         (Decimal('200.10'), Decimal('36.02'), Decimal('236.12')))
+        # The rollup kept by the signals agrees with one rebuilt from the bills
+        RevenueDailyRollup.rebuild()
+        self.assertEqual(RevenueDailyRollup.objects.values_list('gst_amount', 'gross_amount').get(),
+                         (Decimal('36.02'), Decimal('236.12')))
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(make_user('admin', role='admin'))
+
+    def test_fragment_is_reused_until_a_write(self):
+        ward = make_ward(3)
+        self.client.get(reverse('ward_list'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('ward_list'))
+        self.assertFalse(any('hospital_ward' in q['sql'] for q in queries), 'cached ward table was rebuilt')
+        self.assertEqual(caching.stats()['ward_table'], {'hits': 1, 'misses': 1})
+
+        # Bed allocation writes with update(), which sends no signals
+        allocate_bed(make_patient(make_doctor()), ward)
+        self.assertContains(self.client.get(reverse('ward_list')), '<td>1</td><td>2</td>', html=False)
+
+    def test_write_inside_transaction_invalidates_again_on_commit(self):
+        key = caching.make_key('doctor_list', [Doctor])
+        with self.captureOnCommitCallbacks(execute=True):
+            make_doctor()
+            during = caching.make_key('doctor_list', [Doctor])
+        self.assertNotEqual(key, during)
+        self.assertNotEqual(during, caching.make_key('doctor_list', [Doctor]))
+
+    def test_evicted_version_never_reuses_old_keys(self):
+        key = caching.make_key('doctor_list', [Doctor])
+        cache.delete(f'hospital:version:{Doctor._meta.label_lower}')
+        self.assertNotEqual(key, caching.make_key('doctor_list', [Doctor]))
+
+    def test_list_and_dashboard_reflect_writes(self):
+        self.client.get(reverse('doctor_list'))
+        self.client.get(reverse('dashboard'))
+        make_doctor(7)
+        self.assertContains(self.client.get(reverse('doctor_list')), 'Dr. Sharma 7')
+        self.assertEqual(self.client.get(reverse('dashboard')).context['total_doctors'], 1)
+
+    def test_async_dashboard_shares_the_cache_entry(self):
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('async_dashboard')).status_code, 200)
+        self.assertFalse(any('hospital_dashboardstats' in q['sql'] for q in queries), 'async dashboard recomputed')
+        self.assertEqual(caching.stats()['dashboard'], {'hits': 1, 'misses': 1})
+
+        make_doctor(7)
+        self.assertEqual(self.client.get(reverse('async_dashboard')).context['total_doctors'], 1)
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(caching.stats()['dashboard'], {'hits': 2, 'misses': 2})
+
+
+
+class AttendanceRosterTests(TestCase):
+    SHIFT = 300
+
+    def setUp(self):
+        self.supervisor = make_user('supervisor', role='admin')
+        users = User.objects.bulk_create([User(username=f'nurse{i}', password='!') for i in range(self.SHIFT)])
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, role='staff', gender='female', dob=date(1990, 1, 1), address='Quarters',
+                        city='Patna', mobile_no='9000000000') for user in users
+        ])
+        self.staff = users
+        self.client.force_login(self.supervisor)
+
+    def roster_post(self, status, task=''):
+        data = {'form-TOTAL_FORMS': self.SHIFT, 'form-INITIAL_FORMS': self.SHIFT}
+        for i, user in enumerate(self.staff):
+            data.update({f'form-{i}-staff_id': user.pk, f'form-{i}-status': status, f'form-{i}-incoming_time': '08:00',
+                         f'form-{i}-outgoing_time': '', f'form-{i}-task_involved': task})
+        return data
+
+    def test_whole_shift_is_written_in_a_few_queries(self):
+        url = reverse('attendance_roster') + '?date=2026-03-02&role=staff'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, self.roster_post('present'))
+        self.assertEqual(response.status_code, 302)
+        self.assertLessEqual(len(queries), 8)
+        self.assertEqual(Attendance.objects.filter(date_of_attendance=date(2026, 3, 2), status='present').count(),
+                         self.SHIFT)
+
+        # Marking the same day again updates the rows instead of failing on unique_together
+        self.client.post(url, self.roster_post('half_day', task='Night cover'))
+        self.assertEqual(Attendance.objects.filter(date_of_attendance=date(2026, 3, 2)).count(), self.SHIFT)
+        self.assertEqual(Attendance.objects.filter(status='half_day', task_involved='Night cover').count(), self.SHIFT)
+
+    def test_repeated_staff_is_rejected(self):
+        data = self.roster_post('present')
+        data['form-1-staff_id'] = self.staff[0].pk
+        response = self.client.post(reverse('attendance_roster') + '?date=2026-03-02', data)
+        self.assertContains(response, 'Each staff member may appear only once on the roster.')
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_single_mark_updates_the_day(self):
+        nurse = self.staff[0]
+        Attendance.objects.create(staff=nurse, date_of_attendance=date(2026, 3, 2), status='absent')
+        form = AttendanceForm({'staff': nurse.pk, 'date_of_attendance': '2026-03-02', 'status': 'present'})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.client.post(reverse('mark_attendance'), form.data)
+        self.assertEqual(Attendance.objects.get(staff=nurse).status, 'present')
+
+    def test_clock_in_then_out_keeps_arrival(self):
+        nurse = self.staff[0]
+        morning = timezone.make_aware(datetime(2026, 3, 2, 8, 55))
+        clock(nurse.pk, 'in', morning)
+        clock(nurse.pk, 'out', morning + timedelta(hours=9))
+        record = Attendance.objects.get(staff=nurse)
+        self.assertEqual((record.incoming_time, record.outgoing_time, record.status),
+                         (time(8, 55), time(17, 55), 'present'))
+
+    def test_clock_endpoint(self):
+        response = self.client.post(reverse('clock_attendance'), {'action': 'in', 'staff': self.staff[1].pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['action'], 'in')
+        self.assertEqual(self.client.post(reverse('clock_attendance'), {'action': 'lunch'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('clock_attendance')).status_code, 405)
+
+
+
+class AttendanceMatrixTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', role='admin')
+        self.nurse = make_user('nurse')
+        self.porter = make_user('porter')
+        # Eight days across a month boundary: P P A A A L H P (the last one a night shift)
+        pattern = ['present', 'present', 'absent', 'absent', 'absent', 'leave', 'half_day', 'present']
+        shifts = {'present': ('09:00', '17:00'), 'half_day': ('09:00', '13:00')}
+        for offset, status in enumerate(pattern):
+            came, left = shifts.get(status, (None, None))
+            if offset == 7:
+                came, left = '22:00', '06:00'
+            Attendance.objects.create(staff=self.nurse, date_of_attendance=date(2026, 1, 28) + timedelta(days=offset),
+                                      status=status, incoming_time=came, outgoing_time=left)
+        Attendance.objects.create(staff=self.porter, date_of_attendance=date(2026, 1, 30), status='present',
+                                  incoming_time='08:00', outgoing_time='16:30')
+        self.start, self.end = date(2026, 1, 28), date(2026, 2, 4)
+
+    def build(self):
+        with self.assertNumQueries(2):
+            return AttendanceMatrix.build(Attendance.objects.all(), self.start, self.end)
+
+    def test_totals_and_staff_summary(self):
+        matrix = self.build()
+        self.assertEqual(matrix.status.shape, (2, 8))
+        totals = matrix.totals()
+        self.assertEqual((totals['total_records'], totals['present_count'], totals['absent_count']), (9, 4, 3))
+        self.assertEqual(totals['hours_worked'], 8 + 8 + 4 + 8 + 8.5)
+
+        nurse, porter = matrix.staff_summary()
+        self.assertEqual(nurse['username'], 'nurse')
+        self.assertEqual((nurse['recorded'], nurse['present'], nurse['absent']), (8, 4, 3))
+        self.assertAlmostEqual(nurse['absence_rate'], 37.5)
+        self.assertEqual((nurse['longest_streak'], nurse['longest_absence'], nurse['hours_worked']), (2, 3, 28))
+        self.assertEqual((porter['recorded'], porter['longest_streak'], porter['absence_rate']), (1, 1, 0))
+
+    def test_monthly_summary_and_heatmap(self):
+        matrix = self.build()
+        january, february = matrix.monthly_summary()
+        self.assertEqual((january['month'], january['recorded'], january['absent']), (date(2026, 1, 1), 5, 2))
+        self.assertEqual((february['month'], february['recorded'], february['leave'], february['half_day']),
+                         (date(2026, 2, 1), 4, 1, 1))
+        self.assertEqual(matrix.heatmap()['rows'], [['nurse', 'PPAAALHP'], ['porter', '..P.....']])
+
+    def test_empty_window(self):
+        matrix = AttendanceMatrix.build(Attendance.objects.all(), date(2025, 1, 1), date(2025, 1, 31))
+        self.assertEqual(matrix.totals()['total_records'], 0)
+        self.assertEqual(matrix.staff_summary(), [])
+        self.assertEqual(sum(month['recorded'] for month in matrix.monthly_summary()), 0)
+
+    def test_report_window(self):
+        self.assertEqual(report_window(end_date=date(2026, 12, 31)), (date(2026, 1, 1), date(2026, 12, 31)))
+        self.assertEqual(report_window(date(2020, 1, 1), date(2026, 12, 31))[0], date(2024, 12, 31))
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('attendance_report'), {'start_date': '2026-01-28', 'end_date': '2026-02-04'})
+        self.assertEqual(response.context['stats']['absent_count'], 3)
+        self.assertContains(response, 'attendance-heatmap-data')
+
+    def test_inverted_window_is_empty_not_an_error(self):
+        self.assertEqual(report_window(date(2026, 5, 1), date(2026, 4, 1)), (date(2026, 4, 2), date(2026, 4, 1)))
+        today = timezone.localdate()
+        self.assertEqual(report_window(today + timedelta(days=200)), (today + timedelta(days=1), today))
+        Attendance.objects.create(staff=self.porter, date_of_attendance=today, status='absent')
+        self.client.force_login(self.admin)
+        # Both end dates have records; none of them is shown
+        for name in ('attendance_report', 'async_attendance_report'):
+            for dates in ({'start_date': '2026-02-04', 'end_date': '2026-01-28'},
+                          {'start_date': (today + timedelta(days=200)).isoformat()}):
+                with self.subTest(route=name, dates=dates):
+                    response = self.client.get(reverse(name), dates)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.context['stats']['total_records'], 0)
+                    self.assertEqual(response.context['attendances'], [])
+                    self.assertEqual(response.context['monthly'], [])
+        response = self.client.get(reverse('export_attendance_report'),
+                                   {'format': 'ndjson', 'start_date': '2026-02-04', 'end_date': '2026-01-28'})
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_export_uses_the_report_window(self):
+        self.client.force_login(self.admin)
+
+        def exported(**dates):
+            response = self.client.get(reverse('export_attendance_report'), {'format': 'ndjson', **dates})
+            return [json.loads(line)['date'] for line in b''.join(response.streaming_content).decode().splitlines()]
+
+        self.assertEqual(exported(start_date='2026-01-30', end_date='2026-01-31'),
+                         ['2026-01-31', '2026-01-30', '2026-01-30'])
+        # No start: DEFAULT_DAYS up to the end date, like the report
+        self.assertEqual(len(exported(end_date='2026-02-04')), 9)
+        self.assertEqual(exported(end_date=(date(2026, 1, 28) + timedelta(days=DEFAULT_DAYS)).isoformat()),
+                         ['2026-02-04', '2026-02-03', '2026-02-02', '2026-02-01', '2026-01-31', '2026-01-30',
+                          '2026-01-30', '2026-01-29'])
+        # No dates at all is the last DEFAULT_DAYS, not the whole table
+        today = timezone.localdate()
+        Attendance.objects.create(staff=self.porter, date_of_attendance=today - timedelta(days=DEFAULT_DAYS),
+                                  status='present')
+        Attendance.objects.create(staff=self.porter, date_of_attendance=today, status='present')
+        self.assertEqual(exported()[0], today.isoformat())
+        self.assertNotIn((today - timedelta(days=DEFAULT_DAYS)).isoformat(), exported())
+
+
+
+class BillDocumentTests(TestCase):
+    def setUp(self):
+        self.user = make_user('cashier')
+        self.client.force_login(self.user)
+        self.bill = make_bill(make_patient(make_doctor()), self.user, 0)  # i=0 is paid
+        self.url = reverse('bill_detail', args=[self.bill.bid])
+
+    def test_paid_bill_is_rendered_once(self):
+        first = self.client.get(self.url)
+        self.assertContains(first, 'Patient 0')
+        document = BillDocument.objects.get(bill=self.bill)
+        self.assertEqual(first['ETag'], f'"{document.etag}"')
+        self.assertIn('Last-Modified', first)
+
+        reprint = self.client.get(self.url)
+        self.assertEqual(reprint.content, first.content)
+        self.assertEqual(reprint.templates, [])  # served from the stored bytes
+
+        with CaptureQueriesContext(connection) as queries:
+            unchanged = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertFalse(any('"html"' in query['sql'] for query in queries))  # the bytes were never fetched
+
+    @override_settings(HOSPITAL_GST_RATE='0.125')
+    def test_tax_label_follows_the_rate(self):
+        self.assertContains(self.client.get(self.url), 'Tax (12.5% GST)')  # stored document
+        pending = make_bill(self.bill.patient, self.user, 1)
+        self.assertContains(self.client.get(reverse('bill_detail', args=[pending.bid])), 'Tax (12.5% GST)')
+        self.assertContains(self.client.get(reverse('generate_bill', args=[self.bill.patient.pid])), 'Tax (12.5% GST)')
+
+    def test_edit_discards_document(self):
+        etag = self.client.get(self.url)['ETag']
+        self.bill.save()
+        self.assertFalse(BillDocument.objects.exists())
+        self.assertEqual(self.client.get(self.url)['ETag'], etag)  # same content, same ETag
+
+        self.bill.diagnosis = 'Dengue'
+        self.bill.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Dengue')
+
+    def test_unpaid_bill_uses_live_template(self):
+        Bill.objects.filter(pk=self.bill.pk).update(payment_status='pending')
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, 'hospital/bill/bill_detail.html')
+        self.assertNotIn('ETag', response)
+        self.assertFalse(BillDocument.objects.exists())
+
+
+
+class ConditionalResponseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('clerk')
+        self.client.force_login(self.user)
+        self.doctor = make_doctor()
+        self.patient = make_patient(self.doctor)
+        self.bill = make_bill(self.patient, self.user, 1)
+
+    def revalidate(self, url, etag):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, len(queries)
+
+    def test_unchanged_detail_is_not_modified(self):
+        url = reverse('patient_detail', args=[self.patient.pid])
+        first = self.client.get(url)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('no-cache', first['Cache-Control'])
+
+        response, queries = self.revalidate(url, first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(queries, 3)  # session, user and the validator
+
+        self.bill.amount = Decimal('2000.00')
+        self.bill.save()
+        response, _ = self.revalidate(url, first['ETag'])
+        self.assertContains(response, '₹2360.0000')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_list_page_changes_with_its_rows(self):
+        url = reverse('patient_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 304)
+
+        # A renamed doctor is shown on every row of theirs
+        self.doctor.doctor_name = 'Dr. Verma'
+        self.doctor.save()
+        response, _ = self.revalidate(url, etag)
+        self.assertContains(response, 'Dr. Verma')
+
+        etag = response['ETag']
+        self.patient.delete()
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 200)
+
+    def test_bulk_updates_change_the_etag(self):
+        ward = make_ward(2)
+        urls = [reverse('ward_detail', args=[ward.wid]), reverse('bill_list') + '?sort=total',
+                reverse('ward_list')]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        allocate_bed(self.patient, ward)
+        bulk_jobs.mark_bills_paid([self.bill.pk])
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, etag)[0].status_code, 200)
+
+    def test_etag_varies_by_user(self):
+        url = reverse('doctor_detail', args=[self.doctor.did])
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(make_user('nurse'))
+        self.assertEqual(self.revalidate(url, etag)[0].status_code, 200)
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter(replica='replica')
+        self.reads = []
+
+    def view(self, request, write=Patient):
+        with use_replica():
+            self.reads.append(self.router.db_for_read(Patient))
+            if request.method == 'POST':
+                self.router.db_for_write(write)
+                self.reads.append(self.router.db_for_read(Patient))
+        return HttpResponse()
+
+    def test_only_marked_reads_use_the_replica(self):
+        self.assertIsNone(self.router.db_for_read(Patient))
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Patient), 'replica')
+            self.assertEqual(self.router.db_for_write(Patient), 'default')
+
+    def test_write_keeps_the_user_on_the_primary(self):
+        middleware = ReplicaStickinessMiddleware(self.view)
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(self.reads, ['replica', 'default'])  # the request reads its own write
+
+        request = RequestFactory().get('/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        middleware(request)
+        request.COOKIES[STICKY_COOKIE] = '0'  # expired
+        middleware(request)
+        self.assertEqual(self.reads[2:], ['default', 'replica'])
+
+    def test_session_writes_do_not_pin(self):
+        middleware = ReplicaStickinessMiddleware(lambda request: self.view(request, write=Session))
+        response = middleware(RequestFactory().post('/'))
+        self.assertEqual(self.reads, ['replica', 'replica'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_saving_a_form_sets_the_cookie(self):
+        self.client.force_login(make_user('clerk'))
+        self.assertNotIn(STICKY_COOKIE, self.client.get(reverse('search_doctors')).cookies)
+        response = self.client.post(reverse('add_doctor'), {
+            'doctor_name': 'Dr. Rao', 'father_name': 'K. Rao', 'gender': 'male', 'dob': '1980-01-01',
+            'address': 'Clinic Lane', 'qualification': 'MBBS', 'experience': 5,
+            'last_worked_hospital': 'City Hospital', 'salary': '50000',
+        })
+        self.assertRedirects(response, reverse('doctor_list'))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+
+class PartitioningTests(TestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(partitioning.add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(partitioning.partition_name('hospital_bill', date(2026, 2, 1)), 'hospital_bill_p2026_02')
+
+    @skipUnless(connection.vendor == 'postgresql', 'partitioning needs PostgreSQL')
+    def test_new_month_takes_its_rows_from_the_default_partition(self):
+        staff = make_user('porter')
+        month = partitioning.add_months(timezone.localdate().replace(day=1), 24)
+        record = Attendance.objects.create(staff=staff, date_of_attendance=month + timedelta(days=4))
+        self.assertTrue(partitioning.is_partitioned(connection, 'hospital_attendance'))
+
+        def partition_of(pk):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT tableoid::regclass::text FROM hospital_attendance WHERE id = %s', [pk])
+                return cursor.fetchone()[0]
+
+        self.assertEqual(partition_of(record.pk), 'hospital_attendance_default')
+        self.assertIn(month, partitioning.create_partitions(connection, 'hospital_attendance', 24))
+        self.assertEqual(partition_of(record.pk), partitioning.partition_name('hospital_attendance', month))
+
+        # A range inside the month plans a scan of that partition only
+        plan = Attendance.objects.filter(date_of_attendance__range=(month, month + timedelta(days=9))).explain()
+        self.assertIn(partitioning.partition_name('hospital_attendance', month), plan)
+        self.assertNotIn('hospital_attendance_default', plan)
+
+        with connection.cursor() as cursor:
+            # The test's transaction still holds the insert's deferred foreign key checks
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        self.assertTrue(partitioning.detach_partition(connection, 'hospital_attendance', month))
+        self.assertFalse(Attendance.objects.filter(pk=record.pk).exists())  # kept in the detached table only
+
+
+class BillTotalsTests(TestCase):
+    def setUp(self):
+        self.user = make_user('accounts')
+        patient = make_patient(make_doctor())
+        # GST on each of these ends in a half paisa: 0.045, 1.845, 180.135
+        self.bills = [make_bill(patient, self.user) for _ in range(3)]
+        for bill, amount in zip(self.bills, ('0.25', '10.25', '1000.75')):
+            bill.amount = Decimal(amount)
+            bill.save()
+
+    def test_gst_is_rounded_per_bill(self):
+        rows = Bill.objects.with_totals().order_by('bid').values_list('amount', 'gst_amount', 'gross_amount')
+        self.assertEqual([(Decimal(gst), Decimal(gross)) for _, gst, gross in rows],
+                         [(Decimal('0.05'), Decimal('0.30')), (Decimal('1.85'), Decimal('12.10')),
+                          (Decimal('180.14'), Decimal('1180.89'))])
+        self.assertEqual([Decimal(gst) for amount, gst, _ in rows], [bill_gst(amount) for amount, _, _ in rows])
+        # Summing rounded amounts, not rounding the sum (182.025 -> 182.03)
+        totals = Bill.objects.with_totals().aggregate(gst=Sum('gst_amount'), gross=Sum('gross_amount'))
+        self.assertEqual((Decimal(totals['gst']), Decimal(totals['gross'])), (Decimal('182.04'), Decimal('1193.29')))
+
+    def test_bill_list_sorts_by_total(self):
+        tie = make_bill(self.bills[0].patient, self.user)
+        tie.amount = Decimal('10.25')
+        tie.save()
+        self.client.force_login(self.user)
+        seen, url = [], reverse('bill_list') + '?sort=total&page_size=2'
+        while url:
+            page = self.client.get(url).context['bills']
+            seen += [bill.bid for bill in page]
+            url = page.next_url and reverse('bill_list') + page.next_url
+        # Largest gross first; the two equal totals newest bill first
+        self.assertEqual(seen, [self.bills[2].bid, tie.bid, self.bills[1].bid, self.bills[0].bid])
+        self.assertEqual([bill.bid for bill in self.client.get(reverse('bill_list')).context['bills']],
+                         [tie.bid] + [bill.bid for bill in reversed(self.bills)])
+
+
+class ExportTests(TestCase):
+    HEADERS = ['bid', 'bill_date', 'patient', 'doctor', 'payment_status', 'payment_method',
+               'amount', 'tax_amount', 'total_amount']
+
+    def setUp(self):
+        user = make_user('accounts')
+        self.client.force_login(user)
+        patient = make_patient(make_doctor(), 1)
+        self.old = make_bill(patient, user, 0)
+        Bill.objects.filter(pk=self.old.pk).update(bill_date=timezone.now() - timedelta(days=30))
+        self.bill = make_bill(patient, user, 1)
+
+    def export(self, fmt, **params):
+        response = self.client.get(reverse('export_revenue_report'), {'format': fmt, **params})
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_has_headers_and_rows(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="revenue.csv"')
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(rows[0], self.HEADERS)
+        self.assertEqual([row[0] for row in rows[1:]], [str(self.bill.pk), str(self.old.pk)])  # newest first
+        self.assertEqual(rows[1][2:6], ['Patient 1', 'Dr. Sharma 0', 'pending', 'card'])
+        self.assertEqual([Decimal(value) for value in rows[1][6:]],
+                         [Decimal('1201.00'), Decimal('216.18'), Decimal('1417.18')])
+
+    def test_ndjson_has_one_object_per_row(self):
+        start = timezone.localdate() - timedelta(days=1)
+        response, body = self.export('ndjson', start_date=start.isoformat())
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 1)  # the older bill is outside the date range
+        self.assertEqual(list(rows[0]), self.HEADERS)
+        self.assertEqual(rows[0]['bid'], self.bill.pk)
+        # DjangoJSONEncoder keeps milliseconds
+        self.assertAlmostEqual(datetime.fromisoformat(rows[0]['bill_date']), Bill.objects.get(pk=self.bill.pk).bill_date,
+                               delta=timedelta(milliseconds=1))
+        self.assertEqual([Decimal(rows[0][field]) for field in ('amount', 'tax_amount', 'total_amount')],
+                         [Decimal('1201.00'), Decimal('216.18'), Decimal('1417.18')])
+
+
+class IndexReportTests(TestCase):
+    def test_explains_the_queries_the_views_send(self):
+        make_bill(make_patient(make_doctor()), make_user('accounts'))
+        out = StringIO()
+        call_command('index_report', stdout=out)
+        labels = {line[10:].split(':')[0].split(' #')[0] for line in out.getvalue().splitlines()
+                  if line.startswith(('indexed', 'SEQ SCAN'))}
+        self.assertTrue({'bill_list ?sort=total', 'revenue_report totals', 'revenue export'} <= labels, labels)
+        self.assertRegex(out.getvalue(), r'\d+ of \d+ queries use a sequential scan')
+
+
+class SeedAndBenchTests(TestCase):
+    def seed(self):
+        call_command('seed_hospital', '--patients', '6', '--bills-per-patient', '2', '--days', '3', '--doctors', '2',
+                     '--wards', '1', '--staff', '2', '--feedback', '2', '--until', '2026-01-10', '--batch-size', '4',
+                     stdout=StringIO())
+
+    def test_seed_hospital_at_a_tiny_scale(self):
+        self.seed()
+        counts = {model.__name__: model.objects.count() for model in (Doctor, Ward, Patient, Bill, Feedback)}
+        self.assertEqual(counts, {'Doctor': 2, 'Ward': 1, 'Patient': 6, 'Bill': 12, 'Feedback': 2})
+        self.assertEqual(User.objects.filter(username__startswith='seed_staff_').count(), 2)
+        self.assertEqual(Attendance.objects.count(), 2 * 3)
+        self.assertEqual(Bed.objects.count(), Ward.objects.get().total_beds)
+        self.assertEqual(RevenueDailyRollup.objects.aggregate(bills=Sum('bill_count'))['bills'], 12)
+        self.assertEqual(DashboardStats.load().total_patients, 6)
+        # Same seed, same data
+        amounts = list(Bill.objects.order_by('bid').values_list('amount', flat=True))
+        self.seed()
+        self.assertEqual(list(Bill.objects.order_by('bid').values_list('amount', flat=True))[12:], amounts)
+
+    def test_bench_routes_writes_a_report(self):
+        self.seed()
+        User.objects.create_superuser('admin', password='pass12345')
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / 'bench.json'
+            out = StringIO()
+            call_command('bench_routes', '--repeat', '2', '--output', str(output), '--compare', str(output),
+                         stdout=out, stderr=StringIO())
+            report = json.loads(output.read_text())
+        self.assertEqual(report['meta']['rows']['hospital.Bill'], 12)
+        self.assertIn('dashboard', report['routes'])
+        self.assertIn('bill_detail', report['routes'])  # path arguments filled from the seeded rows
+        self.assertTrue(all(route['status'] < 500 for route in report['routes'].values()), report['routes'])
+        self.assertIn('0 route(s) slower', out.getvalue())
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client.force_login(make_user('clerk'))
+        self.doctor = make_doctor()
+        self.older = make_patient(self.doctor, 1)
+        self.older.patient_name = 'Kavya Iyer'
+        self.older.save()
+        self.newer = make_patient(self.doctor, 2)
+        self.newer.patient_name = 'Ramesh Kavyan'
+        self.newer.save()
+        self.other = make_patient(self.doctor, 3)
+
+    def test_whole_word_matches_rank_first(self):
+        self.assertEqual(list(search.search_patients('Kavya')), [self.older, self.newer])
+        self.assertEqual(list(search.search_doctors('Sharma')), [self.doctor])
+        self.assertEqual(list(search.search_bills('Kavya')), [])
+
+    def test_numeric_query_matches_ids_and_mobile_numbers(self):
+        self.assertEqual(list(search.search_patients(str(self.other.pid)))[0], self.other)
+        self.assertEqual(list(search.search_patients(self.newer.mobile_number)), [self.newer])
+        self.assertEqual(list(search.search_doctors(str(self.doctor.did))), [self.doctor])
+
+    def test_phone_like_query_matches_mobile_numbers(self):
+        self.other.mobile_number = '+91 98765 43210'
+        self.other.save()
+        self.assertEqual(list(search.search_patients('98-00000002')), [self.newer])
+        self.assertEqual(list(search.search_patients('+91 98765')), [self.other])  # as typed
+        self.assertEqual(set(search.search_patients('(98) 000')), {self.older, self.newer})  # as digits
+        url = reverse('autocomplete', args=['patients'])
+        self.assertEqual([row['id'] for row in self.client.get(url, {'query': '98-00000001'}).json()['results']],
+                         [self.older.pk])
+
+    def test_non_ascii_digits_are_text(self):
+        for name in ('search_patients', 'search_doctors', 'search_bills'):
+            with self.subTest(route=name):
+                self.assertEqual(self.client.get(reverse(name), {'query': '²'}).status_code, 200)
+        url = reverse('autocomplete', args=['patients'])
+        self.assertEqual(self.client.get(url, {'query': '²'}).json(), {'results': []})
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = make_user('records')
+        self.client.force_login(self.user)
+        doctor = make_doctor()
+        long_ago = timezone.now() - timedelta(days=400)
+        self.old = make_patient(doctor, 1, admitted=False)
+        Patient.objects.filter(pk=self.old.pk).update(discharge_date=long_ago)
+        self.old_bill = make_bill(self.old, self.user, 0)
+        BillDocument.objects.create(bill=self.old_bill, html=b'<html></html>', etag='x')
+        BedStay.objects.create(bed=make_ward(1).beds.get(), patient=self.old, ended_at=long_ago)
+        self.recent = make_patient(doctor, 2, admitted=False)
+        Patient.objects.filter(pk=self.recent.pk).update(discharge_date=timezone.now() - timedelta(days=3))
+        self.admitted = make_patient(doctor, 3)
+        make_bill(self.admitted, self.user, 1)
+
+    def test_command_moves_old_discharged_patients(self):
+        stats = DashboardStats.load()
+        revenue = RevenueDailyRollup.objects.aggregate(total=Sum('amount'))['total']
+        call_command('archive_patients', '--older-than', '365', '--batch-size', '1', stdout=StringIO())
+
+        self.assertEqual(set(Patient.objects.values_list('pk', flat=True)), {self.recent.pk, self.admitted.pk})
+        archived = ArchivedPatient.objects.get()
+        self.assertEqual((archived.pk, archived.patient_name), (self.old.pk, 'Patient 1'))
+        self.assertEqual(list(archived.bills.values_list('bid', 'amount')), [(self.old_bill.bid, Decimal('1200.00'))])
+        self.assertEqual(archived.bed_stays.count(), 1)
+        self.assertFalse(Bill.objects.filter(pk=self.old_bill.pk).exists())
+        self.assertFalse(BedStay.objects.exists())
+        self.assertFalse(BillDocument.objects.exists())
+
+        # A move, not a deletion: totals are unchanged and rebuilding them agrees
+        self.assertEqual(DashboardStats.load().total_patients, stats.total_patients)
+        self.assertEqual(DashboardStats.rebuild().total_revenue, stats.total_revenue)
+        RevenueDailyRollup.rebuild()
+        self.assertEqual(RevenueDailyRollup.objects.aggregate(total=Sum('amount'))['total'], revenue)
+        report = self.client.get(reverse('revenue_report')).context['stats']
+        self.assertEqual((report['total_revenue'], report['tax_amount']), (revenue, Decimal('432.18')))
+
+        self.assertEqual(archive.archive_patients(365), 0)
+
+    def test_history_is_read_only_when_asked_for(self):
+        archive.archive_patients(365)
+        listing = self.client.get(reverse('patient_list'))
+        self.assertNotContains(listing, 'Patient 1')
+        listing = self.client.get(reverse('patient_list'), {'history': '1'})
+        self.assertContains(listing, 'Patient 1')
+        self.assertContains(listing, 'Patient 3')
+
+        detail = self.client.get(reverse('patient_detail', args=[self.old.pk]))
+        self.assertContains(detail, 'Discharged (archived)')
+        self.assertContains(detail, f'Bill #{self.old_bill.bid}')
+        self.assertEqual(self.client.get(reverse('patient_detail', args=[9999])).status_code, 404)
+
+        search = self.client.get(reverse('search_patients'), {'query': 'Patient'})
+        self.assertNotContains(search, 'Patient 1')
+        search = self.client.get(reverse('search_patients'), {'query': 'Patient', 'history': '1'})
+        self.assertContains(search, 'Patient 1')
+
+        report = self.client.get(reverse('admission_report'), {'history': '1'})
+        self.assertEqual(report.context['stats']['total_admissions'], 3)
+        self.assertEqual(self.client.get(reverse('admission_report')).context['stats']['total_admissions'], 2)
+
+
+class ImportRecordsTests(TestCase):
+    HEADER = 'patient_name,age,gender,address,consult_doctor,problem,fee,diagnosis,mobile_number,email\n'
+
+    def setUp(self):
+        self.doctor = make_doctor()  # Dr. Sharma 0
+        self.stats = DashboardStats.load()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def run_import(self, kind, name, text, *args):
+        path = self.directory / name
+        path.write_text(text)
+        out = StringIO()
+        # Each batch commits, so run what waits on the commit (the change log) as well
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_records', kind, str(path), *args, stdout=out)
+        return path, out.getvalue()
+
+    def assertStatsChanged(self, **deltas):
+        stats = DashboardStats.objects.get(pk=1)
+        for field in ('total_patients', 'admitted_patients', 'total_doctors'):
+            self.assertEqual(getattr(stats, field), getattr(self.stats, field) + deltas.get(field, 0), field)
+
+    def test_valid_csv(self):
+        _, out = self.run_import('patients', 'patients.csv', self.HEADER
+                                 + 'Asha Rao,34,female,1 Lake Road,dr. sharma 0,Cough,300,Cold,9811111111,asha@example.com\n'
+                                 + 'Ravi Das,51,male,2 Hill Road,Dr. Sharma 0,Fever,500,Flu,9822222222,ravi@example.com\n')
+        self.assertIn('Imported 2 patients', out)
+        self.assertEqual(set(Patient.objects.values_list('patient_name', 'consult_doctor')),
+                         {('Asha Rao', self.doctor.did), ('Ravi Das', self.doctor.did)})
+        self.assertStatsChanged(total_patients=2, admitted_patients=2)
+        events = ChangeEvent.objects.order_by('id')
+        self.assertEqual([(event.model, event.action, event.changes['patient_name'][1]) for event in events],
+                         [('patient', 'create', 'Asha Rao'), ('patient', 'create', 'Ravi Das')])
+
+        # Doctors are not in the change log
+        self.run_import('doctors', 'doctors.jsonl', json.dumps({
+            'doctor_name': 'Dr. Iyer', 'father_name': 'K. Iyer', 'gender': 'female', 'dob': '1980-02-01',
+            'address': 'Clinic Lane', 'qualification': 'MBBS', 'experience': 12, 'last_worked_hospital': 'AIIMS',
+            'salary': '90000.00'}) + '\n')
+        self.assertTrue(Doctor.objects.filter(doctor_name='Dr. Iyer').exists())
+        self.assertStatsChanged(total_patients=2, admitted_patients=2, total_doctors=1)
+        self.assertEqual(ChangeEvent.objects.count(), 2)
+
+    def test_invalid_rows_are_rejected_with_their_errors(self):
+        row = {'patient_name': 'Asha Rao', 'age': 34, 'gender': 'female', 'address': '1 Lake Road',
+               'consult_doctor': 'Dr. Sharma 0', 'problem': 'Cough', 'fee': '300', 'diagnosis': 'Cold',
+               'mobile_number': '9811111111', 'email': 'asha@example.com'}
+        lines = [row, {**row, 'age': 'old'}, {**row, 'consult_doctor': 'Dr. Nobody'}]
+        path, out = self.run_import('patients', 'patients.jsonl',
+                                    ''.join(json.dumps(line) + '\n' for line in lines) + '{not json\n')
+        self.assertIn('Imported 1 patients', out)
+        self.assertIn('3 rejected', out)
+        rejects = [json.loads(line) for line in Path(f'{path}.rejects.jsonl').read_text().splitlines()]
+        self.assertEqual([reject['line'] for reject in rejects], [2, 3, 4])
+        self.assertEqual(set(rejects[0]['errors']), {'age'})
+        self.assertEqual(rejects[1]['errors'], {'consult_doctor': ["No doctor named 'Dr. Nobody'."]})
+        self.assertTrue(rejects[2]['errors'].startswith('invalid JSON'))
+        self.assertEqual(Patient.objects.count(), 1)
+        self.assertStatsChanged(total_patients=1, admitted_patients=1)
+
+    def test_duplicate_doctor_names_and_dry_runs_insert_nothing(self):
+        csv_text = self.HEADER + 'Asha Rao,34,female,1 Lake Road,Dr. Sharma 0,Cough,300,Cold,9811111111,a@example.com\n'
+        _, out = self.run_import('patients', 'dry.csv', csv_text, '--dry-run')
+        self.assertIn('Validated 1 patients', out)
+        self.assertFalse(Patient.objects.exists())
+
+        make_doctor()  # a second Dr. Sharma 0: the name no longer identifies one doctor
+        self.stats = DashboardStats.objects.get(pk=1)
+        path, out = self.run_import('patients', 'ambiguous.csv', csv_text)
+        self.assertIn('Imported 0 patients', out)
+        reject = json.loads(Path(f'{path}.rejects.jsonl').read_text())
+        self.assertEqual(reject['errors'], {'consult_doctor': ["More than one doctor is named 'Dr. Sharma 0'."]})
+        self.assertFalse(Patient.objects.exists())
+        self.assertStatsChanged()
+
+
+class BulkJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('root', password='pass12345')
+        self.client.force_login(self.admin)
+        doctor = make_doctor()
+        ward = make_ward(10)
+        self.patients = [make_patient(doctor, i, admitted=i < 7) for i in range(9)]
+        for patient in self.patients[:3]:
+            allocate_bed(patient, ward)
+        self.bills = [make_bill(patient, self.admin, i) for i, patient in enumerate(self.patients)]
+
+    def run_action(self, model, action):
+        """Submit an admin action across every row and return the job it queued"""
+        response = self.client.post(reverse(f'admin:hospital_{model}_changelist'), {
+            'action': action, 'select_across': '1', 'index': '0', '_selected_action': ['0'],
+        })
+        self.assertEqual(response.status_code, 302)
+        job = BulkJob.objects.get()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(list(Task.objects.values_list('name', 'args')), [('run_bulk_job', [job.pk])])
+        return job
+
+    def test_discharge_in_batches(self):
+        job = self.run_action('patient', 'mark_as_discharged')
+        self.assertEqual(Patient.objects.filter(is_admitted=True).count(), 7)
+        DashboardStats.rebuild()
+
+        with CaptureQueriesContext(connection) as queries:
+            job = bulk_jobs.run(job.pk, batch_size=2)
+        job_queries = len(queries)
+        self.assertEqual((job.status, job.total, job.processed, job.changed, job.progress), ('done', 9, 9, 7, 100))
+        self.assertFalse(Patient.objects.filter(is_admitted=True).exists())
+        self.assertFalse(Bed.objects.filter(occupied_by__isnull=False).exists())
+        self.assertEqual(DashboardStats.load().admitted_patients, 0)
+
+        # The batches are bounded: a batch size of 2 and of 5 differ only in how many batches run
+        job = BulkJob.objects.create(action='discharge_patients', selection=job.selection, total=job.total)
+        with CaptureQueriesContext(connection) as queries:
+            bulk_jobs.run(job.pk, batch_size=5)
+        self.assertLess(len(queries), job_queries)
+
+    def test_mark_paid_moves_rollup(self):
+        RevenueDailyRollup.rebuild()
+        job = self.run_action('bill', 'mark_as_paid')
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertEqual(Task.objects.get().result, {'changed': 6})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.changed), ('done', 6))
+        self.assertFalse(Bill.objects.exclude(payment_status='paid').exists())
+        paid = RevenueDailyRollup.objects.filter(payment_status='paid').aggregate(
+            total=Sum('amount'), gst=Sum('gst_amount'), gross=Sum('gross_amount'))
+        bills = Bill.objects.with_totals().aggregate(
+            total=Sum('amount'), gst=Sum('gst_amount'), gross=Sum('gross_amount'))
+        self.assertEqual(paid, bills)
+        self.assertEqual(bulk_jobs.run(job.pk).status, 'done')  # a finished job is not run again
+
+    def test_failed_batch_keeps_earlier_batches(self):
+        job = self.run_action('patient', 'mark_as_discharged')
+        calls = []
+
+        def flaky(pks):
+            if calls:
+                raise RuntimeError('database went away')
+            calls.append(pks)
+            return bulk_jobs.discharge_patients(pks)
+
+        bulk_jobs.ACTIONS['discharge_patients'] = (Patient, flaky)
+        try:
+            with self.assertRaises(RuntimeError):
+                bulk_jobs.run(job.pk, batch_size=4)
+        finally:
+            bulk_jobs.ACTIONS['discharge_patients'] = (Patient, bulk_jobs.discharge_patients)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.error), ('failed', 4, 'RuntimeError: database went away'))
+        self.assertEqual(Patient.objects.filter(is_admitted=True).count(), 3)
+        self.assertContains(self.client.get(reverse('admin:hospital_bulkjob_changelist')), '44%')
+
+    def test_selection_is_stored_as_key_runs(self):
+        pks = [patient.pk for patient in self.patients]
+        self.patients[4].delete()
+        job = bulk_jobs.enqueue('discharge_patients', Patient.objects.all(), self.admin)
+        self.assertEqual(job.selection, [[pks[0], pks[3]], [pks[5], pks[8]]])
+        self.assertEqual(job.total, 8)
+        Patient.objects.filter(pk=pks[6]).delete()  # an admitted patient gone before the job runs: skipped
+        job = bulk_jobs.run(job.pk, batch_size=3)
+        self.assertEqual((job.status, job.processed, job.changed), ('done', 8, 5))
+
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        self.user = make_user('clerk')
+
+    def test_run_and_report_status(self):
+        queued = tasks.enqueue(add_numbers, 2, b=3, user=self.user)
+        self.assertEqual(queued.status, 'queued')
+        self.assertEqual(tasks.work(burst=True), 1)
+        done = Task.objects.get(pk=queued.pk)
+        self.assertEqual((done.status, done.result, done.attempts), ('done', 5, 1))
+
+        self.client.force_login(self.user)
+        status = self.client.get(reverse('task_status', args=[queued.pk])).json()
+        self.assertEqual((status['status'], status['result']), ('done', 5))
+        self.client.force_login(make_user('someone_else'))
+        self.assertEqual(self.client.get(reverse('task_status', args=[queued.pk])).status_code, 404)
+
+    def test_retry_with_backoff_then_fail(self):
+        queued = tasks.enqueue(always_fails)
+        before = timezone.now()
+        tasks.work(burst=True)
+        retry = Task.objects.get(pk=queued.pk)
+        self.assertEqual((retry.status, retry.attempts, retry.error), ('queued', 1, 'RuntimeError: printer on fire'))
+        self.assertGreaterEqual(retry.run_at, before + timedelta(seconds=tasks.RETRY_BACKOFF))
+        self.assertIsNone(tasks.claim())  # not due yet
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        tasks.work(burst=True)
+        failed = Task.objects.get(pk=queued.pk)
+        self.assertEqual((failed.status, failed.attempts), ('failed', 2))
+        self.assertEqual([tasks.retry_delay(n) for n in (1, 2, 3)],
+                         [tasks.RETRY_BACKOFF, tasks.RETRY_BACKOFF * 2, tasks.RETRY_BACKOFF * 4])
+
+    def test_stalled_task_is_reclaimed(self):
+        queued = tasks.enqueue(add_numbers, 1, 1)
+        claimed = tasks.claim('dead-worker')
+        self.assertEqual((claimed.pk, claimed.status, claimed.worker), (queued.pk, 'running', 'dead-worker'))
+        self.assertIsNone(tasks.claim())
+        Task.objects.filter(pk=queued.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=tasks.STALL_TIMEOUT + 1))
+        self.assertEqual(tasks.work(burst=True), 1)
+        self.assertEqual(Task.objects.get(pk=queued.pk).result, 2)
+
+        # The first worker was only slow: its late result does not overwrite the rerun's
+        tasks.execute(claimed)
+        self.assertEqual(Task.objects.get(pk=queued.pk).attempts, 2)
+
+    def test_long_running_task_with_a_heartbeat_is_left_alone(self):
+        queued = tasks.enqueue(add_numbers, 1, 1)
+        tasks.claim('busy-worker')
+        Task.objects.filter(pk=queued.pk).update(started_at=timezone.now() - timedelta(hours=3))
+        self.assertEqual(tasks._requeue_stalled(), 0)
+        self.assertEqual(Task.objects.get(pk=queued.pk).status, 'running')
+
+    def test_stalled_task_without_attempts_left_fails(self):
+        queued = tasks.enqueue(always_fails)  # max_attempts=2
+        Task.objects.filter(pk=queued.pk).update(attempts=1)
+        tasks.claim('dead-worker')
+        Task.objects.filter(pk=queued.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=tasks.STALL_TIMEOUT + 1))
+        self.assertEqual(tasks._requeue_stalled(), 0)
+        failed = Task.objects.get(pk=queued.pk)
+        self.assertEqual((failed.status, failed.error), ('failed', tasks.STALLED_ERROR))
+        self.assertIsNone(tasks.claim())
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.user = make_user('integration')
+        self.client.force_login(self.user)
+        self.doctor = make_doctor()
+        self.patients = [make_patient(self.doctor, i, admitted=i % 2 == 0) for i in range(5)]
+        self.bills = [make_bill(patient, self.user, i) for i, patient in enumerate(self.patients)]
+
+    def get(self, resource, pk=None, **params):
+        url = reverse('api_detail', args=[resource, pk]) if pk else reverse('api_list', args=[resource])
+        return self.client.get(url, params)
+
+    def test_sparse_fields_select_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('patients', fields='pid,patient_name', is_admitted='1')
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['results']
+        self.assertEqual([row['pid'] for row in rows], [p.pid for p in reversed(self.patients) if p.is_admitted])
+        self.assertEqual(set(rows[0]), {'pid', 'patient_name'})
+        sql = queries[-1]['sql']
+        self.assertIn('patient_name', sql)
+        self.assertNotIn('diagnosis', sql)
+
+    def test_computed_fields_load_instances(self):
+        bill = self.bills[2]
+        row = self.get('bills', bill.bid, fields='bid,total_amount').json()
+        self.assertEqual(row, {'bid': bill.bid, 'total_amount': str(bill.total_amount)})
+
+    def test_batch_lookup_is_one_query(self):
+        wanted = [self.patients[0].pid, self.patients[3].pid]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('patients', ids=','.join(map(str, wanted)), fields='pid')
+        self.assertEqual(response.json(), {'results': [{'pid': pid} for pid in reversed(wanted)]})
+        self.assertEqual(len(queries), 3)  # session, user and the rows
+
+    def test_cursor_pages_cover_every_row(self):
+        seen = []
+        url = reverse('api_list', args=['bills']) + '?page_size=2&fields=bid'
+        while url:
+            page = self.client.get(url).json()
+            seen += [row['bid'] for row in page['results']]
+            url = page['next'] and reverse('api_list', args=['bills']) + page['next']
+        self.assertEqual(seen, [bill.bid for bill in reversed(self.bills)])
+
+    def test_errors_are_json(self):
+        self.assertEqual(self.get('patients', fields='pid,secret').status_code, 400)
+        self.assertEqual(self.get('patients', ids='1,x').json(),
+                         {'errors': {'ids': ['Expected comma-separated integer ids.']}})
+        self.assertEqual(self.get('nurses').status_code, 404)
+        self.assertEqual(self.get('patients', 999999).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.get('patients').status_code, 401)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.user = make_user('clerk')
+        self.client.force_login(self.user)
+        self.doctor = make_doctor()
+        self.patients = [make_patient(self.doctor, i) for i in range(30)]
+
+    def test_forms_render_only_the_selected_option(self):
+        patient = self.patients[7]
+        response = self.client.get(reverse('generate_bill', args=[patient.pid]))
+        self.assertContains(response, f'<option value="{patient.pid}" selected>')
+        self.assertNotContains(response, str(self.patients[8]))
+        self.assertContains(response, 'data-autocomplete-url="/autocomplete/patients/"')
+        self.assertContains(response, 'hospital/js/autocomplete.js')
+
+        response = self.client.get(reverse('mark_attendance'))
+        self.assertNotContains(response, f'>{self.user.username}</option>')
+
+    def test_submitted_choice_is_validated_against_the_queryset(self):
+        patient = self.patients[0]
+        data = {'patient': patient.pid, 'consult_doctor': self.doctor.did, 'diagnosis': 'Viral fever',
+                'contact_number': '9000000000', 'amount': '100.00', 'payment_status': 'pending'}
+        response = self.client.post(reverse('generate_bill', args=[patient.pid]), data)
+        self.assertRedirects(response, reverse('bill_detail', args=[Bill.objects.get().bid]),
+                             fetch_redirect_response=False)
+        response = self.client.post(reverse('generate_bill', args=[patient.pid]), {**data, 'patient': 999999})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['patient'])
+
+    def test_prefix_matches(self):
+        url = reverse('autocomplete', args=['patients'])
+        results = self.client.get(url, {'query': 'patient 2'}).json()['results']
+        self.assertEqual([row['text'] for row in results],
+                         sorted(str(p) for p in self.patients if p.patient_name.startswith('Patient 2')))
+        self.assertEqual(len(self.client.get(url, {'query': 'Patient'}).json()['results']),
+                         search.AUTOCOMPLETE_LIMIT)
+        by_pid = self.client.get(url, {'query': str(self.patients[3].pid)}).json()['results']
+        self.assertIn(self.patients[3].pid, [row['id'] for row in by_pid])
+        self.assertEqual(self.client.get(url).json(), {'results': []})
+        staff = self.client.get(reverse('autocomplete', args=['staff']), {'query': 'CLE'}).json()
+        self.assertEqual(staff['results'], [{'id': self.user.pk, 'text': 'clerk'}])
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['beds'])).status_code, 404)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentBedAllocationTests(TransactionTestCase):
+    """Dozens of admissions race for fewer beds; no bed may go to two patients"""
+
+    THREADS = 40
+    BEDS = 15
+
+    def test_no_double_allocation(self):
+        doctor = make_doctor()
+        ward = make_ward(self.BEDS)
+        patients = [make_patient(doctor, i) for i in range(self.THREADS)]
+        barrier = threading.Barrier(self.THREADS)
+        allocated, full, errors = [], [], []
+
+        def admit(patient):
+            try:
+                barrier.wait()
+                allocated.append(allocate_bed(patient, ward).pk)
+            except NoBedAvailable:
+                full.append(patient.pk)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=admit, args=(patient,)) for patient in patients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(allocated), self.BEDS)
+        self.assertEqual(len(set(allocated)), self.BEDS)
+        self.assertEqual(len(full), self.THREADS - self.BEDS)
+        self.assertEqual(Bed.objects.filter(ward=ward, occupied_by__isnull=False).count(), self.BEDS)
+        self.assertEqual(BedStay.objects.filter(ended_at__isnull=True).count(), self.BEDS)
+
+
+class TaskHeartbeatTests(TransactionTestCase):
+    """The heartbeat thread writes on its own connection, which only sees committed rows"""
+
+    def test_running_task_keeps_beating(self):
+        queued = tasks.enqueue(nap, 0.5)
+        with mock.patch.object(tasks, 'HEARTBEAT_SECONDS', 0.05):
+            tasks.work(burst=True)
+        done = Task.objects.get(pk=queued.pk)
+        self.assertEqual(done.status, 'done')
+        self.assertGreater(done.heartbeat_at, done.started_at)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentTaskClaimTests(TransactionTestCase):
+    """Workers claiming at the same time each get a different task"""
+
+    WORKERS = 10
+
+    def test_each_task_claimed_once(self):
+        for i in range(self.WORKERS):
+            tasks.enqueue(add_numbers, i, i)
+        barrier = threading.Barrier(self.WORKERS)
+        claimed, errors = [], []
+
+        def claim(n):
+            try:
+                barrier.wait()
+                claimed.append(tasks.claim(f'worker-{n}').pk)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=claim, args=(n,)) for n in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(claimed)), self.WORKERS)
+        self.assertEqual(Task.objects.filter(status='running').count(), self.WORKERS)
+
+
+class ChangeLogTests(TransactionTestCase):
+    """Change events need real commits: they are kept only once their transaction commits"""
+
+    def setUp(self):
+        self.staff = make_user('auditor')
+        self.staff.is_staff = True
+        self.staff.save()
+        self.client.force_login(self.staff)
+        self.patient = make_patient(make_doctor())
+        self.bill = make_bill(self.patient, self.staff, 1)  # pending
+
+    def events(self, **filters):
+        return list(ChangeEvent.objects.filter(**filters).order_by('pk'))
+
+    def test_request_changes_are_written_together_with_the_user(self):
+        created = self.events(model='patient', object_id=self.patient.pk)
+        self.assertEqual([event.action for event in created], ['create'])
+        self.assertEqual(created[0].changes['patient_name'], [None, 'Patient 0'])
+        self.assertIsNone(created[0].user_id)  # made outside any request
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('update_bill_payment', args=[self.bill.bid]),
+                             {'payment_status': 'paid', 'payment_method': 'upi'})
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "hospital_changeevent"')]
+        self.assertEqual(len(inserts), 1)
+        update = self.events(model='bill', action='update').pop()
+        self.assertEqual(update.changes, {'payment_status': ['pending', 'paid'], 'payment_method': ['card', 'upi']})
+        self.assertEqual(update.user_id, self.staff.pk)
+
+        self.client.post(reverse('discharge_patient', args=[self.patient.pid]))
+        discharge = self.events(model='patient', action='update').pop()
+        self.assertEqual(discharge.changes['is_admitted'], [True, False])
+        self.assertEqual(set(discharge.changes), {'is_admitted', 'discharge_date'})
+
+    def test_bulk_updates_and_deletes_are_logged(self):
+        other = make_patient(self.patient.consult_doctor, 1)
+        with changelog.recording(self.staff):
+            Patient.objects.filter(pk__in=[self.patient.pk, other.pk]).update(problem='Dengue', updated_at=timezone.now())
+        updates = self.events(model='patient', action='update')
+        self.assertEqual({event.object_id for event in updates}, {self.patient.pk, other.pk})
+        self.assertEqual(updates[0].changes, {'problem': ['Fever and cough', 'Dengue']})
+        self.assertEqual({event.user_id for event in updates}, {self.staff.pk})
+
+        Patient.objects.filter(pk=other.pk).update(problem='Dengue')  # no change, no event
+        self.assertEqual(len(self.events(model='patient', action='update')), 2)
+
+        pid = self.patient.pk
+        self.patient.delete()  # cascades to the bill
+        deleted = {(event.model, event.object_id) for event in self.events(action='delete')}
+        self.assertEqual(deleted, {('patient', pid), ('bill', self.bill.bid)})
+
+    def test_bulk_imported_patients_are_logged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'patients.csv'
+            path.write_text('patient_name,age,gender,address,consult_doctor,problem,fee,diagnosis,mobile_number,email\n'
+                            'Asha Rao,34,female,1 Lake Road,Dr. Sharma 0,Cough,300,Cold,9811111111,asha@example.com\n')
+            call_command('import_records', 'patients', str(path), stdout=StringIO())
+        imported = Patient.objects.get(patient_name='Asha Rao')
+        created = self.events(model='patient', object_id=imported.pk)
+        self.assertEqual([event.action for event in created], ['create'])
+        self.assertEqual(created[0].changes['consult_doctor_id'], [None, self.patient.consult_doctor_id])
+
+    def test_reader_tails_with_a_cursor(self):
+        self.bill.payment_status = 'paid'
+        self.bill.save()
+        self.assertEqual(changelog.read()[0], [])  # not settled yet
+        ChangeEvent.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+
+        first, cursor = changelog.read(limit=2)
+        rest, end = changelog.read(after=cursor)
+        self.assertEqual([event.action for event in first + rest], ['create', 'create', 'update'])
+        self.assertEqual(changelog.read(after=end), ([], end))
+
+        feed = self.client.get(reverse('change_log'), {'after': cursor, 'model': 'bill'}).json()
+        self.assertEqual([event['action'] for event in feed['events']], ['update'])
+        self.assertEqual(feed['cursor'], end)
+        self.client.force_login(make_user('nurse'))
+        self.assertEqual(self.client.get(reverse('change_log')).status_code, 403)
@@ -1,6 +1,6 @@
 # hospital/urls.py
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
 urlpatterns = [
     # ==================== Home & Auth ====================
@@ -42,6 +42,8 @@ urlpatterns = [
     # ==================== Attendance URLs ====================
     path('attendance/', views.attendance_list, name='attendance_list'),
     path('attendance/mark/', views.mark_attendance, name='mark_attendance'),
+    path('attendance/roster/', views.attendance_roster, name='attendance_roster'),
+    path('attendance/clock/', views.clock_attendance, name='clock_attendance'),
     
     # ==================== Feedback URLs ====================
     path('feedback/', views.feedback_form, name='feedback_form'),
@@ -51,4 +53,26 @@ urlpatterns = [
     path('reports/admissions/', views.admission_report, name='admission_report'),
     path('reports/revenue/', views.revenue_report, name='revenue_report'),
     path('reports/attendance/', views.attendance_report, name='attendance_report'),
+    path('reports/admissions/export/', views.export_admission_report, name='export_admission_report'),
+    path('reports/revenue/export/', views.export_revenue_report, name='export_revenue_report'),
+    path('reports/attendance/export/', views.export_attendance_report, name='export_attendance_report'),
+
+    # ==================== Background Task URLs ====================
+    path('tasks/<int:task_id>/', views.task_status, name='task_status'),
+
+    # ==================== Change Log URLs ====================
+    path('changes/', views.change_log, name='change_log'),
+
+    # ==================== Autocomplete URLs ====================
+    path('autocomplete/<str:source>/', views.autocomplete, name='autocomplete'),
+
+    # ==================== JSON API ====================
+    path(f'api/{api.VERSION}/<str:resource>/', api.resource_list, name='api_list'),
+    path(f'api/{api.VERSION}/<str:resource>/<int:pk>/', api.resource_detail, name='api_detail'),
+
+    # ==================== Async (ASGI) URLs ====================
+    path('async/dashboard/', async_views.dashboard_view, name='async_dashboard'),
+    path('async/reports/admissions/', async_views.admission_report, name='async_admission_report'),
+    path('async/reports/revenue/', async_views.revenue_report, name='async_revenue_report'),
+    path('async/reports/attendance/', async_views.attendance_report, name='async_attendance_report'),
 ]
\ No newline at end of file
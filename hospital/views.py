@@ -1,14 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum, Count
+from django.db import transaction
+from django.db.models import Q, F, Sum, Count, Max, DateTimeField
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
-from .models import Doctor, Patient, Ward, Bill, Attendance, Feedback, UserProfile
-from .forms import (UserRegistrationForm, LoginForm, DoctorForm, PatientForm, WardForm,
-                   AttendanceForm, BillForm, FeedbackForm, SearchForm, DateRangeForm)
-from datetime import datetime, timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from .models import (Doctor, Patient, Ward, Bed, Bill, Attendance, Feedback, UserProfile, DashboardStats,
+                     RevenueDailyRollup, Task, gst_percent)
+from .forms import (UserRegistrationForm, LoginForm, DoctorForm, PatientForm, AdmitPatientForm, WardForm,
+                   AttendanceForm, RosterFilterForm, RosterFormSet, ClockForm, BillForm, FeedbackForm, SearchForm,
+                   DateRangeForm)
+from .attendance import clock, upsert_attendance
+from .attendance_matrix import AttendanceMatrix, report_window
+from .beds import NoBedAvailable, allocate_bed, release_bed
+from .conditional import conditional_page, keyset_state, row_state
+from .gather import run_queries
+from .pagination import paginate_keyset
+from .replicas import replica_reads
+from . import archive, bill_documents, caching, changelog, exports, search
+from datetime import datetime, time, timedelta
+
+
 
 # ==================== Home & Authentication Views ====================
 
@@ -72,17 +90,33 @@ def logout_view(request):
     messages.info(request, 'You have been logged out successfully.')
     return redirect('index')
 
+# Models whose rows feed the dashboard cards and recent-activity tables
+DASHBOARD_MODELS = [Patient, Doctor, Bill]
+
+def dashboard_queries():
+    """Independent queries behind the dashboard (see hospital/gather.py)"""
+    return {
+        'stats': DashboardStats.load,
+        'recent_patients': lambda: list(Patient.objects.select_related('consult_doctor').order_by('-admission_date')[:5]),
+        'recent_bills': lambda: list(Bill.objects.with_totals().select_related('patient').order_by('-bill_date')[:5]),
+    }
+
+def dashboard_context(results):
+    stats = results['stats']
+    return {
+        'total_patients': stats.total_patients,
+        'admitted_patients': stats.admitted_patients,
+        'total_doctors': stats.total_doctors,
+        'total_revenue': stats.total_revenue,
+        'recent_patients': results['recent_patients'],
+        'recent_bills': results['recent_bills'],
+    }
+
 @login_required
 def dashboard_view(request):
     """Dashboard view with statistics"""
-    context = {
-        'total_patients': Patient.objects.count(),
-        'admitted_patients': Patient.objects.filter(is_admitted=True).count(),
-        'total_doctors': Doctor.objects.count(),
-        'total_revenue': Bill.objects.aggregate(Sum('amount'))['amount__sum'] or 0,
-        'recent_patients': Patient.objects.order_by('-admission_date')[:5],
-        'recent_bills': Bill.objects.order_by('-bill_date')[:5],
-    }
+    results = caching.cached('dashboard', DASHBOARD_MODELS, lambda: run_queries(dashboard_queries()))
+    context = dashboard_context(results)
     return render(request, 'hospital/auth/dashboard.html', context)
 
 @login_required
@@ -118,10 +152,17 @@ def add_doctor(request):
 @login_required
 def doctor_list(request):
     """List all doctors"""
-    doctors = Doctor.objects.all().order_by('-did')
-    return render(request, 'hospital/doctor/doctor_list.html', {'doctors': doctors})
+    page = caching.cached('doctor_list', [Doctor], lambda: paginate_keyset(request, Doctor.objects.all(), ('did',)),
+                          request.GET.urlencode())
+    return render(request, 'hospital/doctor/doctor_list.html', {'doctors': page, 'page_obj': page})
+
+def _doctor_detail_state(request, did):
+    return row_state(Doctor.objects.filter(did=did).annotate(
+        patient_count=Count('patients'), patients_changed=Max('patients__updated_at'),
+    ).values_list('updated_at', 'patient_count', 'patients_changed').first())
 
 @login_required
+@conditional_page(_doctor_detail_state)
 def doctor_detail(request, did):
     """Doctor detail view"""
     doctor = get_object_or_404(Doctor, did=did)
@@ -159,28 +200,63 @@ def delete_doctor(request, did):
 def add_patient(request):
     """Admit new patient"""
     if request.method == 'POST':
-        form = PatientForm(request.POST)
+        form = AdmitPatientForm(request.POST)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Patient admitted successfully!')
-            return redirect('patient_list')
+            ward = form.cleaned_data['ward']
+            try:
+                # The patient is only admitted if a bed could be claimed for them
+                with transaction.atomic():
+                    patient = form.save()
+                    bed = allocate_bed(patient, ward) if ward else None
+            except NoBedAvailable:
+                form.add_error('ward', f'{ward.ward_name} has no free bed.')
+            else:
+                where = f' to {bed}' if bed else ''
+                messages.success(request, f'Patient admitted successfully{where}!')
+                return redirect('patient_list')
     else:
-        form = PatientForm()
+        form = AdmitPatientForm()
     return render(request, 'hospital/patient/add_patient.html', {'form': form})
 
-@login_required
-def patient_list(request):
-    """List all patients"""
-    patients = Patient.objects.all().order_by('-admission_date')
+PATIENT_KEYS = ('admission_date', 'pid')
+
+def history_requested(request):
+    """Whether the page should include archived patients (hospital/archive.py)"""
+    return bool(request.GET.get('history'))
+
+def _patients(request):
+    patients = archive.patients(history_requested(request)).select_related('consult_doctor')
     admitted_only = request.GET.get('admitted', False)
     if admitted_only:
         patients = patients.filter(is_admitted=True)
-    return render(request, 'hospital/patient/patient_list.html', {'patients': patients})
+    return patients
+
+def _patient_list_state(request):
+    return keyset_state(request, _patients(request), PATIENT_KEYS, 'consult_doctor')
+
+@login_required
+@conditional_page(_patient_list_state)
+def patient_list(request):
+    """List all patients"""
+    page = paginate_keyset(request, _patients(request), PATIENT_KEYS)
+    return render(request, 'hospital/patient/patient_list.html', {
+        'patients': page, 'page_obj': page, 'history': history_requested(request),
+    })
+
+def _patient_detail_state(request, pid):
+    # A patient has at most one bed, so the bills are not counted twice
+    return row_state(Patient.objects.filter(pid=pid).annotate(
+        bill_count=Count('bills'), bills_changed=Max('bills__updated_at'),
+    ).values_list('updated_at', 'consult_doctor__pk', 'consult_doctor__updated_at', 'bed__pk', 'bed__updated_at',
+                  'bed__ward__updated_at', 'bill_count', 'bills_changed').first())
 
 @login_required
+@conditional_page(_patient_detail_state)
 def patient_detail(request, pid):
     """Patient detail view"""
-    patient = get_object_or_404(Patient, pid=pid)
+    patient = archive.find_patient(pid)
+    if patient is None:
+        raise Http404('No patient matches the given query.')
     bills = patient.bills.all()
     return render(request, 'hospital/patient/patient_detail.html', {
         'patient': patient,
@@ -206,15 +282,24 @@ def discharge_patient(request, pid):
     """Discharge patient"""
     patient = get_object_or_404(Patient, pid=pid)
     if request.method == 'POST':
-        patient.is_admitted = False
-        patient.discharge_date = datetime.now()
-        patient.save()
+        with transaction.atomic():
+            patient.is_admitted = False
+            patient.discharge_date = datetime.now()
+            patient.save()
+            release_bed(patient)
         messages.success(request, f'Patient {patient.patient_name} discharged successfully!')
         return redirect('patient_list')
     return render(request, 'hospital/patient/discharge_patient.html', {'patient': patient})
 
 # ==================== Ward Views ====================
 
+def _with_occupancy(wards):
+    """Annotate bed_count, occupied_count and free_count in the same query as the wards"""
+    return wards.annotate(
+        bed_count=Count('beds'),
+        occupied_count=Count('beds', filter=Q(beds__occupied_by__isnull=False)),
+    ).annotate(free_count=F('bed_count') - F('occupied_count'))
+
 @login_required
 def add_ward(request):
     """Add new ward"""
@@ -228,17 +313,31 @@ def add_ward(request):
         form = WardForm()
     return render(request, 'hospital/ward/add_ward.html', {'form': form})
 
+def _ward_list_state(request):
+    # The table is a cached fragment already: its model versions validate it without a query
+    return caching.versions(Ward, Bed, Patient), None
+
 @login_required
+@conditional_page(_ward_list_state)
 def ward_list(request):
     """List all wards"""
-    wards = Ward.objects.all().order_by('-wid')
+    wards = _with_occupancy(Ward.objects.all()).order_by('-wid')
     return render(request, 'hospital/ward/ward_list.html', {'wards': wards})
 
+def _ward_detail_state(request, wid):
+    return row_state(Ward.objects.filter(wid=wid).annotate(
+        bed_count=Count('beds'), occupied=Count('beds__occupied_by'), beds_changed=Max('beds__updated_at'),
+        occupants_changed=Max('beds__occupied_by__updated_at'),
+    ).values_list('updated_at', 'bed_count', 'occupied', 'beds_changed', 'occupants_changed').first())
+
 @login_required
+@conditional_page(_ward_detail_state)
 def ward_detail(request, wid):
     """Ward detail view"""
-    ward = get_object_or_404(Ward, wid=wid)
-    return render(request, 'hospital/ward/ward_detail.html', {'ward': ward})
+    ward = get_object_or_404(_with_occupancy(Ward.objects.all()), wid=wid)
+    occupied_beds = ward.beds.filter(occupied_by__isnull=False).select_related('occupied_by')
+    return render(request, 'hospital/ward/ward_detail.html', {'ward': ward, 'occupied_beds': occupied_beds})
+
 
 # ==================== Bill Views ====================
 
@@ -262,25 +361,41 @@ def generate_bill(request, patient_id):
             'contact_number': patient.mobile_number,
             'amount': patient.fee
         })
-    return render(request, 'hospital/bill/generate_bill.html', {'form': form, 'patient': patient})
+    return render(request, 'hospital/bill/generate_bill.html', {
+        'form': form, 'patient': patient, 'gst_percent': gst_percent(),
+    })
 
-@login_required
-def bill_list(request):
-    """List all bills"""
-    bills = Bill.objects.all().order_by('-bill_date')
+def _bills(request):
+    bills = Bill.objects.with_totals().select_related('patient', 'consult_doctor')
     
     # Filter by payment status
     status = request.GET.get('status')
     if status:
         bills = bills.filter(payment_status=status)
-    
-    return render(request, 'hospital/bill/bill_list.html', {'bills': bills})
+    return bills
+
+def _bill_keys(request):
+    # Newest first, or largest gross total first with ?sort=total
+    return ('gross_amount', 'bid') if request.GET.get('sort') == 'total' else ('bill_date', 'bid')
+
+def _bill_list_state(request):
+    return keyset_state(request, _bills(request), _bill_keys(request), 'patient', 'consult_doctor')
+
+@login_required
+@conditional_page(_bill_list_state)
+def bill_list(request):
+    """List all bills"""
+    page = paginate_keyset(request, _bills(request), _bill_keys(request))
+    return render(request, 'hospital/bill/bill_list.html', {'bills': page, 'page_obj': page})
 
 @login_required
 def bill_detail(request, bill_id):
-    """Bill detail view (for printing)"""
-    bill = get_object_or_404(Bill, bid=bill_id)
-    return render(request, 'hospital/bill/bill_detail.html', {'bill': bill})
+    """Bill detail view (for printing); paid bills are served from their stored document"""
+    bills = Bill.objects.select_related('patient', 'consult_doctor', 'created_by', 'document').defer('document__html')
+    bill = get_object_or_404(bills, bid=bill_id)
+    if bill.payment_status == 'paid':
+        return bill_documents.document_response(request, bill)
+    return render(request, 'hospital/bill/bill_detail.html', {'bill': bill, 'gst_percent': gst_percent()})
 
 @login_required
 def update_bill_payment(request, bill_id):
@@ -294,42 +409,35 @@ def update_bill_payment(request, bill_id):
         bill.save()
         messages.success(request, 'Payment status updated successfully!')
         return redirect('bill_detail', bill_id=bill_id)
+    return redirect('bill_detail', bill_id=bill_id)
 
 # ==================== Search Views ====================
 
 @login_required
+@replica_reads
 def search_patients(request):
     """Search patients"""
     form = SearchForm(request.GET or None)
     patients = None
     
     if form.is_valid() and form.cleaned_data['query']:
-        query = form.cleaned_data['query']
-        patients = Patient.objects.filter(
-            Q(patient_name__icontains=query) |
-            Q(mobile_number__icontains=query) |
-            Q(email__icontains=query) |
-            Q(pid__icontains=query)
-        ).order_by('-admission_date')
+        patients = search.search_patients(form.cleaned_data['query'], history=history_requested(request))
     
     return render(request, 'hospital/patient/search_patients.html', {
         'form': form,
-        'patients': patients
+        'patients': patients,
+        'history': history_requested(request),
     })
 
 @login_required
+@replica_reads
 def search_doctors(request):
     """Search doctors"""
     form = SearchForm(request.GET or None)
     doctors = None
     
     if form.is_valid() and form.cleaned_data['query']:
-        query = form.cleaned_data['query']
-        doctors = Doctor.objects.filter(
-            Q(doctor_name__icontains=query) |
-            Q(qualification__icontains=query) |
-            Q(did__icontains=query)
-        )
+        doctors = search.search_doctors(form.cleaned_data['query'])
     
     return render(request, 'hospital/doctor/search_doctors.html', {
         'form': form,
@@ -337,23 +445,31 @@ def search_doctors(request):
     })
 
 @login_required
+@replica_reads
 def search_bills(request):
     """Search bills"""
     form = SearchForm(request.GET or None)
     bills = None
     
     if form.is_valid() and form.cleaned_data['query']:
-        query = form.cleaned_data['query']
-        bills = Bill.objects.filter(
-            Q(patient__patient_name__icontains=query) |
-            Q(bid__icontains=query)
-        ).order_by('-bill_date')
+        bills = search.search_bills(form.cleaned_data['query'])
     
     return render(request, 'hospital/bill/search_bills.html', {
         'form': form,
         'bills': bills
     })
 
+@login_required
+@replica_reads
+def autocomplete(request, source):
+    """Prefix matches for an AutocompleteSelect widget, as JSON"""
+    lookup = search.AUTOCOMPLETE.get(source)
+    if lookup is None:
+        raise Http404('Unknown autocomplete source')
+    query = request.GET.get('query', '').strip()[:100]
+    results = [{'id': obj.pk, 'text': str(obj)} for obj in lookup(query)] if query else []
+    return JsonResponse({'results': results})
+
 # ==================== Attendance Views ====================
 
 @login_required
@@ -362,17 +478,80 @@ def mark_attendance(request):
     if request.method == 'POST':
         form = AttendanceForm(request.POST)
         if form.is_valid():
-            form.save()
+            upsert_attendance([form.save(commit=False)])
             messages.success(request, 'Attendance marked successfully!')
             return redirect('attendance_list')
     else:
         form = AttendanceForm()
     return render(request, 'hospital/attendance/mark_attendance.html', {'form': form})
 
+@login_required
+def attendance_roster(request):
+    """Mark a whole shift's attendance for one day on a single page"""
+    params = request.GET.copy()
+    params.setdefault('date', timezone.localdate().isoformat())
+    filter_form = RosterFilterForm(params)
+    if not filter_form.is_valid():
+        filter_form = RosterFilterForm({'date': timezone.localdate().isoformat()})
+        filter_form.is_valid()
+    day, role = filter_form.cleaned_data['date'], filter_form.cleaned_data['role']
+
+    staff = User.objects.filter(is_active=True, userprofile__isnull=False).order_by('first_name', 'username')
+    if role:
+        staff = staff.filter(userprofile__role=role)
+    staff = list(staff.values('id', 'username', 'first_name', 'last_name', 'userprofile__role'))
+
+    if request.method == 'POST':
+        formset = RosterFormSet(request.POST)
+        if formset.is_valid():
+            allowed = {member['id'] for member in staff}
+            records = [
+                Attendance(staff_id=row['staff_id'], date_of_attendance=day, status=row['status'],
+                           incoming_time=row['incoming_time'], outgoing_time=row['outgoing_time'],
+                           task_involved=row['task_involved'])
+                for row in formset.cleaned_data if row and row['staff_id'] in allowed
+            ]
+            with transaction.atomic():
+                upsert_attendance(records)
+            messages.success(request, f'Attendance saved for {len(records)} staff on {day:%d %b %Y}.')
+            return redirect(f"{request.path}?{params.urlencode()}")
+    else:
+        marked = {
+            row['staff_id']: row for row in Attendance.objects.filter(date_of_attendance=day, staff__in=[m['id'] for m in staff])
+            .values('staff_id', 'status', 'incoming_time', 'outgoing_time', 'task_involved')
+        }
+        formset = RosterFormSet(initial=[
+            marked.get(member['id'], {'staff_id': member['id'], 'status': 'present'}) for member in staff
+        ])
+    return render(request, 'hospital/attendance/roster.html', {
+        'filter_form': filter_form,
+        'day': day,
+        'rows': zip(staff, formset.forms),
+        'formset': formset,
+    })
+
+@login_required
+@require_POST
+def clock_attendance(request):
+    """Clock the current user (or ``staff``) in or out for today; answers JSON"""
+    form = ClockForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    staff_id = form.cleaned_data['staff'] or request.user.pk
+    if staff_id != request.user.pk and not User.objects.filter(pk=staff_id, is_active=True).exists():
+        return JsonResponse({'errors': {'staff': ['Unknown staff member.']}}, status=400)
+    record = clock(staff_id, form.cleaned_data['action'])
+    return JsonResponse({
+        'staff': staff_id,
+        'date': record.date_of_attendance.isoformat(),
+        'action': form.cleaned_data['action'],
+        'time': (record.incoming_time or record.outgoing_time).isoformat(),
+    })
+
 @login_required
 def attendance_list(request):
     """List all attendance records"""
-    attendances = Attendance.objects.all().order_by('-date_of_attendance')[:50]
+    attendances = Attendance.objects.select_related('staff').order_by('-date_of_attendance')[:50]
     return render(request, 'hospital/attendance/attendance_list.html', {'attendances': attendances})
 
 # ==================== Feedback Views ====================
@@ -389,96 +568,228 @@ def feedback_form(request):
         form = FeedbackForm()
     return render(request, 'hospital/feedback/feedback_form.html', {'form': form})
 
+FEEDBACK_KEYS = ('created_at', 'id')
+
 @login_required
 def feedback_list(request):
     """List all feedback (admin only)"""
-    feedbacks = Feedback.objects.all().order_by('-created_at')
-    return render(request, 'hospital/feedback/feedback_list.html', {'feedbacks': feedbacks})
+    page = paginate_keyset(request, Feedback.objects.all(), FEEDBACK_KEYS)
+    return render(request, 'hospital/feedback/feedback_list.html', {'feedbacks': page, 'page_obj': page})
 
 # ==================== Report Views ====================
 
+def _day_start(day):
+    """Midnight at the start of ``day`` in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def _filter_date_range(queryset, field, form):
+    """Apply a DateRangeForm's inclusive start/end dates to ``field``.
+
+    DateTimeFields are compared against local midnight so the end date
+    covers its whole day and the comparison can use the column's index.
+    """
+    if not form.is_valid():
+        return queryset
+    start_date = form.cleaned_data.get('start_date')
+    end_date = form.cleaned_data.get('end_date')
+    is_datetime = isinstance(queryset.model._meta.get_field(field), DateTimeField)
+    if start_date:
+        start = _day_start(start_date) if is_datetime else start_date
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end_date:
+        if is_datetime:
+            queryset = queryset.filter(**{f'{field}__lt': _day_start(end_date + timedelta(days=1))})
+        else:
+            queryset = queryset.filter(**{f'{field}__lte': end_date})
+    return queryset
+
+def _admissions_in_range(form, history=False):
+    return _filter_date_range(archive.patients(history), 'admission_date', form)
+
+def _bills_in_range(form):
+    return _filter_date_range(Bill.objects.all(), 'bill_date', form)
+
+# Each report is split into its independent queries and the context built
+# from their results, so the async views in hospital/async_views.py can run
+# the same queries concurrently.
+
+def admission_report_queries(form, history=False):
+    admissions = _admissions_in_range(form, history)
+    return {
+        'total_admissions': admissions.count,
+        'currently_admitted': admissions.filter(is_admitted=True).count,
+        'discharged': admissions.filter(is_admitted=False).count,
+        'admissions': lambda: list(admissions.select_related('consult_doctor').order_by('-admission_date')[:50]),
+        'by_doctor': lambda: list(admissions.values('consult_doctor__doctor_name').annotate(count=Count('pid'))
+                                  .order_by('-count')),
+    }
+
+def admission_report_context(form, results, history=False):
+    stats = {
+        'total_admissions': results['total_admissions'],
+        'currently_admitted': results['currently_admitted'],
+        'discharged': results['discharged'],
+        'by_doctor': results['by_doctor'],
+    }
+    return {'form': form, 'admissions': results['admissions'], 'stats': stats, 'history': history}
+
 @login_required
+@replica_reads
 def admission_report(request):
     """Admission/Discharge report"""
     form = DateRangeForm(request.GET or None)
-    admissions = Patient.objects.all()
-    
-    if form.is_valid():
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if start_date:
-            admissions = admissions.filter(admission_date__gte=start_date)
-        if end_date:
-            admissions = admissions.filter(admission_date__lte=end_date)
-    
+    history = history_requested(request)
+    results = run_queries(admission_report_queries(form, history))
+    return render(request, 'hospital/reports/admission_report.html', admission_report_context(form, results, history))
+
+def _rollups_in_range(form):
+    return _filter_date_range(RevenueDailyRollup.objects.all(), 'date', form)
+
+def revenue_report_queries(form):
+    bills = _bills_in_range(form)
+    rollups = _rollups_in_range(form)
+    return {
+        'totals': lambda: rollups.aggregate(
+            total_revenue=Sum('amount'),
+            paid_amount=Sum('amount', filter=Q(payment_status='paid')),
+            pending_amount=Sum('amount', filter=Q(payment_status='pending')),
+            tax_amount=Sum('gst_amount'),
+            gross_amount=Sum('gross_amount'),
+        ),
+        'bills': lambda: list(bills.with_totals().select_related('patient', 'consult_doctor').order_by('-bill_date')[:50]),
+        'by_payment_method': lambda: list(rollups.values('payment_method').annotate(total=Sum('amount'))
+                                          .order_by('-total')),
+        'by_doctor': lambda: list(rollups.values('doctor__doctor_name').annotate(total=Sum('amount'))
+                                  .order_by('-total')),
+    }
+
+def revenue_report_context(form, results):
+    totals = results['totals']
     stats = {
-        'total_admissions': admissions.count(),
-        'currently_admitted': admissions.filter(is_admitted=True).count(),
-        'discharged': admissions.filter(is_admitted=False).count(),
-        'by_doctor': admissions.values('consult_doctor__doctor_name').annotate(count=Count('pid')).order_by('-count')
+        'total_revenue': totals['total_revenue'] or 0,
+        'paid_amount': totals['paid_amount'] or 0,
+        'pending_amount': totals['pending_amount'] or 0,
+        'tax_amount': totals['tax_amount'] or 0,
+        'gross_amount': totals['gross_amount'] or 0,
+        'by_payment_method': results['by_payment_method'],
+        'by_doctor': results['by_doctor'],
     }
-    
-    return render(request, 'hospital/reports/admission_report.html', {
-        'form': form,
-        'admissions': admissions.order_by('-admission_date')[:50],
-        'stats': stats
-    })
+    return {'form': form, 'bills': results['bills'], 'stats': stats}
 
 @login_required
+@replica_reads
 def revenue_report(request):
-    """Revenue report"""
+    """Revenue report, aggregated from the daily rollup rather than the Bill table"""
     form = DateRangeForm(request.GET or None)
-    bills = Bill.objects.all()
-    
-    if form.is_valid():
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if start_date:
-            bills = bills.filter(bill_date__gte=start_date)
-        if end_date:
-            bills = bills.filter(bill_date__lte=end_date)
-    
-    stats = {
-        'total_revenue': bills.aggregate(Sum('amount'))['amount__sum'] or 0,
-        'paid_amount': bills.filter(payment_status='paid').aggregate(Sum('amount'))['amount__sum'] or 0,
-        'pending_amount': bills.filter(payment_status='pending').aggregate(Sum('amount'))['amount__sum'] or 0,
-        'by_payment_method': bills.values('payment_method').annotate(total=Sum('amount')).order_by('-total'),
-        'by_doctor': bills.values('consult_doctor__doctor_name').annotate(total=Sum('amount')).order_by('-total')
+    results = run_queries(revenue_report_queries(form))
+    return render(request, 'hospital/reports/revenue_report.html', revenue_report_context(form, results))
+
+def _attendance_window(form):
+    dates = form.cleaned_data if form.is_valid() else {}
+    return report_window(dates.get('start_date'), dates.get('end_date'))
+
+def attendance_report_queries(form):
+    start, end = _attendance_window(form)
+    attendances = Attendance.objects.filter(date_of_attendance__range=(start, end))
+    return {
+        'matrix': lambda: AttendanceMatrix.build(attendances, start, end),
+        'attendances': lambda: list(attendances.select_related('staff').order_by('-date_of_attendance')[:50]),
+    }
+
+def attendance_report_context(form, results):
+    matrix = results['matrix']
+    return {
+        'form': form, 'attendances': results['attendances'], 'matrix': matrix, 'stats': matrix.totals(),
+        'staff_summary': matrix.staff_summary(), 'monthly': matrix.monthly_summary(), 'heatmap': matrix.heatmap(),
     }
-    
-    return render(request, 'hospital/reports/revenue_report.html', {
-        'form': form,
-        'bills': bills.order_by('-bill_date')[:50],
-        'stats': stats
-    })
 
 @login_required
+@replica_reads
 def attendance_report(request):
     """Attendance report"""
     form = DateRangeForm(request.GET or None)
-    attendances = Attendance.objects.all()
-    
-    if form.is_valid():
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if start_date:
-            attendances = attendances.filter(date_of_attendance__gte=start_date)
-        if end_date:
-            attendances = attendances.filter(date_of_attendance__lte=end_date)
-    
-    stats = {
-        'total_records': attendances.count(),
-        'present_count': attendances.filter(status='present').count(),
-        'absent_count': attendances.filter(status='absent').count(),
-        'leave_count': attendances.filter(status='leave').count(),
-        'by_staff': attendances.values('staff__username').annotate(count=Count('id')).order_by('-count')
-    }
-    
-    return render(request, 'hospital/reports/attendance_report.html', {
-        'form': form,
-        'attendances': attendances.order_by('-date_of_attendance')[:50],
-        'stats': stats
-    })
\ No newline at end of file
+    results = run_queries(attendance_report_queries(form))
+    return render(request, 'hospital/reports/attendance_report.html', attendance_report_context(form, results))
+
+# ==================== Report Exports ====================
+
+@login_required
+@replica_reads
+def export_admission_report(request):
+    """Stream every admission matching the report filters"""
+    admissions = _admissions_in_range(DateRangeForm(request.GET or None), history_requested(request)).order_by(
+        '-admission_date', '-pid')
+    fields = ['pid', 'patient_name', 'consult_doctor__doctor_name', 'admission_date', 'discharge_date', 'is_admitted']
+    headers = ['pid', 'patient', 'doctor', 'admission_date', 'discharge_date', 'is_admitted']
+    return exports.stream_rows(request, headers, exports.queryset_rows(admissions, fields), 'admissions')
+
+@login_required
+@replica_reads
+def export_revenue_report(request):
+    """Stream every bill matching the report filters"""
+    bills = _bills_in_range(DateRangeForm(request.GET or None)).with_totals().order_by('-bill_date', '-bid')
+    fields = ['bid', 'bill_date', 'patient__patient_name', 'consult_doctor__doctor_name',
+              'payment_status', 'payment_method', 'amount', 'gst_amount', 'gross_amount']
+    headers = ['bid', 'bill_date', 'patient', 'doctor', 'payment_status', 'payment_method',
+               'amount', 'tax_amount', 'total_amount']
+    return exports.stream_rows(request, headers, exports.queryset_rows(bills, fields), 'revenue')
+
+@login_required
+@replica_reads
+def export_attendance_report(request):
+    """Stream every attendance record matching the report filters"""
+    # The same window as the report: its default length, clamp and empty inverted ranges
+    start, end = _attendance_window(DateRangeForm(request.GET or None))
+    attendances = Attendance.objects.filter(date_of_attendance__range=(start, end))
+    attendances = attendances.order_by('-date_of_attendance', '-id')
+    fields = ['staff__username', 'date_of_attendance', 'incoming_time', 'outgoing_time', 'status', 'task_involved']
+    headers = ['staff', 'date', 'incoming_time', 'outgoing_time', 'status', 'task_involved']
+    return exports.stream_rows(request, headers, exports.queryset_rows(attendances, fields), 'attendance')
+
+# ==================== Background Tasks ====================
+
+@login_required
+def task_status(request, task_id):
+    """State of a queued task, for pages that poll until their background work is done"""
+    tasks = Task.objects.all() if request.user.is_staff else Task.objects.filter(created_by=request.user)
+    task = get_object_or_404(tasks, pk=task_id)
+    return JsonResponse({
+        'id': task.pk,
+        'name': task.name,
+        'status': task.status,
+        'attempts': task.attempts,
+        'max_attempts': task.max_attempts,
+        'run_at': task.run_at.isoformat(),
+        'finished_at': task.finished_at.isoformat() if task.finished_at else None,
+        'result': task.result,
+        'error': task.error,
+    })
+
+# ==================== Change Log ====================
+
+def _int_param(request, name, default):
+    try:
+        return max(0, int(request.GET.get(name, default)))
+    except ValueError:
+        return default
+
+@login_required
+def change_log(request):
+    """Change events after ``?after=<cursor>``, oldest first, for systems tailing the log"""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    limit = min(_int_param(request, 'limit', changelog.READ_LIMIT), changelog.READ_LIMIT) or changelog.READ_LIMIT
+    events, cursor = changelog.read(_int_param(request, 'after', 0), limit, request.GET.get('model'))
+    return JsonResponse({
+        'events': [{
+            'id': event.pk,
+            'model': event.model,
+            'object_id': event.object_id,
+            'action': event.action,
+            'changes': event.changes,
+            'user_id': event.user_id,
+            'created_at': event.created_at.isoformat(),
+        } for event in events],
+        'cursor': cursor,
+        'has_more': len(events) == limit,
+    })
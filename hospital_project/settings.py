@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'hospital',
 ]
 
@@ -48,6 +49,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'hospital.replicas.ReplicaStickinessMiddleware',
+    'hospital.changelog.ChangeLogMiddleware',
 ]
 
 ROOT_URLCONF = 'hospital_project.urls'
@@ -84,6 +87,15 @@ DATABASES = {
     }
 }
 
+# Reports, exports and search read from the 'replica' alias when it is
+# configured (hospital/replicas.py); after writing, a user reads from the
+# primary for HOSPITAL_REPLICA_STICKY_SECONDS. MIRROR keeps tests on a single
+# test database. For example:
+# DATABASES['replica'] = {**DATABASES['default'], 'HOST': 'replica.internal', 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['hospital.replicas.ReplicaRouter']
+HOSPITAL_REPLICA_DB = 'replica'
+HOSPITAL_REPLICA_STICKY_SECONDS = 10
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -129,6 +141,28 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# GST rate applied to bills
+HOSPITAL_GST_RATE = '0.18'
+
+# Cache for dashboard, list and navigation fragments (hospital/caching.py).
+# Local memory is per process; with several workers switch to the file
+# backend, e.g. {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+# 'LOCATION': BASE_DIR / 'cache'}, so writes invalidate every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hospital',
+    }
+}
+HOSPITAL_CACHE_TIMEOUT = 3600
+
+# Change log readers (hospital/changelog.py) only see events at least this old,
+# so an insert that commits after a later one is never skipped
+HOSPITAL_CHANGELOG_SETTLE_SECONDS = 2
+
+# The attendance roster posts five fields per staff member (up to 2000 rows)
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 11000
+
 # Login URLs
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'